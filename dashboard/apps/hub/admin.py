@@ -1,11 +1,27 @@
 from decimal import Decimal
 
-from django.contrib import admin
-from django.contrib.admin import SimpleListFilter
+from django.conf.urls import patterns, url
+from django.contrib import admin, messages
+from django.contrib.admin import (AllValuesFieldListFilter, FieldListFilter,
+    RelatedFieldListFilter, SimpleListFilter, helpers)
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.util import unquote
+from django.contrib.admin.views.main import PAGE_VAR, ChangeList
 from django.contrib.localflavor.us.us_states import US_STATES
-from django.db import connection
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import InvalidPage
+from django.http import Http404, HttpResponse, HttpResponseRedirect
+from django.template.defaultfilters import slugify
+from django.template.response import TemplateResponse
+from django.utils import simplejson
 from django.utils.translation import ugettext_lazy as _
 
+from facets import get_election_facets
+from forms import (BaseElectionInlineFormSet, BaseElectionModelFormSet,
+    ElectionAdminForm, LevelStatusUpdateForm, LogAdminForm,
+    NeedsReviewUpdateForm, OrganizationAutocompleteWidget,
+    ProofedByUpdateForm, SharedChoicesModelChoiceField,
+    SharedChoicesModelMultipleChoiceField)
 from models import (
     Contact,
     DataFormat,
@@ -16,13 +32,26 @@ from models import (
     State,
     Volunteer,
     VolunteerLog,
-    VolunteerRole
+    VolunteerRole,
+    update_elections,
 )
+from paginators import EstimatedCountPaginator, estimated_count
 
 
+# Maximum number of organizations returned by OrganizationAdmin.autocomplete_view
+AUTOCOMPLETE_LIMIT = 15
+
 ### number helpers
 ONEPLACE = Decimal(10) ** -1
 
+# Percentage of a state's elections that have been proofed, as a correlated
+# subquery against the state row (NULL for states without elections)
+PROOFED_PCT_SQL = '''(
+    SELECT 100.0 * COUNT(hub_election.proofed_by_id) / NULLIF(COUNT(*), 0)
+    FROM hub_election
+    WHERE hub_election.state_id = hub_state.postal
+)'''
+
 ### FIELDSET ###
 ELECTION_FIELDSET = (
     ('Data Source', {
@@ -79,6 +108,63 @@ VOLUNTEER_FIELDSET = (
 ### ADMIN CLASSES ###
 
 
+class EstimatedCountChangeList(ChangeList):
+    """
+    ChangeList that estimates the counts of large unfiltered tables instead
+    of running COUNT(*). See paginators.estimated_count.
+
+    ``result_count_estimated`` and ``full_result_count_estimated`` flag
+    estimated counts for the pagination template, and ``next_page_url``
+    links to the page after the last estimated one while pages keep
+    coming back full.
+    """
+
+    def get_results(self, request):
+        # Same as ChangeList.get_results, apart from the counts
+        paginator = self.model_admin.get_paginator(request, self.query_set, self.list_per_page)
+        result_count = paginator.count
+        self.result_count_estimated = getattr(paginator, 'count_estimated', False)
+
+        if not self.query_set.query.where:
+            full_result_count = result_count
+            self.full_result_count_estimated = self.result_count_estimated
+        else:
+            full_result_count, self.full_result_count_estimated = \
+                estimated_count(self.root_query_set)
+
+        can_show_all = result_count <= self.list_max_show_all
+        multi_page = result_count > self.list_per_page
+
+        next_page_url = None
+        if (self.show_all and can_show_all) or not multi_page:
+            result_list = self.query_set._clone()
+        else:
+            try:
+                page = paginator.page(self.page_num+1)
+            except InvalidPage:
+                raise IncorrectLookupParameters
+            result_list = page.object_list
+            if (self.result_count_estimated and page.has_next() and
+                    self.page_num + 1 >= paginator.num_pages):
+                next_page_url = self.get_query_string({PAGE_VAR: self.page_num + 1})
+
+        self.result_count = result_count
+        self.full_result_count = full_result_count
+        self.result_list = result_list
+        self.can_show_all = can_show_all
+        self.multi_page = multi_page
+        self.paginator = paginator
+        self.next_page_url = next_page_url
+
+
+class EstimatedCountMixin(object):
+    """ModelAdmin mixin for changelists of tables too large to COUNT(*)"""
+    paginator = EstimatedCountPaginator
+
+    def get_changelist(self, request, **kwargs):
+        return EstimatedCountChangeList
+
+
 class DataFormatAdmin(admin.ModelAdmin):
     list_display = ('name',)
     prepopulated_fields = {'slug': ('name',)}
@@ -128,9 +214,64 @@ class OrganizationAdmin(admin.ModelAdmin):
         }),
     )
 
-
-class ElectionInline(admin.StackedInline):
+    def get_urls(self):
+        urls = patterns('',
+            url(r'^autocomplete/$',
+                self.admin_site.admin_view(self.autocomplete_view),
+                name='hub_organization_autocomplete'),
+        )
+        return urls + super(OrganizationAdmin, self).get_urls()
+
+    def autocomplete_view(self, request):
+        """
+        Returns JSON ``[{"value": pk, "label": name}, ...]`` for the
+        organizations whose slug starts with the slugified ``term``, which
+        the slug index can answer.  Organizations in ``state`` are listed
+        first; those in other states are labeled with their state.
+        """
+        prefix = slugify(request.GET.get('term', ''))
+        state = request.GET.get('state', '')
+        results = []
+        if prefix:
+            qs = Organization.objects.filter(slug__startswith=prefix).only('name', 'state')
+            if state:
+                results.extend(qs.filter(state=state)[:AUTOCOMPLETE_LIMIT])
+                qs = qs.exclude(state=state)
+            if len(results) < AUTOCOMPLETE_LIMIT:
+                results.extend(qs[:AUTOCOMPLETE_LIMIT - len(results)])
+        data = [{
+            'value': org.pk,
+            'label': org.name if org.state == state else '%s (%s)' % (org.name, org.state),
+        } for org in results]
+        return HttpResponse(simplejson.dumps(data), content_type='application/json')
+
+
+class StateOrganizationAutocompleteMixin(object):
+    """
+    Renders the ``organization_fields`` of an inline of StateAdmin with
+    OrganizationAutocompleteWidget, searching the parent state's
+    organizations first.
+    """
+    organization_fields = []
+
+    def get_formset(self, request, obj=None, **kwargs):
+        self.parent_state = obj
+        return super(StateOrganizationAutocompleteMixin, self).get_formset(request, obj, **kwargs)
+
+    def formfield_for_foreignkey(self, db_field, request=None, **kwargs):
+        if db_field.name in self.organization_fields:
+            parent_state = getattr(self, 'parent_state', None)
+            kwargs['widget'] = OrganizationAutocompleteWidget(
+                state=parent_state.pk if parent_state else None)
+        return super(StateOrganizationAutocompleteMixin, self).formfield_for_foreignkey(
+            db_field, request, **kwargs)
+
+
+class ElectionInline(StateOrganizationAutocompleteMixin, admin.StackedInline):
     model = Election
+    form = ElectionAdminForm
+    formset = BaseElectionInlineFormSet
+    organization_fields = ['organization']
     template = "grappelli/admin/edit_inline/stacked.html"
     extra = 0
     prepopulated_fields = {
@@ -138,24 +279,65 @@ class ElectionInline(admin.StackedInline):
     }
     fieldsets = ELECTION_FIELDSET
 
+    class Media:
+        js = ('admin/js/organization_autocomplete.js',)
+
     def queryset(self, request):
-        return super(ElectionInline, self).queryset(request).prefetch_related('formats')
+        qs = (super(ElectionInline, self).queryset(request)
+            .select_related('organization').prefetch_related('formats'))
+        # Only one year of elections is shown at a time. See StateAdmin
+        year = getattr(request, 'election_year', None)
+        if year is not None:
+            qs = qs.filter(start_date__year=year)
+        return qs
 
     def formfield_for_dbfield(self, db_field, **kwargs):
+        if db_field.name == 'formats':
+            kwargs['form_class'] = SharedChoicesModelMultipleChoiceField
         formfield = super(ElectionInline, self).formfield_for_dbfield(db_field, **kwargs)
-        if db_field.name in set(['organization', 'formats']):
+        if db_field.name == 'formats':
             # Force queryset evaluation and cache in .choices
             formfield.choices = formfield.choices
         return formfield
 
-class LogInline(admin.StackedInline):
+class LogInline(StateOrganizationAutocompleteMixin, admin.StackedInline):
     model = Log
+    form = LogAdminForm
     extra = 0
+    organization_fields = ['org']
+
+    def queryset(self, request):
+        return super(LogInline, self).queryset(request).select_related('org')
+
+
+class StateProofedListFilter(admin.SimpleListFilter):
+    title = _('% proofed')
+    parameter_name = 'proofed'
+
+    CONDITIONS = {
+        'none': 'COALESCE(%s, 0) = 0',
+        'under50': 'COALESCE(%s, 0) < 50',
+        'over50': '%s >= 50',
+        'all': '%s = 100',
+    }
+
+    def lookups(self, request, model_admin):
+        return (
+            ('none', _('None')),
+            ('under50', _('Under 50%')),
+            ('over50', _('50% or more')),
+            ('all', _('All')),
+        )
+
+    def queryset(self, request, queryset):
+        condition = self.CONDITIONS.get(self.value())
+        if condition:
+            return queryset.extra(where=[condition % PROOFED_PCT_SQL])
 
 
 class StateAdmin(admin.ModelAdmin):
-    list_display = ['name', 'state_volunteers', 'percent_proofed', 'metadata_status', 'pain']
-    list_filter = ['metadata_status', 'pain']
+    list_display = ['name', 'state_volunteers', 'percent_proofed', 'metadata_status', 'results_status', 'election_count', 'pain']
+    list_filter = ['metadata_status', 'results_status', StateProofedListFilter, 'pain']
     list_editable = ['metadata_status', 'pain']
     inlines = [
         ElectionInline,
@@ -169,8 +351,100 @@ class StateAdmin(admin.ModelAdmin):
     )
 
     class Media:
-        js = ('admin/js/custom_datepicker.js',)
+        js = (
+            'admin/js/custom_datepicker.js',
+            'admin/js/election_inline_pages.js',
+        )
 
+    def get_urls(self):
+        urls = patterns('',
+            url(r'^(.+)/elections/$',
+                self.admin_site.admin_view(self.election_inline_view),
+                name='hub_state_election_inline'),
+        )
+        return urls + super(StateAdmin, self).get_urls()
+
+    def set_election_year(self, request, obj):
+        """
+        Picks the year of elections the ElectionInline shows and returns the
+        years that have elections, newest first.
+
+        On POST that is the ``election_year`` the form was rendered with, so
+        that the formset is bound to the elections that were shown, even if
+        a newer year has been added since.  Otherwise it is the
+        ``election_year`` query parameter, or else the most recent year.
+        """
+        years = [d.year for d in
+            Election.objects.filter(state=obj).dates('start_date', 'year', order='DESC')]
+        data = request.POST if request.method == 'POST' else request.GET
+        try:
+            year = int(data.get('election_year'))
+        except (TypeError, ValueError):
+            year = None
+        if year not in years and request.method != 'POST':
+            year = years[0] if years else None
+        request.election_year = year
+        return years
+
+    def election_rows_match(self, request, obj):
+        """
+        Tells whether the elections posted in the ElectionInline are all
+        still elections of the state in request.election_year.  If not,
+        Django would bind the posted forms to other elections.
+        """
+        inline = ElectionInline(self.model, self.admin_site)
+        prefix = inline.get_formset(request, obj).get_default_prefix()
+        try:
+            initial = int(request.POST.get('%s-INITIAL_FORMS' % prefix, 0))
+        except ValueError:
+            return False
+        posted = set(request.POST.get('%s-%d-id' % (prefix, i)) for i in range(initial))
+        elections = Election.objects.filter(state=obj)
+        if request.election_year is not None:
+            elections = elections.filter(start_date__year=request.election_year)
+        current = set(unicode(pk) for pk in elections.values_list('pk', flat=True))
+        return posted <= current
+
+    def change_view(self, request, object_id, form_url='', extra_context=None):
+        obj = self.get_object(request, unquote(object_id))
+        extra_context = dict(extra_context or {})
+        if obj is not None:
+            extra_context['election_years'] = self.set_election_year(request, obj)
+            extra_context['election_year'] = request.election_year
+            if request.method == 'POST' and not self.election_rows_match(request, obj):
+                messages.error(request, "The elections of this state were changed by "
+                    "someone else while you were editing them. Nothing was saved; "
+                    "please make your changes again.")
+                url = request.path
+                if request.election_year is not None:
+                    url += '?election_year=%d' % request.election_year
+                return HttpResponseRedirect(url)
+        return super(StateAdmin, self).change_view(request, object_id,
+            form_url, extra_context)
+
+    def election_inline_view(self, request, object_id):
+        """Renders one year of the ElectionInline, for loading over AJAX"""
+        obj = self.get_object(request, unquote(object_id))
+        if obj is None:
+            raise Http404
+        if not self.has_change_permission(request, obj):
+            raise PermissionDenied
+        years = self.set_election_year(request, obj)
+
+        inline = ElectionInline(self.model, self.admin_site)
+        FormSet = inline.get_formset(request, obj)
+        formset = FormSet(instance=obj, prefix=FormSet.get_default_prefix(),
+            queryset=inline.queryset(request))
+        inline_admin_formset = helpers.InlineAdminFormSet(inline, formset,
+            list(inline.get_fieldsets(request, obj)),
+            dict(inline.get_prepopulated_fields(request, obj)),
+            list(inline.get_readonly_fields(request, obj)),
+            model_admin=self)
+        return TemplateResponse(request, 'admin/hub/state/election_inline.html', {
+            'inline_admin_formset': inline_admin_formset,
+            'election_years': years,
+            'election_year': request.election_year,
+        }, current_app=self.admin_site.name)
 
     def save_formset(self, request, form, formset, change):
         if formset.model == Election:
@@ -182,31 +456,25 @@ class StateAdmin(admin.ModelAdmin):
         else:
             formset.save()
 
+    def queryset(self, request):
+        # Compute every row's percentage and volunteers up front rather than
+        # querying for them once per state
+        return (super(StateAdmin, self).queryset(request)
+            .extra(select={'proofed_pct': PROOFED_PCT_SQL})
+            .prefetch_related('volunteer_set'))
+
     def state_volunteers(self, obj):
         return ", ".join([vol.full_name for vol in obj.volunteer_set.all()])
     state_volunteers.short_description = "Volunteers assigned to each state"
 
     def percent_proofed(self, obj):
-        sql = '''select (
-                    cast(sum(case when proofed_by_id is not null then 1 end) as decimal)/count(*)
-                   )*100
-                from hub_election
-                where state_id = %s;'''
-
-        ### Create single db cursor for raw queries
-        cursor = connection.cursor()
-        cursor.execute(sql, [obj.postal])
-        # Assume zero
-        value = cursor.fetchone()[0]
-        try:
-            pct = value.quantize(ONEPLACE).to_eng_string()
-        except AttributeError:
-        # States with zero records return None value
-            pct = "0"
-        # Generic trap for all other error types, to avoid breaking admin
-        except:
-            pct = "Could not be determined."
-        return pct
+        value = obj.proofed_pct
+        if value is None:
+            # States with zero records, shown like states with none proofed
+            value = 0
+        # SQLite returns a float and PostgreSQL a Decimal
+        return Decimal(str(value)).quantize(ONEPLACE).to_eng_string()
+    percent_proofed.admin_order_field = 'proofed_pct'
     percent_proofed.short_description = "% of election records proofed"
 
 
@@ -244,8 +512,51 @@ class ElectionProofedListFilter(admin.SimpleListFilter):
             return queryset.filter(proofed_by__isnull=False)
 
 
-class ElectionAdmin(admin.ModelAdmin):
+class FacetCountsMixin(object):
+    """
+    Takes the choices of a list filter on an Election field from
+    get_election_facets() and shows each one's number of elections.
+    """
+
+    def get_facet(self, field_path):
+        facet = get_election_facets()[field_path]
+        self.facet_counts = dict((label, count) for value, label, count in facet)
+        return facet
+
+    def choices(self, cl):
+        for choice in super(FacetCountsMixin, self).choices(cl):
+            count = self.facet_counts.get(choice['display'])
+            if count is not None:
+                choice['display'] = u'%s (%s)' % (choice['display'], count)
+            yield choice
+
+
+class CachedAllValuesFieldListFilter(FacetCountsMixin, AllValuesFieldListFilter):
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        super(CachedAllValuesFieldListFilter, self).__init__(field, request,
+            params, model, model_admin, field_path)
+        self.lookup_choices = [value for value, label, count in self.get_facet(field_path)]
+
+
+class CachedRelatedFieldListFilter(FacetCountsMixin, RelatedFieldListFilter):
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        # RelatedFieldListFilter.__init__ queries every related object for
+        # its choices, so set the filter up here instead
+        self.lookup_kwarg = '%s__%s__exact' % (field_path, field.rel.get_related_field().name)
+        self.lookup_kwarg_isnull = '%s__isnull' % field_path
+        self.lookup_val = request.GET.get(self.lookup_kwarg, None)
+        self.lookup_val_isnull = request.GET.get(self.lookup_kwarg_isnull, None)
+        self.lookup_choices = [(value, label) for value, label, count in self.get_facet(field_path)]
+        FieldListFilter.__init__(self, field, request, params, model,
+            model_admin, field_path)
+        self.lookup_title = self.title = field.verbose_name
+
+
+class ElectionAdmin(EstimatedCountMixin, admin.ModelAdmin):
     model = Election
+    form = ElectionAdminForm
     filter_horizontal = ['formats']
     list_display = [
         'id',
@@ -269,13 +580,13 @@ class ElectionAdmin(admin.ModelAdmin):
     list_filter = [
         ElectionNeedsReviewListFilter,
         ElectionProofedListFilter,
-        'proofed_by',
-        'user_fullname',
+        ('proofed_by', CachedRelatedFieldListFilter),
+        ('user_fullname', CachedAllValuesFieldListFilter),
         'start_date',
         'race_type',
         'primary_type',
         'special',
-        'state',
+        ('state', CachedRelatedFieldListFilter),
         'result_type',
         'state_level',
         'county_level',
@@ -296,9 +607,43 @@ class ElectionAdmin(admin.ModelAdmin):
         'state_leg_level_status',
     ]
     fieldsets = ELECTION_FIELDSET
+    actions = [
+        'set_level_status',
+        'set_proofed_by',
+        'set_needs_review',
+    ]
 
     class Media:
-        js = ('admin/js/custom_datepicker.js',)
+        js = (
+            'admin/js/custom_datepicker.js',
+            'admin/js/organization_autocomplete.js',
+        )
+
+    def formfield_for_foreignkey(self, db_field, request=None, **kwargs):
+        if db_field.name == 'organization':
+            kwargs['widget'] = OrganizationAutocompleteWidget()
+        return super(ElectionAdmin, self).formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def formfield_for_dbfield(self, db_field, **kwargs):
+        if db_field.name == 'proofed_by':
+            kwargs['form_class'] = SharedChoicesModelChoiceField
+        formfield = super(ElectionAdmin, self).formfield_for_dbfield(db_field, **kwargs)
+        if db_field.name == 'proofed_by':
+            # proofed_by is list_editable, so take its choices from the
+            # facet cache rather than querying users for every row
+            choices = get_election_facets()['users']
+            if formfield.empty_label is not None:
+                choices = [('', formfield.empty_label)] + choices
+            formfield.choices = choices
+        return formfield
+
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault('form', ElectionAdminForm)
+        return super(ElectionAdmin, self).get_changelist_form(request, **kwargs)
+
+    def get_changelist_formset(self, request, **kwargs):
+        kwargs.setdefault('formset', BaseElectionModelFormSet)
+        return super(ElectionAdmin, self).get_changelist_formset(request, **kwargs)
 
     def save_model(self, request, obj, form, change):
         obj.user = request.user
@@ -309,6 +654,54 @@ class ElectionAdmin(admin.ModelAdmin):
         return ', '.join(obj.offices)
     offices.short_description = "Office(s) up for election"
 
+    def update_selected(self, request, queryset, form_class, title):
+        """
+        Asks for the values of ``form_class`` and sets them on every
+        selected election with a single UPDATE.
+
+        With "select all", ``queryset`` is every election matching the
+        changelist's filters, which are kept in the form's query string.
+        """
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        if request.POST.get('post'):
+            form = form_class(request.POST)
+            if form.is_valid():
+                count = update_elections(queryset, **form.get_values())
+                self.message_user(request, "Updated %d election(s)." % count)
+                # Back to the changelist
+                return None
+        else:
+            form = form_class()
+        context = {
+            'title': title,
+            'opts': self.model._meta,
+            'app_label': self.model._meta.app_label,
+            'form': form,
+            'action': request.POST['action'],
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across') == '1',
+            'count': queryset.count(),
+        }
+        return TemplateResponse(request, 'admin/hub/election/update_selected.html',
+            context, current_app=self.admin_site.name)
+
+    def set_level_status(self, request, queryset):
+        return self.update_selected(request, queryset, LevelStatusUpdateForm,
+            "Set a reporting level status")
+    set_level_status.short_description = "Set a level status of selected elections"
+
+    def set_proofed_by(self, request, queryset):
+        return self.update_selected(request, queryset, ProofedByUpdateForm,
+            "Set who proofed")
+    set_proofed_by.short_description = "Set proofed by of selected elections"
+
+    def set_needs_review(self, request, queryset):
+        return self.update_selected(request, queryset, NeedsReviewUpdateForm,
+            "Set the review notes")
+    set_needs_review.short_description = "Set needs review of selected elections"
+
 
 class VolunteerLogInline(admin.StackedInline):
     model = VolunteerLog
@@ -333,7 +726,7 @@ class VolunteersByStateFilter(SimpleListFilter):
 
 #TODO: Create data_admin dynamic filter based on presence of value in
 # User field (to indicate if volunteer has admin privs)
-class VolunteerAdmin(admin.ModelAdmin):
+class VolunteerAdmin(EstimatedCountMixin, admin.ModelAdmin):
     list_display = (
         'first_name',
         'last_name',
@@ -1,11 +1,267 @@
-import re
+import hashlib
+import urllib
 
+from django.conf.urls import url
+from django.core.cache import cache
+from django.db.models.fields import FieldDoesNotExist
+from django.http import HttpResponse
 from tastypie import fields
+from tastypie.exceptions import ApiFieldError, BadRequest, InvalidFilterError
 from tastypie.resources import ModelResource, ALL, ALL_WITH_RELATIONS
-from dashboard.apps.hub.models import Election, State, Organization
+from tastypie.utils import trailing_slash
+from dashboard.apps.hub.caching import ALL_STATE_VERSIONS, get_versions
+from dashboard.apps.hub.fields import LevelStatusField
+from dashboard.apps.hub.models import (DirectLink, Election, State,
+    Organization)
+from dashboard.apps.hub.paginators import KeysetPaginator
 
 
-class OrganizationResource(ModelResource):
+class SparseFieldsMixin(object):
+    """
+    Adds ``fields`` and ``expand`` query parameters to a ModelResource.
+
+    ``fields`` is a comma-separated list of the fields to include, e.g.
+    ``?fields=id,start_date,state``.  Fields of an expanded related
+    resource can be selected with a dotted name, e.g. ``state.name``.
+    Columns of fields that are not requested are deferred in the query.
+
+    ``expand`` is a comma-separated list of related fields to embed in
+    full.  Related fields that are not expanded are rendered as resource
+    URIs without querying the related table.  When ``expand`` is absent,
+    related fields declared with ``full=True`` are expanded.
+    """
+
+    def _split_param(self, request, name):
+        value = request.GET.get(name)
+        if value is None:
+            return None
+        return [v.strip() for v in value.split(',') if v.strip()]
+
+    def get_field_selection(self, request):
+        """
+        Returns a ``(fields, nested_fields, expand)`` tuple parsed from the
+        request.
+
+        ``fields`` is a set of field names or None for all fields,
+        ``nested_fields`` maps related field names to the set of their
+        requested fields, and ``expand`` is a set of related field names to
+        embed in full or None for the declared defaults.
+        """
+        names = self._split_param(request, 'fields')
+        expand = self._split_param(request, 'expand')
+
+        selected = None
+        nested = {}
+        if names:
+            selected = set()
+            for name in names:
+                name, _, subfield = name.partition('.')
+                selected.add(name)
+                if subfield:
+                    nested.setdefault(name, set()).add(subfield)
+        unknown = [n for n in (selected or []) if n not in self.fields]
+        if expand is not None:
+            expand = set(expand)
+            unknown.extend(n for n in expand if not self._is_to_one(n))
+        if unknown:
+            raise BadRequest("Invalid field(s) requested: %s" % ', '.join(sorted(set(unknown))))
+        return selected, nested, expand
+
+    def _is_to_one(self, field_name):
+        field_object = self.fields.get(field_name)
+        return (isinstance(field_object, fields.ToOneField) and
+            isinstance(field_object.attribute, basestring) and
+            '__' not in field_object.attribute)
+
+    def _is_expanded(self, field_name, expand):
+        if expand is None:
+            return self.fields[field_name].full
+        return field_name in expand
+
+    def get_object_list(self, request):
+        object_list = super(SparseFieldsMixin, self).get_object_list(request)
+        if request is None:
+            return object_list
+
+        selected, nested, expand = self.get_field_selection(request)
+        related = [field_object.attribute
+            for name, field_object in self.fields.items()
+            if self._is_to_one(name) and self._is_expanded(name, expand) and
+                (selected is None or name in selected)]
+        if related:
+            object_list = object_list.select_related(*related)
+
+        if selected is not None:
+            columns = self.get_selected_columns(selected)
+            if columns is not None:
+                object_list = object_list.only(*columns)
+        return object_list
+
+    def get_selected_columns(self, selected):
+        """
+        Returns the model field names backing the selected resource
+        fields, or None if some of them are not plain model fields.
+        """
+        opts = self._meta.object_class._meta
+        columns = []
+        for name in selected:
+            attribute = self.fields[name].attribute
+            if attribute is None:
+                # e.g. resource_uri, which only needs the primary key
+                continue
+            if not isinstance(attribute, basestring) or '__' in attribute:
+                return None
+            try:
+                opts.get_field(attribute)
+            except FieldDoesNotExist:
+                return None
+            columns.append(attribute)
+        return columns
+
+    def full_dehydrate(self, bundle, for_list=False):
+        if bundle.request is None:
+            return super(SparseFieldsMixin, self).full_dehydrate(bundle, for_list=for_list)
+        selected, nested, expand = self.get_field_selection(bundle.request)
+        return self.dehydrate_selected(bundle, for_list, selected, nested, expand)
+
+    def dehydrate_selected(self, bundle, for_list=False, selected=None,
+            nested=None, expand=None):
+        """
+        Equivalent of ``full_dehydrate`` that only dehydrates the selected
+        fields and honors ``expand`` for related fields.
+        """
+        nested = nested or {}
+        use_in = ['all', 'list' if for_list else 'detail']
+
+        for field_name, field_object in self.fields.items():
+            if selected is not None and field_name not in selected:
+                continue
+
+            # If it's not for use in this mode, skip
+            field_use_in = getattr(field_object, 'use_in', 'all')
+            if callable(field_use_in):
+                if not field_use_in(bundle):
+                    continue
+            elif field_use_in not in use_in:
+                continue
+
+            if getattr(field_object, 'dehydrated_type', None) == 'related':
+                field_object.api_name = self._meta.api_name
+                field_object.resource_name = self._meta.resource_name
+
+            if self._is_to_one(field_name):
+                bundle.data[field_name] = self.dehydrate_to_one(bundle,
+                    field_object, for_list, self._is_expanded(field_name, expand),
+                    nested.get(field_name))
+            else:
+                bundle.data[field_name] = field_object.dehydrate(bundle, for_list=for_list)
+
+            # Check for an optional method to do further dehydration.
+            method = getattr(self, "dehydrate_%s" % field_name, None)
+            if method:
+                bundle.data[field_name] = method(bundle)
+
+        return self.dehydrate(bundle)
+
+    def dehydrate_to_one(self, bundle, field_object, for_list, expanded,
+            selected=None):
+        model_field = bundle.obj._meta.get_field(field_object.attribute)
+        if getattr(bundle.obj, model_field.attname) is None:
+            if not field_object.null:
+                raise ApiFieldError("The model '%r' has an empty attribute '%s' and doesn't allow a null value." % (bundle.obj, field_object.attribute))
+            return None
+
+        if not expanded:
+            # Only the primary key is needed to build the URI
+            related_obj = model_field.rel.to(pk=getattr(bundle.obj, model_field.attname))
+            related_resource = field_object.get_related_resource(related_obj)
+            return related_resource.get_resource_uri(related_obj)
+
+        related_obj = getattr(bundle.obj, field_object.attribute)
+        related_resource = field_object.get_related_resource(related_obj)
+        related_bundle = related_resource.build_bundle(obj=related_obj,
+            request=bundle.request)
+        if isinstance(related_resource, SparseFieldsMixin):
+            unknown = [n for n in (selected or []) if n not in related_resource.fields]
+            if unknown:
+                raise BadRequest("Invalid field(s) requested: %s" % ', '.join(
+                    '%s.%s' % (field_object.instance_name, n) for n in sorted(unknown)))
+            return related_resource.dehydrate_selected(related_bundle, for_list,
+                selected or None)
+        return related_resource.full_dehydrate(related_bundle, for_list=for_list)
+
+
+class CachedResponseMixin(object):
+    """
+    Caches the serialized GET responses of a ModelResource.
+
+    Responses are keyed on the resource, the view, the normalized request
+    URL and the current values of the version counters returned by
+    ``get_cache_versions``.  Bumping one of those versions (see
+    ``dashboard.apps.hub.caching``) invalidates the responses that
+    depend on it, and leaves every other cached response alone.
+    """
+    response_cache_timeout = 60 * 60
+
+    def get_cache_versions(self, request, view, kwargs):
+        """
+        Returns the names of the versions a response depends on.
+
+        By default that is every state and the organizations, which is
+        always correct but invalidates the response on any change;
+        resources override this to depend on less.
+        """
+        return ALL_STATE_VERSIONS + ('organization',)
+
+    def get_response_cache_key(self, request, view, kwargs):
+        params = sorted((k, sorted(v)) for k, v in request.GET.lists())
+        versions = sorted(get_versions(
+            self.get_cache_versions(request, view, kwargs)).items())
+        key = repr((
+            request.path,
+            urllib.urlencode([(k, v.encode('utf-8')) for k, values in params for v in values]),
+            # The format can also be negotiated with the Accept header
+            request.META.get('HTTP_ACCEPT', '') if 'format' not in request.GET else '',
+            versions,
+        ))
+        return 'hub:api:%s:%s:%s' % (self._meta.resource_name, view,
+            hashlib.sha1(key).hexdigest())
+
+    def cached_response(self, request, view, kwargs, view_func):
+        key = self.get_response_cache_key(request, view, kwargs)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = view_func(request, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, (response.content, response['Content-Type']),
+                self.response_cache_timeout)
+        return response
+
+    def get_list(self, request, **kwargs):
+        return self.cached_response(request, 'list', kwargs,
+            super(CachedResponseMixin, self).get_list)
+
+    def get_detail(self, request, **kwargs):
+        return self.cached_response(request, 'detail', kwargs,
+            super(CachedResponseMixin, self).get_detail)
+
+
+def requested_states(request, *params):
+    """
+    Returns the set of state postal codes a request is limited to by the
+    given filter parameters, or None if it is not limited to one state.
+    """
+    for param in params:
+        value = request.GET.get(param)
+        if value:
+            return set([value.upper()])
+    return None
+
+
+class OrganizationResource(CachedResponseMixin, SparseFieldsMixin, ModelResource):
 
     class Meta:
         queryset = Organization.objects.all()
@@ -19,28 +275,58 @@ class OrganizationResource(ModelResource):
             'state': ['exact', 'iexact'],
         }
 
+    def get_cache_versions(self, request, view, kwargs):
+        return ['organization']
+
 
-class StateResource(ModelResource):
+class StateResource(CachedResponseMixin, SparseFieldsMixin, ModelResource):
 
     class Meta:
         queryset = State.objects.all()
         allowed_methods = ['get']
         include_resource_ur = False
-        fields = ['postal', 'name']
+        fields = ['postal', 'name', 'results_status']
         filtering = {
             'name': ALL,
             'postal': ['iexact', 'exact'],
+            'results_status': ['exact', 'in', 'isnull'],
         }
+        ordering = ['name', 'postal', 'results_status']
+
+    def get_cache_versions(self, request, view, kwargs):
+        if view == 'detail' and 'pk' in kwargs:
+            postals = set([kwargs['pk'].upper()])
+        else:
+            postals = requested_states(request, 'postal', 'postal__exact', 'postal__iexact')
+        if postals is None:
+            return ALL_STATE_VERSIONS
+        return ['state:%s' % p for p in postals]
 
 
-class ElectionResource(ModelResource):
+class LevelStatusFieldsMixin(object):
+    """
+    Serves the level statuses of a ModelResource, which are stored as
+    integer codes, as their status strings.
+    """
+
+    @classmethod
+    def api_field_from_django_field(cls, f, default=fields.CharField):
+        if isinstance(f, LevelStatusField):
+            return fields.CharField
+        return super(LevelStatusFieldsMixin, cls).api_field_from_django_field(f, default)
+
+
+class ElectionResource(CachedResponseMixin, SparseFieldsMixin,
+        LevelStatusFieldsMixin, ModelResource):
 
     organization = fields.ForeignKey(OrganizationResource,'organization', full=True)
     state = fields.ForeignKey(StateResource, 'state', full=True)
 
     class Meta:
+        # Expanded organization and state are joined by SparseFieldsMixin
         queryset = Election.objects.all()
         allowed_methods = ['get']
+        paginator_class = KeysetPaginator
         excludes = [
             'created',
             'modified',
@@ -48,8 +334,12 @@ class ElectionResource(ModelResource):
             'level_note',
             'note',
             'needs_review',
+            'offices_mask',
+            'best_level_status',
+            'key',
         ]
         filtering = {
+            'slug': ['exact', 'in'],
             'state': ALL_WITH_RELATIONS,
             'organization': ALL_WITH_RELATIONS,
             'race_type': ALL,
@@ -57,7 +347,106 @@ class ElectionResource(ModelResource):
             'end_date': ALL,
         }
 
+    def prepend_urls(self):
+        # Election slugs start with the state's postal code and a date
+        return [
+            url(r"^(?P<resource_name>%s)/(?P<slug>[a-z]{2}-\d{4}-\d{2}-\d{2}-[\w-]+)%s$" % (
+                self._meta.resource_name, trailing_slash()),
+                self.wrap_view('dispatch_detail'), name="api_dispatch_detail_slug"),
+        ]
+
+    def get_cache_versions(self, request, view, kwargs):
+        # Elections embed their organization, so depend on it as well
+        postals = requested_states(request, 'state', 'state__exact',
+            'state__postal', 'state__postal__exact', 'state__postal__iexact')
+        # Slugs start with the postal code of the election's state
+        slugs = []
+        if 'slug' in kwargs:
+            slugs = [kwargs['slug']]
+        elif request.GET.get('slug'):
+            slugs = [request.GET['slug']]
+        elif request.GET.get('slug__in'):
+            slugs = request.GET['slug__in'].split(',')
+        if postals is None and slugs:
+            postals = set(slug.strip()[:2].upper() for slug in slugs)
+        if postals is None:
+            return ALL_STATE_VERSIONS + ('organization',)
+        return ['state:%s' % p for p in postals] + ['organization']
+
+    def get_object_list(self, request):
+        object_list = super(ElectionResource, self).get_object_list(request)
+        selected = None
+        if request is not None:
+            selected = self.get_field_selection(request)[0]
+        if selected is None or 'direct_links' in selected:
+            object_list = object_list.prefetch_related('links')
+        return object_list
+
+    def build_filters(self, filters=None):
+        if filters is None:
+            filters = {}
+        filters = filters.copy()
+        # Look links up through the indexed hub_directlink table
+        links = {}
+        for param, lookup in (('direct_links', 'url'), ('direct_links__host', 'host')):
+            if param in filters:
+                value = filters.get(param)
+                del filters[param]
+                if value:
+                    if lookup == 'host':
+                        links['host'] = value.lower()
+                    else:
+                        links['url_hash'] = DirectLink.hash_url(value)
+                        links['url'] = value
+        # Comma-separated office flags, matched through offices_mask
+        offices = {}
+        for param, match_all in (('offices', False), ('offices__all', True)):
+            if param in filters:
+                value = filters.get(param)
+                del filters[param]
+                if value:
+                    offices[match_all] = value.split(',')
+        orm_filters = super(ElectionResource, self).build_filters(filters)
+        if links:
+            orm_filters['pk__in'] = DirectLink.objects.filter(**links).values('election')
+        for match_all, names in offices.items():
+            try:
+                q = Election.offices_q(names, match_all=match_all)
+            except ValueError as e:
+                raise InvalidFilterError(str(e))
+            orm_filters.setdefault('offices_q', []).append(q)
+        return orm_filters
+
+    def apply_filters(self, request, applicable_filters):
+        return self.filter_object_list(self.get_object_list(request), applicable_filters)
+
+    def filter_object_list(self, object_list, applicable_filters):
+        """Filters ``object_list`` with the output of build_filters"""
+        applicable_filters = applicable_filters.copy()
+        offices_q = applicable_filters.pop('offices_q', [])
+        return object_list.filter(*offices_q).filter(**applicable_filters)
+
     def dehydrate_direct_links(self, bundle):
-        urls = re.sub(r'\n+', "\n", bundle.data['direct_links'].replace('\r', '')).split("\n")
-        bundle.data['direct_links'] = [url for url in urls if url.strip()]
-        return bundle.data['direct_links']
+        return [link.url for link in bundle.obj.links.all()]
+
+    def get_export_fields(self):
+        """
+        Returns ``(name, attname)`` pairs for the resource fields that map
+        to a column of hub_election, in resource field order.
+
+        Related fields are exported as the raw foreign key value.
+        """
+        opts = self._meta.object_class._meta
+        export_fields = []
+        for name, field_object in self.fields.items():
+            attribute = field_object.attribute
+            if not isinstance(attribute, basestring) or '__' in attribute:
+                continue
+            try:
+                model_field = opts.get_field(attribute)
+            except FieldDoesNotExist:
+                continue
+            if model_field in opts.many_to_many:
+                continue
+            export_fields.append((name, model_field.attname))
+        return export_fields
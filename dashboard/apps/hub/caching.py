@@ -0,0 +1,66 @@
+"""
+Version counters for invalidating cached responses.
+
+Cached responses are stored under keys that include the current version
+of every piece of data they were built from.  Changing the data bumps
+its version, which makes the old entries unreachable; they then simply
+age out of the cache.
+
+Versions are named with strings such as ``state:MD`` (a state and its
+elections), ``organization`` (all organizations) or ``election_facets``
+(the choices of the election list filters).
+"""
+import time
+
+from django.contrib.localflavor.us.us_states import US_STATES
+from django.core.cache import cache
+
+VERSION_KEY = 'hub:version:%s'
+# Memcached's longest relative expiry time
+VERSION_TIMEOUT = 60 * 60 * 24 * 30
+
+# Version of the ElectionAdmin list filter choices. See facets.py
+ELECTION_FACETS_VERSION = 'election_facets'
+
+# Version names covering every state's elections
+ALL_STATE_VERSIONS = tuple('state:%s' % postal for postal, name in US_STATES)
+
+
+def _new_version():
+    # Use the clock rather than starting over at 1, so that a version that
+    # was evicted from the cache never repeats an earlier value
+    return int(time.time() * 1000)
+
+
+def get_versions(names):
+    """
+    Returns a dict mapping each of the given version names to its current
+    version, in a single cache round trip.
+    """
+    keys = dict((VERSION_KEY % name, name) for name in names)
+    found = cache.get_many(keys.keys())
+    versions = {}
+    for key, name in keys.items():
+        version = found.get(key)
+        if version is None:
+            version = _new_version()
+            cache.add(key, version, VERSION_TIMEOUT)
+            # Another process may have initialized the version first
+            version = cache.get(key, version)
+        versions[name] = version
+    return versions
+
+
+def bump_versions(names):
+    """Invalidates everything cached under the given version names"""
+    for name in names:
+        key = VERSION_KEY % name
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Not in the cache yet (or evicted)
+            cache.set(key, _new_version(), VERSION_TIMEOUT)
+
+
+def state_version_names(postals):
+    return ['state:%s' % postal for postal in set(postals) if postal]
@@ -0,0 +1,57 @@
+"""
+Cached choices, with counts, for the ElectionAdmin list filters.
+
+Building these lists takes a grouped scan of hub_election each, so they
+are computed once and cached under the ``election_facets`` version,
+which is bumped whenever an election (or a user, whose name labels the
+proofed_by choices) is saved or deleted.
+"""
+from django.core.cache import cache
+from django.db.models import Count
+
+from caching import ELECTION_FACETS_VERSION, get_versions
+from models import Election, ProxyUser
+
+FACETS_KEY = 'hub:election_facets:%s'
+FACETS_TIMEOUT = 60 * 60 * 24
+
+
+def compute_election_facets():
+    """
+    Returns a dict mapping each faceted field of Election to a list of
+    ``(value, label, count)`` tuples, ordered by label.
+
+    ``users`` holds ``(pk, label)`` choices for every user who could be
+    picked as proofed_by.
+    """
+    elections = Election.objects.order_by()
+    facets = {}
+
+    facets['user_fullname'] = [(name, name, count) for name, count in
+        elections.values_list('user_fullname').annotate(Count('pk'))
+        .order_by('user_fullname')]
+
+    proofers = (elections.exclude(proofed_by=None)
+        .values_list('proofed_by', 'proofed_by__last_name', 'proofed_by__first_name')
+        .annotate(Count('pk')).order_by('proofed_by__last_name', 'proofed_by__first_name'))
+    # Labeled like ProxyUser.__unicode__
+    facets['proofed_by'] = [(pk, u'%s, %s' % (last_name, first_name), count)
+        for pk, last_name, first_name, count in proofers]
+
+    facets['users'] = [(user.pk, unicode(user)) for user in
+        ProxyUser.objects.only('first_name', 'last_name')]
+
+    facets['state'] = list(elections.values_list('state', 'state__name')
+        .annotate(Count('pk')).order_by('state__name'))
+    return facets
+
+
+def get_election_facets():
+    """Returns the cached compute_election_facets()"""
+    version = get_versions([ELECTION_FACETS_VERSION])[ELECTION_FACETS_VERSION]
+    key = FACETS_KEY % version
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_election_facets()
+        cache.set(key, facets, FACETS_TIMEOUT)
+    return facets
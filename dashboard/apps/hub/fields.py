@@ -0,0 +1,63 @@
+from django.db import models
+
+# Database codes of the reporting level statuses, in order of how
+# complete the results are, so that the best status of an election is
+# the one with the highest code
+LEVEL_STATUS_CODES = (
+    ('', 0),
+    ('no', 1),
+    ('Unavailable', 2),
+    ('unknown', 3),
+    ('yes', 4),
+    ('baked-raw', 5),
+    ('baked', 6),
+)
+
+
+class LevelStatusField(models.PositiveSmallIntegerField):
+    """
+    A reporting level status such as ``'baked'``, stored as its small
+    integer code from LEVEL_STATUS_CODES.
+
+    Model instances, forms and lookups use the status strings.  Only
+    ``values()`` and ``values_list()`` return the raw codes, which
+    ``status()`` turns back into strings.
+    """
+    __metaclass__ = models.SubfieldBase
+
+    STATUSES = dict((code, status) for status, code in LEVEL_STATUS_CODES)
+    CODES = dict(LEVEL_STATUS_CODES)
+
+    @classmethod
+    def code(cls, status):
+        """Returns the code of a status string"""
+        try:
+            return cls.CODES[status]
+        except KeyError:
+            raise ValueError("Unknown level status: %r" % (status,))
+
+    @classmethod
+    def status(cls, code):
+        """Returns the status string of a code"""
+        try:
+            return cls.STATUSES[code]
+        except KeyError:
+            raise ValueError("Unknown level status code: %r" % (code,))
+
+    def to_python(self, value):
+        if isinstance(value, (int, long)):
+            return self.status(value)
+        return value
+
+    def get_prep_value(self, value):
+        if value is None or isinstance(value, (int, long)):
+            return value
+        return self.code(value)
+
+
+try:
+    from south.modelsinspector import add_introspection_rules
+except ImportError:
+    pass
+else:
+    add_introspection_rules([], [r'^dashboard\.apps\.hub\.fields\.LevelStatusField'])
@@ -0,0 +1,191 @@
+from django import forms
+from django.core.urlresolvers import reverse
+from django.db.models.fields import BLANK_CHOICE_DASH
+from django.forms.models import BaseInlineFormSet, BaseModelFormSet
+from django.utils.html import format_html
+
+from models import Election, Organization, ProxyUser
+
+
+class OrganizationAutocompleteWidget(forms.HiddenInput):
+    """
+    Organization picker that searches organizations over AJAX instead of
+    rendering a <select> of every organization.
+
+    The organization id goes in a hidden input, followed by a text input
+    showing the organization's name.  See organization_autocomplete.js and
+    OrganizationAdmin.autocomplete_view.  Searches are limited to ``state``
+    first, if it is given.
+
+    Set ``label`` to the organization's name before rendering to save a
+    query per widget.
+    """
+    is_hidden = False
+
+    def __init__(self, state=None, attrs=None):
+        super(OrganizationAutocompleteWidget, self).__init__(attrs)
+        self.state = state
+        self.label = None
+
+    def label_for_value(self, value):
+        if self.label is not None:
+            return self.label
+        try:
+            return unicode(Organization.objects.get(pk=value))
+        except (ValueError, Organization.DoesNotExist):
+            return ''
+
+    def render(self, name, value, attrs=None):
+        attrs = dict(attrs or {})
+        attrs['class'] = 'organization-autocomplete'
+        attrs['data-state'] = self.state or ''
+        hidden = super(OrganizationAutocompleteWidget, self).render(name, value, attrs)
+        return hidden + format_html(
+            '<input type="text" id="{0}-autocomplete" class="vTextField organization-autocomplete-label" '
+            'value="{1}" data-url="{2}" placeholder="Type to search organizations" />',
+            attrs.get('id', name),
+            self.label_for_value(value) if value else '',
+            reverse('admin:hub_organization_autocomplete'))
+
+
+class SharedChoicesMixin(object):
+    """
+    Keeps the choices of a ModelChoiceField that were evaluated into a
+    list (``field.choices = field.choices``) when the field is copied.
+
+    Each form of a formset gets a copy of the field, and
+    ModelChoiceField's copies would otherwise query their choices again.
+    """
+
+    def __deepcopy__(self, memo):
+        return forms.ChoiceField.__deepcopy__(self, memo)
+
+
+class SharedChoicesModelChoiceField(SharedChoicesMixin, forms.ModelChoiceField):
+    pass
+
+
+class SharedChoicesModelMultipleChoiceField(SharedChoicesMixin, forms.ModelMultipleChoiceField):
+    pass
+
+
+class OrganizationLabelsMixin(object):
+    """
+    Gives each OrganizationAutocompleteWidget of a ModelForm the name of
+    the instance's current organization, which saves a query per form if
+    the organization was selected along with the instance.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(OrganizationLabelsMixin, self).__init__(*args, **kwargs)
+        if self.is_bound:
+            return
+        for name, field in self.fields.items():
+            # The admin wraps the widget to add its "add another" link
+            widget = getattr(field.widget, 'widget', field.widget)
+            if not isinstance(widget, OrganizationAutocompleteWidget):
+                continue
+            organization = None
+            if getattr(self.instance, '%s_id' % name, None):
+                organization = getattr(self.instance, name)
+            widget.label = unicode(organization) if organization else ''
+
+
+class DeferredUniqueChecksMixin(object):
+    """
+    Lets a formset run the unique checks of all of its forms at once.  See
+    BatchedUniqueChecksFormSetMixin.
+    """
+    defer_unique_checks = False
+
+    def validate_unique(self):
+        if not self.defer_unique_checks:
+            return super(DeferredUniqueChecksMixin, self).validate_unique()
+        # The formset runs the checks once every form has been cleaned
+        self.unique_checks_deferred = True
+
+
+class BatchedUniqueChecksFormSetMixin(object):
+    """
+    Runs the unique checks of the forms of an Election formset with a
+    single query, instead of a query per form.
+
+    The errors are the same, and are added to the same forms, as when each
+    form runs its own checks, once the formset has been validated.
+    """
+
+    def _construct_form(self, i, **kwargs):
+        form = super(BatchedUniqueChecksFormSetMixin, self)._construct_form(i, **kwargs)
+        form.defer_unique_checks = True
+        return form
+
+    def clean(self):
+        # Ahead of the formset's own unique checks between forms, which
+        # skip the forms that are invalid
+        self.perform_deferred_unique_checks()
+        super(BatchedUniqueChecksFormSetMixin, self).clean()
+
+    def perform_deferred_unique_checks(self):
+        forms = []
+        batch = []
+        for form in self.forms:
+            if not getattr(form, 'unique_checks_deferred', False):
+                continue
+            unique_checks, date_checks = form.instance._get_unique_checks(
+                exclude=form._get_validation_exclusions())
+            forms.append((form, date_checks))
+            batch.append((form.instance, unique_checks))
+        errors_list = Election.perform_unique_checks_batch(batch)
+        for (form, date_checks), errors in zip(forms, errors_list):
+            for key, messages in form.instance._perform_date_checks(date_checks).items():
+                errors.setdefault(key, []).extend(messages)
+            if errors:
+                form._update_errors(errors)
+            form.unique_checks_deferred = False
+
+
+class BaseElectionInlineFormSet(BatchedUniqueChecksFormSetMixin, BaseInlineFormSet):
+    pass
+
+
+class BaseElectionModelFormSet(BatchedUniqueChecksFormSetMixin, BaseModelFormSet):
+    pass
+
+
+class ElectionAdminForm(DeferredUniqueChecksMixin, OrganizationLabelsMixin, forms.ModelForm):
+    """ModelForm for elections in the admin"""
+
+
+class LogAdminForm(OrganizationLabelsMixin, forms.ModelForm):
+    """ModelForm for logs in the admin"""
+
+
+class ElectionUpdateForm(forms.Form):
+    """
+    Base form for the ElectionAdmin actions that set a field on all of the
+    selected elections.  See ElectionAdmin.update_selected.
+    """
+
+    def get_values(self):
+        """Returns the field values to set, from the cleaned data"""
+        return self.cleaned_data
+
+
+class LevelStatusUpdateForm(ElectionUpdateForm):
+    level = forms.ChoiceField(choices=[(field.name, field.verbose_name)
+        for field in Election._meta.fields if field.name.endswith('_level_status')])
+    status = forms.ChoiceField(choices=BLANK_CHOICE_DASH + list(Election.LEVEL_STATUS_CHOICES),
+        required=False)
+
+    def get_values(self):
+        return {self.cleaned_data['level']: self.cleaned_data['status']}
+
+
+class ProofedByUpdateForm(ElectionUpdateForm):
+    proofed_by = forms.ModelChoiceField(ProxyUser.objects.all(), required=False,
+        empty_label='(Nobody)')
+
+
+class NeedsReviewUpdateForm(ElectionUpdateForm):
+    needs_review = forms.CharField(widget=forms.Textarea, required=False,
+        help_text="Leave blank to clear the notes.")
@@ -1,10 +1,30 @@
+from optparse import make_option
+
 from django.core.management.base import BaseCommand
 
 from dashboard.apps.hub.models import State
+from dashboard.lib.files import write_if_changed
 
 class Command(BaseCommand):
     help = ("Creates a json file of the project status of each state to be "
             "consumed be the front-end website.")
+    option_list = BaseCommand.option_list + (
+        make_option('--output',
+            dest='output',
+            default=None,
+            help=("Atomically write the JSON, and a gzipped copy with a .gz "
+                  "extension, to this path instead of stdout. The files are "
+                  "left untouched if their content has not changed.")),
+    )
 
     def handle(self, *args, **options):
-        self.stdout.write(State.objects.status_json())
+        if not options['output']:
+            self.stdout.write(State.objects.status_json())
+            return
+
+        digest, changed = write_if_changed(options['output'],
+            State.objects.iter_status_json())
+        if changed:
+            self.stdout.write("Wrote %s (sha1 %s)" % (options['output'], digest))
+        else:
+            self.stdout.write("%s is unchanged (sha1 %s)" % (options['output'], digest))
@@ -0,0 +1,39 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.apps.hub.results_metadata import export_results_metadata
+
+class Command(BaseCommand):
+    args = '<output_dir>'
+    help = ("Writes the per-state metadata and per-state, per-year elections "
+            "files described in docs/results.md to a directory. Only the "
+            "files of state years whose elections changed since the last "
+            "export are rendered again.")
+    option_list = BaseCommand.option_list + (
+        make_option('--processes',
+            dest='processes',
+            type='int',
+            default=None,
+            help=("Number of worker processes rendering states in parallel. "
+                  "Defaults to the number of CPUs; 1 renders everything in "
+                  "this process.")),
+        make_option('--force',
+            action='store_true',
+            dest='force',
+            default=False,
+            help="Render every file, even if its elections are unchanged."),
+    )
+
+    def handle(self, *args, **options):
+        if len(args) != 1:
+            raise CommandError("Usage: export_results_metadata %s" % self.args)
+
+        result = export_results_metadata(args[0],
+            processes=options['processes'], force=options['force'])
+        for path in result['written']:
+            self.stdout.write("Wrote %s" % path)
+        for path in result['removed']:
+            self.stdout.write("Removed %s" % path)
+        self.stdout.write("%d file(s) written, %d removed, %d state year(s) unchanged" % (
+            len(result['written']), len(result['removed']), result['skipped']))
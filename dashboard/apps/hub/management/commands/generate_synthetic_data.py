@@ -0,0 +1,48 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.apps.hub.synthetic import SyntheticDataGenerator
+
+class Command(BaseCommand):
+    help = ("Adds a seeded, random dataset of states, organizations, contacts, "
+            "volunteers, logs and elections to the database, for load testing "
+            "and benchmarks. Don't run it against production data.")
+    option_list = BaseCommand.option_list + (
+        make_option('--seed', dest='seed', type='int', default=0,
+            help="Random seed. The same seed generates the same data."),
+        make_option('--elections', dest='elections', type='int', default=10000,
+            help="Number of elections, spread evenly over the states and years."),
+        make_option('--years', dest='years', type='int', default=40,
+            help="Number of years of elections."),
+        make_option('--end-year', dest='end_year', type='int', default=2014,
+            help="Last year of elections."),
+        make_option('--counties', dest='counties', type='int', default=10,
+            help="Number of county organizations per state."),
+        make_option('--users', dest='users', type='int', default=20,
+            help="Number of staff users entering and proofing elections."),
+        make_option('--volunteers', dest='volunteers', type='int', default=200,
+            help="Number of volunteers."),
+        make_option('--logs', dest='logs', type='int', default=2000,
+            help="Number of FOIA logs."),
+        make_option('--chunk-size', dest='chunk_size', type='int', default=1000,
+            help="Number of rows inserted per transaction."),
+    )
+
+    def handle(self, *args, **options):
+        verbosity = int(options['verbosity'])
+        log = None
+        if verbosity > 1:
+            log = lambda message: self.stdout.write(message)
+        generator = SyntheticDataGenerator(seed=options['seed'],
+            elections=options['elections'], years=options['years'],
+            end_year=options['end_year'], counties=options['counties'],
+            users=options['users'], volunteers=options['volunteers'],
+            logs=options['logs'], chunk_size=options['chunk_size'], log=log)
+        try:
+            generator.validate()
+        except ValueError as e:
+            raise CommandError(str(e))
+        counts = generator.generate()
+        for name, count in sorted(counts.items()):
+            self.stdout.write("Created %d %s row(s)" % (count, name))
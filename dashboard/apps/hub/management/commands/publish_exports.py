@@ -0,0 +1,46 @@
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.lib.publish import get_backend, publish
+
+class Command(BaseCommand):
+    args = '<source_dir>'
+    help = ("Publishes the exported files in a directory, such as the output "
+            "of create_status_json and export_results_metadata, uploading "
+            "only the files that changed since the last publish and deleting "
+            "the ones that disappeared.")
+    option_list = BaseCommand.option_list + (
+        make_option('--target',
+            dest='target',
+            default=None,
+            help=("URL to publish to, such as file:///var/www/exports or "
+                  "s3://bucket/prefix. Defaults to settings.HUB_PUBLISH_TARGET.")),
+        make_option('--concurrency',
+            dest='concurrency',
+            type='int',
+            default=8,
+            help="Maximum number of files uploaded or deleted at a time."),
+        make_option('--dry-run',
+            action='store_true',
+            dest='dry_run',
+            default=False,
+            help="Print what would be published without publishing it."),
+    )
+
+    def handle(self, *args, **options):
+        if len(args) != 1:
+            raise CommandError("Usage: publish_exports %s" % self.args)
+        target = options['target'] or getattr(settings, 'HUB_PUBLISH_TARGET', None)
+        if not target:
+            raise CommandError("No target given, and HUB_PUBLISH_TARGET is not set")
+        try:
+            backend = get_backend(target)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        diff = publish(args[0], backend, concurrency=options['concurrency'],
+            dry_run=options['dry_run'])
+        for line in diff.lines():
+            self.stdout.write(line)
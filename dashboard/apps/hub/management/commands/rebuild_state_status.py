@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.apps.hub.models import State
+
+class Command(BaseCommand):
+    help = ("Recomputes the denormalized results status, election count and "
+            "volunteer counts of every state.")
+
+    def handle(self, *args, **options):
+        changed = State.objects.rebuild_status()
+        self.stdout.write("Updated status for %d state(s)" % changed)
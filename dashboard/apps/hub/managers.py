@@ -1,7 +1,126 @@
+import datetime
 import json
 
 from django.db import models
+from django.db.models import Count, Max
+
+from caching import bump_versions, state_version_names
 
 class StateManager(models.Manager):
     def status_json(self):
-        return json.dumps([s.status_entry() for s in self.all()])
+        return ''.join(self.iter_status_json())
+
+    def iter_status_json(self):
+        """
+        Yields the status JSON in chunks, encoding one state entry at a
+        time.
+
+        Joining the chunks gives the same string as
+        ``json.dumps(self.status_entries())``.
+        """
+        encoder = json.JSONEncoder()
+        yield '['
+        for i, entry in enumerate(self.iter_status_entries()):
+            if i:
+                yield ', '
+            for chunk in encoder.iterencode(entry):
+                yield chunk
+        yield ']'
+
+    def status_entries(self):
+        """
+        Returns a list of status entries, one per state, equivalent to
+        calling ``State.status_entry()`` on each state.
+
+        The entries are built from a fixed number of queries, regardless
+        of the number of states.
+        """
+        return list(self.iter_status_entries())
+
+    def iter_status_entries(self):
+        for state in self.prefetch_related('volunteer_set__roles'):
+            volunteers = state.volunteer_set.all()
+            dev_volunteers = [v for v in volunteers if v.has_role('dev')]
+            metadata_volunteers = [v for v in volunteers if v.has_role('metadata')]
+            yield state.make_status_entry(volunteers, dev_volunteers,
+                metadata_volunteers, state.results_status)
+
+    def status_version(self):
+        """
+        Returns a ``(last_modified, count)`` tuple that changes whenever the
+        output of ``status_json`` may have changed.
+
+        This is a single aggregate query over the states, cheap enough to
+        run on every request for the status JSON.
+        """
+        version = self.aggregate(last_modified=Max('status_updated'),
+            count=Count('pk'))
+        return version['last_modified'], version['count']
+
+    def touch_status(self, postals):
+        """
+        Marks the status entries of the states with the given postal codes
+        as changed.
+        """
+        postals = set(p for p in postals if p)
+        if postals:
+            self.filter(pk__in=postals).update(
+                status_updated=datetime.datetime.now())
+            bump_versions(state_version_names(postals))
+
+    def refresh_status(self, postals):
+        """
+        Recomputes the denormalized status columns for the states with the
+        given postal codes.
+        """
+        postals = set(p for p in postals if p)
+        if not postals:
+            return
+        for state in self.filter(pk__in=postals):
+            state.update_status()
+
+    def rebuild_status(self):
+        """
+        Recomputes the denormalized status columns for every state from a
+        fixed number of grouped queries.
+
+        Returns the number of states whose status changed.
+        """
+        # Imported here to avoid a circular import with models
+        from dashboard.apps.hub.models import ChangeLog, Election, Volunteer
+
+        election_counts = dict(Election.objects.order_by()
+            .values_list('state_id')
+            .annotate(Count('id')))
+
+        volunteer_counts = {}
+        for role in ('dev', 'metadata'):
+            volunteer_counts[role] = dict(Volunteer.states.through.objects
+                .filter(volunteer__roles__slug=role)
+                .order_by()
+                .values_list('state_id')
+                .annotate(Count('volunteer')))
+
+        best_level_statuses = dict(Election.objects.order_by()
+            .values_list('state_id')
+            .annotate(Max('best_level_status')))
+
+        changed = 0
+        for state in self.all():
+            status = {
+                'results_status': self.model.results_status_for(
+                    best_level_statuses.get(state.postal)),
+                'election_count': election_counts.get(state.postal, 0),
+                'dev_volunteer_count': volunteer_counts['dev'].get(state.postal, 0),
+                'metadata_volunteer_count': volunteer_counts['metadata'].get(state.postal, 0),
+            }
+            if status['results_status'] is None and status['dev_volunteer_count']:
+                status['results_status'] = 'partial'
+            if any(getattr(state, k) != v for k, v in status.items()):
+                status['status_updated'] = datetime.datetime.now()
+                self.filter(pk=state.pk).update(**status)
+                if status['results_status'] != state.results_status:
+                    ChangeLog.record(self.model, [state.pk], 'save')
+                bump_versions(state_version_names([state.pk]))
+                changed += 1
+        return changed
@@ -0,0 +1,148 @@
+"""
+Counts the SQL queries and database time of each request.
+
+QueryCountMiddleware is opt-in.  Add it at the top of MIDDLEWARE_CLASSES,
+so that the queries of the other middleware are counted as well.  Each
+response is logged at DEBUG level to the ``dashboard.queries`` logger,
+along with:
+
+* a warning for each response whose view ran more queries than its
+  budget in ``settings.HUB_QUERY_BUDGETS``;
+* every ``settings.HUB_QUERY_STATS_INTERVAL`` requests, the views that
+  ran the most queries so far in this process, at INFO level.
+
+Views are named by view_name().  Queries run while a streaming response
+is being consumed, after the middleware is done, are not counted.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.core.urlresolvers import resolve
+from django.db import connections
+
+logger = logging.getLogger('dashboard.queries')
+
+
+def view_name(resolver_match):
+    """
+    Returns the name of a resolved view that budgets are keyed on, such as
+    ``admin:hub_state_changelist`` or ``status_json``.
+
+    The views of tastypie resources are shared by every resource, so the
+    resource name is appended to them, as in ``api_dispatch_list:election``.
+    """
+    name = resolver_match.view_name
+    resource_name = resolver_match.kwargs.get('resource_name')
+    if resource_name:
+        name = '%s:%s' % (name, resource_name)
+    return name
+
+
+def view_name_for_path(path):
+    return view_name(resolve(path))
+
+
+def query_budget(name):
+    """Returns the query budget of a view, or None if it has none"""
+    return getattr(settings, 'HUB_QUERY_BUDGETS', {}).get(name)
+
+
+class QueryCounter(object):
+    """
+    Counts the queries run on every database connection, raw cursors
+    included, between start() and stop(), whether DEBUG is on or not.
+
+    Also usable as a context manager.
+    """
+
+    def start(self):
+        self.count = 0
+        self.time = 0.0
+        self._connections = []
+        for connection in connections.all():
+            self._connections.append((connection, connection.use_debug_cursor,
+                len(connection.queries)))
+            # The debug cursor is what records connection.queries
+            connection.use_debug_cursor = True
+        return self
+
+    def stop(self):
+        for connection, use_debug_cursor, start in self._connections:
+            queries = connection.queries[start:]
+            self.count += len(queries)
+            self.time += sum(float(query['time']) for query in queries)
+            connection.use_debug_cursor = use_debug_cursor
+            if not (use_debug_cursor or settings.DEBUG):
+                # Don't hold on to the SQL of every query of the request
+                del connection.queries[start:]
+        self._connections = []
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+class QueryStats(object):
+    """Per-view query totals of the requests served by this process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.views = {}
+
+    def add(self, name, count, time):
+        with self.lock:
+            self.requests += 1
+            stats = self.views.setdefault(name, {
+                'requests': 0, 'queries': 0, 'max_queries': 0, 'time': 0.0})
+            stats['requests'] += 1
+            stats['queries'] += count
+            stats['max_queries'] = max(stats['max_queries'], count)
+            stats['time'] += time
+            return self.requests
+
+    def top(self, n=10):
+        """Returns ``(name, stats)`` for the n views with the most queries"""
+        with self.lock:
+            return sorted(((name, dict(stats)) for name, stats in self.views.items()),
+                key=lambda item: item[1]['queries'], reverse=True)[:n]
+
+
+class QueryCountMiddleware(object):
+
+    def __init__(self):
+        self.stats = QueryStats()
+
+    def process_request(self, request):
+        request._query_counter = QueryCounter().start()
+
+    def process_response(self, request, response):
+        counter = getattr(request, '_query_counter', None)
+        if counter is None:
+            return response
+        counter.stop()
+        resolver_match = getattr(request, 'resolver_match', None)
+        name = view_name(resolver_match) if resolver_match else None
+        logger.debug("%s %s (%s): %d queries in %.1f ms", request.method,
+            request.path, name, counter.count, counter.time * 1000)
+        if name is None:
+            return response
+
+        budget = query_budget(name)
+        if budget is not None and counter.count > budget:
+            logger.warning("%s ran %d queries, over its budget of %d, in %.1f ms (%s %s)",
+                name, counter.count, budget, counter.time * 1000,
+                request.method, request.get_full_path())
+
+        requests = self.stats.add(name, counter.count, counter.time)
+        interval = getattr(settings, 'HUB_QUERY_STATS_INTERVAL', 1000)
+        if interval and requests % interval == 0:
+            for name, stats in self.stats.top():
+                logger.info("%s: %d queries in %d requests (at most %d), %.1f ms",
+                    name, stats['queries'], stats['requests'], stats['max_queries'],
+                    stats['time'] * 1000)
+        return response
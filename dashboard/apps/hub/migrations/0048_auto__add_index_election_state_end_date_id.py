@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+import datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Adding index on 'Election', fields ['state', 'end_date', u'id']
+        db.create_index(u'hub_election', ['state_id', 'end_date', u'id'])
+
+
+    def backwards(self, orm):
+        # Removing index on 'Election', fields ['state', 'end_date', u'id']
+        db.delete_index(u'hub_election', ['state_id', 'end_date', u'id'])
+
+
+    models = {
+        u'auth.group': {
+            'Meta': {'object_name': 'Group'},
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '80'}),
+            'permissions': ('django.db.models.fields.related.ManyToManyField', [], {'to': u"orm['auth.Permission']", 'symmetrical': 'False', 'blank': 'True'})
+        },
+        u'auth.permission': {
+            'Meta': {'ordering': "(u'content_type__app_label', u'content_type__model', u'codename')", 'unique_together': "((u'content_type', u'codename'),)", 'object_name': 'Permission'},
+            'codename': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'content_type': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['contenttypes.ContentType']"}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '50'})
+        },
+        u'auth.user': {
+            'Meta': {'object_name': 'User'},
+            'date_joined': ('django.db.models.fields.DateTimeField', [], {'default': 'datetime.datetime.now'}),
+            'email': ('django.db.models.fields.EmailField', [], {'max_length': '75', 'blank': 'True'}),
+            'first_name': ('django.db.models.fields.CharField', [], {'max_length': '30', 'blank': 'True'}),
+            'groups': ('django.db.models.fields.related.ManyToManyField', [], {'to': u"orm['auth.Group']", 'symmetrical': 'False', 'blank': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'is_active': ('django.db.models.fields.BooleanField', [], {'default': 'True'}),
+            'is_staff': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'is_superuser': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'last_login': ('django.db.models.fields.DateTimeField', [], {'default': 'datetime.datetime.now'}),
+            'last_name': ('django.db.models.fields.CharField', [], {'max_length': '30', 'blank': 'True'}),
+            'password': ('django.db.models.fields.CharField', [], {'max_length': '128'}),
+            'user_permissions': ('django.db.models.fields.related.ManyToManyField', [], {'to': u"orm['auth.Permission']", 'symmetrical': 'False', 'blank': 'True'}),
+            'username': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '30'})
+        },
+        u'contenttypes.contenttype': {
+            'Meta': {'ordering': "('name',)", 'unique_together': "(('app_label', 'model'),)", 'object_name': 'ContentType', 'db_table': "'django_content_type'"},
+            'app_label': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'model': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '100'})
+        },
+        u'hub.contact': {
+            'Meta': {'ordering': "['last_name']", 'object_name': 'Contact'},
+            'email': ('django.db.models.fields.EmailField', [], {'max_length': '254', 'blank': 'True'}),
+            'first_name': ('django.db.models.fields.CharField', [], {'max_length': '30'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'last_name': ('django.db.models.fields.CharField', [], {'max_length': '70'}),
+            'middle_name': ('django.db.models.fields.CharField', [], {'max_length': '30', 'blank': 'True'}),
+            'mobile': ('django.contrib.localflavor.us.models.PhoneNumberField', [], {'max_length': '20', 'blank': 'True'}),
+            'note': ('django.db.models.fields.TextField', [], {'blank': 'True'}),
+            'org': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['hub.Organization']"}),
+            'phone': ('django.contrib.localflavor.us.models.PhoneNumberField', [], {'max_length': '20', 'blank': 'True'}),
+            'title': ('django.db.models.fields.CharField', [], {'max_length': '70', 'blank': 'True'})
+        },
+        u'hub.dataformat': {
+            'Meta': {'ordering': "['name']", 'object_name': 'DataFormat'},
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '10'}),
+            'slug': ('django.db.models.fields.SlugField', [], {'max_length': '50', 'primary_key': 'True'})
+        },
+        u'hub.election': {
+            'Meta': {'ordering': "['state', '-end_date', 'race_type']", 'unique_together': "(('organization', 'race_type', 'end_date', 'state', 'special'),)", 'object_name': 'Election', 'index_together': "[['state', 'end_date', 'id']]"},
+            'absentee_and_provisional': ('django.db.models.fields.BooleanField', [], {'default': 'False', 'db_index': 'True'}),
+            'cong_dist_level': ('django.db.models.fields.BooleanField', [], {'default': 'False', 'db_index': 'True'}),
+            'cong_dist_level_status': ('django.db.models.fields.CharField', [], {'default': "''", 'max_length': "'30'", 'db_index': 'True', 'blank': 'True'}),
+            'county_level': ('django.db.models.fields.BooleanField', [], {'default': 'False', 'db_index': 'True'}),
+            'county_level_status': ('django.db.models.fields.CharField', [], {'default': "''", 'max_length': "'30'", 'db_index': 'True', 'blank': 'True'}),
+            'created': ('django.db.models.fields.DateTimeField', [], {}),
+            'direct_link': ('django.db.models.fields.URLField', [], {'max_length': '200', 'blank': 'True'}),
+            'direct_links': ('django.db.models.fields.TextField', [], {'blank': 'True'}),
+            'end_date': ('django.db.models.fields.DateField', [], {'db_index': 'True', 'blank': 'True'}),
+            'formats': ('django.db.models.fields.related.ManyToManyField', [], {'to': u"orm['hub.DataFormat']", 'symmetrical': 'False'}),
+            'gov': ('django.db.models.fields.BooleanField', [], {'default': 'False', 'db_index': 'True'}),
+            'house': ('django.db.models.fields.BooleanField', [], {'default': 'False', 'db_index': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'level_note': ('django.db.models.fields.TextField', [], {'blank': 'True'}),
+            'modified': ('django.db.models.fields.DateTimeField', [], {}),
+            'needs_review': ('django.db.models.fields.TextField', [], {'blank': 'True'}),
+            'note': ('django.db.models.fields.TextField', [], {'blank': 'True'}),
+            'organization': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['hub.Organization']", 'null': 'True'}),
+            'portal_link': ('django.db.models.fields.URLField', [], {'max_length': '200', 'blank': 'True'}),
+            'precinct_level': ('django.db.models.fields.BooleanField', [], {'default': 'False', 'db_index': 'True'}),
+            'precinct_level_status': ('django.db.models.fields.CharField', [], {'default': "''", 'max_length': "'30'", 'db_index': 'True', 'blank': 'True'}),
+            'prez': ('django.db.models.fields.BooleanField', [], {'default': 'False', 'db_index': 'True'}),
+            'primary_note': ('django.db.models.fields.TextField', [], {'blank': 'True'}),
+            'primary_type': ('django.db.models.fields.CharField', [], {'default': "''", 'max_length': '15', 'db_index': 'True', 'blank': 'True'}),
+            'proofed_by': ('django.db.models.fields.related.ForeignKey', [], {'blank': 'True', 'related_name': "'proofer'", 'null': 'True', 'to': u"orm['auth.User']"}),
+            'race_type': ('django.db.models.fields.CharField', [], {'max_length': '15', 'db_index': 'True'}),
+            'result_type': ('django.db.models.fields.CharField', [], {'max_length': '10'}),
+            'senate': ('django.db.models.fields.BooleanField', [], {'default': 'False', 'db_index': 'True'}),
+            'special': ('django.db.models.fields.BooleanField', [], {'default': 'False', 'db_index': 'True'}),
+            'start_date': ('django.db.models.fields.DateField', [], {'db_index': 'True'}),
+            'state': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['hub.State']"}),
+            'state_leg': ('django.db.models.fields.BooleanField', [], {'default': 'False', 'db_index': 'True'}),
+            'state_leg_level': ('django.db.models.fields.BooleanField', [], {'default': 'False', 'db_index': 'True'}),
+            'state_leg_level_status': ('django.db.models.fields.CharField', [], {'default': "''", 'max_length': "'30'", 'db_index': 'True', 'blank': 'True'}),
+            'state_level': ('django.db.models.fields.BooleanField', [], {'default': 'False', 'db_index': 'True'}),
+            'state_level_status': ('django.db.models.fields.CharField', [], {'default': "''", 'max_length': "'30'", 'db_index': 'True', 'blank': 'True'}),
+            'state_officers': ('django.db.models.fields.BooleanField', [], {'default': 'False', 'db_index': 'True'}),
+            'user': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['auth.User']"}),
+            'user_fullname': ('django.db.models.fields.CharField', [], {'max_length': '70', 'db_index': 'True'})
+        },
+        u'hub.log': {
+            'Meta': {'ordering': "['-date']", 'object_name': 'Log'},
+            'contact': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['hub.Contact']", 'null': 'True', 'blank': 'True'}),
+            'date': ('django.db.models.fields.DateField', [], {}),
+            'follow_up': ('django.db.models.fields.DateField', [], {'null': 'True', 'blank': 'True'}),
+            'formal_request': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'gdoc_link': ('django.db.models.fields.URLField', [], {'max_length': '200', 'blank': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'notes': ('django.db.models.fields.TextField', [], {'blank': 'True'}),
+            'org': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['hub.Organization']", 'null': 'True', 'blank': 'True'}),
+            'state': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['hub.State']"}),
+            'subject': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'user': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['auth.User']"})
+        },
+        u'hub.office': {
+            'Meta': {'ordering': "['name']", 'object_name': 'Office'},
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '40'}),
+            'slug': ('django.db.models.fields.SlugField', [], {'max_length': '50', 'primary_key': 'True'})
+        },
+        u'hub.organization': {
+            'Meta': {'ordering': "['name']", 'object_name': 'Organization'},
+            'city': ('django.db.models.fields.CharField', [], {'max_length': '75', 'blank': 'True'}),
+            'description': ('django.db.models.fields.TextField', [], {'blank': 'True'}),
+            'fec_page': ('django.db.models.fields.URLField', [], {'max_length': '200', 'blank': 'True'}),
+            'gov_agency': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'gov_level': ('django.db.models.fields.CharField', [], {'max_length': '20', 'blank': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '150'}),
+            'slug': ('django.db.models.fields.SlugField', [], {'max_length': '50'}),
+            'state': ('django.db.models.fields.CharField', [], {'max_length': '2', 'db_index': 'True'}),
+            'street': ('django.db.models.fields.CharField', [], {'max_length': '75', 'blank': 'True'}),
+            'url': ('django.db.models.fields.URLField', [], {'max_length': '200', 'blank': 'True'})
+        },
+        u'hub.state': {
+            'Meta': {'ordering': "['name']", 'object_name': 'State'},
+            'dev_volunteer_count': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'election_count': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'metadata_status': ('django.db.models.fields.CharField', [], {'max_length': '20', 'db_index': 'True'}),
+            'metadata_volunteer_count': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '25'}),
+            'note': ('django.db.models.fields.TextField', [], {'blank': 'True'}),
+            'pain': ('django.db.models.fields.CharField', [], {'default': "''", 'max_length': '15', 'blank': 'True'}),
+            'postal': ('django.db.models.fields.CharField', [], {'max_length': '2', 'primary_key': 'True'}),
+            'results_description': ('django.db.models.fields.TextField', [], {'blank': 'True'}),
+            'results_status': ('django.db.models.fields.CharField', [], {'max_length': '10', 'null': 'True', 'db_index': 'True'}),
+            'status_updated': ('django.db.models.fields.DateTimeField', [], {'null': 'True'})
+        },
+        u'hub.volunteer': {
+            'Meta': {'ordering': "['last_name']", 'object_name': 'Volunteer'},
+            'affil': ('django.db.models.fields.CharField', [], {'max_length': '254', 'blank': 'True'}),
+            'attended_sprint': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'email': ('django.db.models.fields.EmailField', [], {'max_length': '254', 'blank': 'True'}),
+            'first_name': ('django.db.models.fields.CharField', [], {'max_length': '30'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'last_emailed': ('django.db.models.fields.DateField', [], {'null': 'True', 'blank': 'True'}),
+            'last_name': ('django.db.models.fields.CharField', [], {'max_length': '70'}),
+            'middle_name': ('django.db.models.fields.CharField', [], {'max_length': '30', 'blank': 'True'}),
+            'mobile': ('django.contrib.localflavor.us.models.PhoneNumberField', [], {'max_length': '20', 'blank': 'True'}),
+            'note': ('django.db.models.fields.TextField', [], {'blank': 'True'}),
+            'phone': ('django.contrib.localflavor.us.models.PhoneNumberField', [], {'max_length': '20', 'blank': 'True'}),
+            'roles': ('django.db.models.fields.related.ManyToManyField', [], {'to': u"orm['hub.VolunteerRole']", 'symmetrical': 'False'}),
+            'skype': ('django.db.models.fields.CharField', [], {'max_length': '254', 'blank': 'True'}),
+            'states': ('django.db.models.fields.related.ManyToManyField', [], {'to': u"orm['hub.State']", 'symmetrical': 'False', 'blank': 'True'}),
+            'title': ('django.db.models.fields.CharField', [], {'max_length': '70', 'blank': 'True'}),
+            'twitter': ('django.db.models.fields.CharField', [], {'max_length': '254', 'blank': 'True'}),
+            'user': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['auth.User']", 'unique': 'True', 'null': 'True', 'blank': 'True'}),
+            'website': ('django.db.models.fields.CharField', [], {'max_length': '254', 'blank': 'True'})
+        },
+        u'hub.volunteerlog': {
+            'Meta': {'object_name': 'VolunteerLog'},
+            'date': ('django.db.models.fields.DateField', [], {}),
+            'follow_up': ('django.db.models.fields.DateField', [], {'null': 'True', 'blank': 'True'}),
+            'gdoc_link': ('django.db.models.fields.URLField', [], {'max_length': '200', 'blank': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'notes': ('django.db.models.fields.TextField', [], {'blank': 'True'}),
+            'subject': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'user': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['auth.User']"}),
+            'volunteer': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['hub.Volunteer']"})
+        },
+        u'hub.volunteerrole': {
+            'Meta': {'object_name': 'VolunteerRole'},
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '25'}),
+            'slug': ('django.db.models.fields.SlugField', [], {'max_length': '30', 'primary_key': 'True'})
+        }
+    }
+
+    complete_apps = ['hub']
\ No newline at end of file
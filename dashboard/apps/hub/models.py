@@ -1,13 +1,23 @@
 import datetime
+import hashlib
+import operator
+import re
+from urlparse import urlparse
 
 from django.contrib.auth.models import User
 from django.contrib.localflavor.us.models import PhoneNumberField
 from django.contrib.localflavor.us.us_states import US_STATES
 from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
-from django.db import models
+from django.db import models, transaction
 from django.db.models import Q
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+    pre_delete, pre_save)
+from django.dispatch import receiver
 from django.template.defaultfilters import slugify
 
+from caching import (ELECTION_FACETS_VERSION, bump_versions,
+    state_version_names)
+from fields import LevelStatusField
 from managers import StateManager
 
 
@@ -94,6 +104,11 @@ class State(models.Model):
         ('partial', 'Partial'),
         ('up-to-date', 'Up-to-date'),
     )
+    RESULTS_STATUS_CHOICES = (
+        ('partial', 'Partial'),
+        ('raw', 'Raw'),
+        ('clean', 'Clean'),
+    )
     PAIN_CHOICES = (
         ('easy', 'Easy'),
         ('medium', 'Medium'),
@@ -107,6 +122,15 @@ class State(models.Model):
     pain = models.CharField(max_length=15, blank=True, choices=PAIN_CHOICES, default='', help_text="Degree of difficulty for loading a state's results.")
     results_description = models.TextField(blank=True, help_text="Quality and consistency of results over time. E.g., CSV files with consistent formats for all years except 2000 and 2002")
 
+    # Denormalized status, maintained by signal handlers below and rebuilt
+    # with the rebuild_state_status management command
+    results_status = models.CharField(max_length=10, choices=RESULTS_STATUS_CHOICES, null=True, editable=False, db_index=True, help_text="Status of results for state. See State.compute_results_status")
+    election_count = models.PositiveIntegerField(default=0, editable=False)
+    dev_volunteer_count = models.PositiveIntegerField(default=0, editable=False)
+    metadata_volunteer_count = models.PositiveIntegerField(default=0, editable=False)
+    # Last time anything included in the state's status entry changed
+    status_updated = models.DateTimeField(null=True, editable=False)
+
     objects = StateManager()
 
     class Meta:
@@ -118,32 +142,64 @@ class State(models.Model):
     def __repr__(self):
         return '<%s - %s>' % (self.__class__.__name__, self.postal)
 
+    def save(self, *args, **kwargs):
+        self.status_updated = datetime.datetime.now()
+        super(State, self).save(*args, **kwargs)
+
+    # Reporting level status values that mark results as available, most
+    # complete first, along with the state results status each one implies.
+    # These are the highest codes of LEVEL_STATUS_CODES, so a state's
+    # results status follows from the best level status of its elections.
+    RESULTS_STATUSES = (
+        ('baked', 'clean'),
+        ('baked-raw', 'raw'),
+    )
+
     def status_entry(self):
         """
         Returns a dict, suitable for serialization that represents
         the state's completion status.
         """
-        volunteers = [v.status_entry() for v in
-                      self.volunteer_set.all()]
-        dev_volunteers = [v.status_entry() for v in
-            self.volunteer_set.filter(roles__slug="dev")]
-        metadata_volunteers = [v.status_entry() for v in
-            self.volunteer_set.filter(roles__slug="metadata")]
+        return self.make_status_entry(
+            volunteers=self.volunteer_set.all(),
+            dev_volunteers=self.volunteer_set.filter(roles__slug="dev"),
+            metadata_volunteers=self.volunteer_set.filter(roles__slug="metadata"),
+            results_status=self.results_status,
+        )
+
+    def make_status_entry(self, volunteers, dev_volunteers,
+            metadata_volunteers, results_status):
+        """
+        Builds the status entry dict from already-fetched volunteers.
 
+        Shared by ``status_entry`` and ``StateManager.status_entries`` so
+        that both produce identical output.
+        """
         return {
             'name': self.name,
             'postal': self.postal,
             'metadata_status': self.metadata_status,
-            'results_status': self.results_status,
-            'volunteers': volunteers,
-            'dev_volunteers': dev_volunteers,
-            'metadata_volunteers': metadata_volunteers,
+            'results_status': results_status,
+            'volunteers': [v.status_entry() for v in volunteers],
+            'dev_volunteers': [v.status_entry() for v in dev_volunteers],
+            'metadata_volunteers': [v.status_entry() for v in metadata_volunteers],
         }
 
-    @property
-    def results_status(self):
+    @classmethod
+    def results_status_for(cls, best_level_status):
         """
-        The status of results for this state.
+        Returns the results status implied by the best level status code
+        of a state's elections, or None.
+        """
+        for level_status, results_status in cls.RESULTS_STATUSES:
+            if best_level_status == LevelStatusField.code(level_status):
+                return results_status
+        return None
+
+    def compute_results_status(self):
+        """
+        Computes the status of results for this state from its elections
+        and volunteers.
 
         The value can be one of these:
 
@@ -153,25 +209,13 @@ class State(models.Model):
         "clean": Cleaned/transformed results available for at least some
             elections.
         """
-        statuses = (
-            {
-                'in': 'baked',
-                'out': 'clean',
-            },
-            {
-                'in': 'baked-raw',
-                'out': 'raw',
-            },
-        )
         final_status = None
-        # Check if we have any clean or raw results
-        for status in statuses:
-            q = (Q(precinct_level_status=status['in']) | Q(county_level_status=status['in']) |
-                Q(cong_dist_level_status=status['in']) | Q(state_leg_level_status=status['in']) |
-                Q(state_level_status=status['in']))
-
-            if self.election_set.filter(q).exists():
-                final_status = status['out']
+        # Check if we have any clean or raw results. Each check is a single
+        # probe of the (state, best_level_status) index
+        for level_status, results_status in self.RESULTS_STATUSES:
+            code = LevelStatusField.code(level_status)
+            if self.election_set.filter(best_level_status=code).exists():
+                final_status = results_status
                 break
 
         # No clean or raw results, see if a developer volunteer has been
@@ -182,6 +226,29 @@ class State(models.Model):
 
         return final_status
 
+    def update_status(self):
+        """
+        Recomputes the denormalized status columns for this state and
+        writes them without touching the other columns.
+        """
+        previous_results_status = self.results_status
+        self.results_status = self.compute_results_status()
+        self.election_count = self.election_set.count()
+        self.dev_volunteer_count = self.volunteer_set.filter(roles__slug='dev').count()
+        self.metadata_volunteer_count = self.volunteer_set.filter(roles__slug='metadata').count()
+        self.status_updated = datetime.datetime.now()
+        State.objects.filter(pk=self.pk).update(
+            results_status=self.results_status,
+            election_count=self.election_count,
+            dev_volunteer_count=self.dev_volunteer_count,
+            metadata_volunteer_count=self.metadata_volunteer_count,
+            status_updated=self.status_updated,
+        )
+        if self.results_status != previous_results_status:
+            # Served by the API, unlike the counts
+            ChangeLog.record(State, [self.pk], 'save')
+        bump_versions(state_version_names([self.pk]))
+
 
 class Election(models.Model):
     """Metadata about source of election results from a single state.
@@ -232,6 +299,31 @@ class Election(models.Model):
         ('baked-raw', 'Baked Raw'),
         ('baked', 'Baked'),
     )
+    LEVEL_STATUS_FIELDS = (
+        'state_level_status',
+        'county_level_status',
+        'precinct_level_status',
+        'cong_dist_level_status',
+        'state_leg_level_status',
+    )
+    # Office flags, in the order of their bits in offices_mask
+    OFFICE_FIELDS = (
+        'prez',
+        'senate',
+        'house',
+        'gov',
+        'state_officers',
+        'state_leg',
+    )
+    # Names of the offices in offices_for_api
+    OFFICE_API_NAMES = {
+        'prez' : 'President',
+        'senate' : 'Senate',
+        'house' : 'House' ,
+        'gov' : 'Governor',
+        'state_officers' : 'State Officers',
+        'state_leg' : 'State Legislature'
+    }
 
     # User meta
     created = models.DateTimeField()
@@ -273,20 +365,31 @@ class Election(models.Model):
     level_note = models.TextField("Note", blank=True)
 
     # Status of data at a particular reporting level
-    state_level_status = models.CharField("Racewide Status", choices=LEVEL_STATUS_CHOICES, max_length='30', default='', blank=True, db_index=True)
-    county_level_status = models.CharField("County Status", choices=LEVEL_STATUS_CHOICES, max_length='30', default='', blank=True, db_index=True)
-    precinct_level_status = models.CharField("Precinct Status", choices=LEVEL_STATUS_CHOICES, max_length='30', default='', blank=True, db_index=True)
+    state_level_status = LevelStatusField("Racewide Status", choices=LEVEL_STATUS_CHOICES, default='', blank=True)
+    county_level_status = LevelStatusField("County Status", choices=LEVEL_STATUS_CHOICES, default='', blank=True)
+    precinct_level_status = LevelStatusField("Precinct Status", choices=LEVEL_STATUS_CHOICES, default='', blank=True)
     # Congress and state leg are only used when statewide offices are broken down by those units
-    cong_dist_level_status = models.CharField("CD Status", choices=LEVEL_STATUS_CHOICES, max_length='30', default='', blank=True, db_index=True)
-    state_leg_level_status = models.CharField("State Leg Status", choices=LEVEL_STATUS_CHOICES, max_length='30', default='', blank=True, db_index=True)
+    cong_dist_level_status = LevelStatusField("CD Status", choices=LEVEL_STATUS_CHOICES, default='', blank=True)
+    state_leg_level_status = LevelStatusField("State Leg Status", choices=LEVEL_STATUS_CHOICES, default='', blank=True)
+    # Code of the most complete of the level statuses above, set on save.
+    # See LEVEL_STATUS_CODES
+    best_level_status = models.PositiveSmallIntegerField(default=0, editable=False)
 
     # Offices covered (results include data for these offices)
-    prez = models.BooleanField("President", default=False, db_index=True)
-    senate = models.BooleanField("U.S. Senate", default=False, db_index=True)
-    house = models.BooleanField("U.S. House", default=False, db_index=True)
-    gov = models.BooleanField(default=False, db_index=True)
-    state_officers = models.BooleanField("State Officers", default=False, db_index=True, help_text="True if there were races for state-level, executive-branch offices besides Governor, such as Attorney General or Secretary of State.")
-    state_leg = models.BooleanField("State Legislators", default=False, db_index=True, help_text="True if there were races for state legislators such as State Senators or Assembly members. Do NOT check this for state executive officer races.")
+    prez = models.BooleanField("President", default=False)
+    senate = models.BooleanField("U.S. Senate", default=False)
+    house = models.BooleanField("U.S. House", default=False)
+    gov = models.BooleanField(default=False)
+    state_officers = models.BooleanField("State Officers", default=False, help_text="True if there were races for state-level, executive-branch offices besides Governor, such as Attorney General or Secretary of State.")
+    state_leg = models.BooleanField("State Legislators", default=False, help_text="True if there were races for state legislators such as State Senators or Assembly members. Do NOT check this for state executive officer races.")
+    # The office flags above as a single indexed bitmask, set on save. See
+    # OFFICE_FIELDS and offices_q
+    offices_mask = models.PositiveSmallIntegerField(default=0, db_index=True, editable=False)
+
+    # make_slug() and elec_key(as_string=True), stored on save so that
+    # elections can be looked up by them
+    slug = models.CharField(max_length=100, default='', db_index=True, editable=False)
+    key = models.CharField(max_length=255, default='', db_index=True, editable=False)
 
     # General note about data
     note = models.TextField(blank=True, help_text="Data quirks such as details about live results or reason for special election")
@@ -301,14 +404,34 @@ class Election(models.Model):
             'state',
             'special',
         ),)
+        # Supports keyset pagination in the API. See KeysetPaginator
+        index_together = [
+            ['state', 'end_date', 'id'],
+            ['state', 'best_level_status'],
+        ]
 
     def save(self, *args, **kwargs):
         timestamp = datetime.datetime.now()
         if not self.id:
             self.created = timestamp
         self.modified = timestamp
+        self.offices_mask = self.get_offices_mask()
+        self.best_level_status = self.get_best_level_status()
+        self.slug = self.make_slug()
+        self.key = self.elec_key(as_string=True)
         super(Election, self).save(*args, **kwargs)
 
+    def sync_links(self):
+        """Updates the DirectLink rows to match the direct_links text"""
+        urls = split_direct_links(self.direct_links)
+        if list(self.links.values_list('url', flat=True)) == urls:
+            return
+        self.links.all().delete()
+        DirectLink.objects.bulk_create([
+            DirectLink.for_url(url, election=self, position=position)
+            for position, url in enumerate(urls)
+        ])
+
     def clean(self):
         if 'general' in self.race_type:
             # At least one Office fields must be selected
@@ -328,15 +451,16 @@ class Election(models.Model):
 
 
     def __unicode__(self):
-        return self.elec_key(as_string=True)
+        return self.key or self.elec_key(as_string=True)
 
     def __repr__(self):
-        return '<%s - %s>' % (self.__class__.__name__, self.elec_key(as_string=True))
-
-    def _perform_unique_checks(self, unique_checks):
-        """Override default method to force unique checks"""
-        errors = {}
+        return '<%s - %s>' % (self.__class__.__name__, self.key or self.elec_key(as_string=True))
 
+    def _unique_lookups(self, unique_checks):
+        """
+        Yields a ``(model_class, unique_check, lookup_kwargs)`` tuple for
+        each of the lookups that _perform_unique_checks runs.
+        """
         if not self.end_date:
             self.end_date = self.start_date
         self.end_date = self.start_date
@@ -363,6 +487,20 @@ class Election(models.Model):
             #if len(unique_check) != len(lookup_kwargs.keys()):
             #    continue
 
+            yield model_class, unique_check, lookup_kwargs
+
+    def _add_unique_error(self, errors, model_class, unique_check):
+        if len(unique_check) == 1:
+            key = unique_check[0]
+        else:
+            key = NON_FIELD_ERRORS
+        errors.setdefault(key, []).append(self.unique_error_message(model_class, unique_check))
+
+    def _perform_unique_checks(self, unique_checks):
+        """Override default method to force unique checks"""
+        errors = {}
+
+        for model_class, unique_check, lookup_kwargs in self._unique_lookups(unique_checks):
             qs = model_class._default_manager.filter(**lookup_kwargs)
 
             # Exclude the current object from the query if we are editing an
@@ -371,43 +509,113 @@ class Election(models.Model):
                 qs = qs.exclude(pk=self.pk)
 
             if qs.exists():
-                if len(unique_check) == 1:
-                    key = unique_check[0]
-                else:
-                    key = NON_FIELD_ERRORS
-                errors.setdefault(key, []).append(self.unique_error_message(model_class, unique_check))
+                self._add_unique_error(errors, model_class, unique_check)
 
         return errors
 
+    @classmethod
+    def perform_unique_checks_batch(cls, batch):
+        """
+        Runs _perform_unique_checks for many elections at once.
+
+        ``batch`` is a list of ``(election, unique_checks)`` pairs.  Returns
+        a list with the errors dict of each election, in the same order.
+
+        Rather than a query per check, the rows that any of the checks
+        could collide with are fetched in a single query and the checks
+        are matched against them in memory.
+        """
+        lookups = []
+        for election, unique_checks in batch:
+            for model_class, unique_check, lookup_kwargs in election._unique_lookups(unique_checks):
+                lookups.append((election, model_class, unique_check, lookup_kwargs))
+
+        batched = [lookup_kwargs for election, model_class, unique_check, lookup_kwargs
+            in lookups if lookup_kwargs and model_class is cls]
+        rows = []
+        if batched:
+            fields = sorted(set().union(*batched))
+            # Narrow the query with the fields that every lookup has, which
+            # keeps it flat however many lookups there are. The exact
+            # matching is done below.
+            common = set(fields).intersection(*batched)
+            if common:
+                where = Q(**dict(('%s__in' % name,
+                    set(lookup_kwargs[name] for lookup_kwargs in batched))
+                    for name in common))
+            else:
+                where = reduce(operator.or_, [Q(**lookup_kwargs) for lookup_kwargs in batched])
+            rows = [dict(zip(['pk'] + fields, row)) for row in
+                cls._default_manager.filter(where).values_list('pk', *fields)]
+
+        errors = dict((id(election), {}) for election, unique_checks in batch)
+        for election, model_class, unique_check, lookup_kwargs in lookups:
+            if not lookup_kwargs or model_class is not cls:
+                # Lookups that match every row, or that are on another
+                # model, are run one at a time as before
+                election_errors = election._perform_unique_checks([(model_class, unique_check)])
+                for key, messages in election_errors.items():
+                    errors[id(election)].setdefault(key, []).extend(messages)
+                continue
+            exclude_pk = None
+            if not election._state.adding and election.pk is not None:
+                exclude_pk = election.pk
+            for row in rows:
+                if row['pk'] != exclude_pk and all(row[name] == value
+                        for name, value in lookup_kwargs.items()):
+                    election._add_unique_error(errors[id(election)], model_class, unique_check)
+                    break
+        return [errors[id(election)] for election, unique_checks in batch]
+
+    @classmethod
+    def office_bit(cls, office):
+        """Returns the bit of offices_mask for the given office flag"""
+        try:
+            return 1 << cls.OFFICE_FIELDS.index(office)
+        except ValueError:
+            raise ValueError("Unknown office: %r" % (office,))
+
+    @classmethod
+    def offices_q(cls, offices, match_all=False):
+        """
+        Returns a Q object matching elections that cover any (or, with
+        ``match_all``, all) of the given office flags, such as
+        ``['prez', 'gov']``.
+
+        The lookup is on the indexed offices_mask, as an IN over the masks
+        that match, since there are only 64 of them.
+        """
+        bits = 0
+        for office in offices:
+            bits |= cls.office_bit(office)
+        if match_all:
+            masks = [mask for mask in range(len(OFFICES_BY_MASK)) if mask & bits == bits]
+        else:
+            masks = [mask for mask in range(len(OFFICES_BY_MASK)) if mask & bits]
+        return Q(offices_mask__in=masks)
+
+    def get_best_level_status(self):
+        """Computes best_level_status from the level statuses"""
+        return max(LevelStatusField.code(getattr(self, name))
+            for name in self.LEVEL_STATUS_FIELDS)
+
+    def get_offices_mask(self):
+        """Computes offices_mask from the office flags"""
+        mask = 0
+        for bit, office in enumerate(self.OFFICE_FIELDS):
+            if getattr(self, office):
+                mask |= 1 << bit
+        return mask
+
     @property
     def offices(self):
-        office_fields = (
-            'prez',
-            'senate',
-            'house',
-            'gov',
-            'state_officers',
-            'state_leg',
-        )
-        return tuple(attr for attr in office_fields if getattr(self, attr))
+        return OFFICES_BY_MASK[self.get_offices_mask()]
 
     @property
     def offices_for_api(self):
-        o = []
-        offices = {
-            'prez' : 'President',
-            'senate' : 'Senate',
-            'house' : 'House' ,
-            'gov' : 'Governor',
-            'state_officers' : 'State Officers',
-            'state_leg' : 'State Legislature'
-        }
-        for office in offices:
-            if getattr(self, office):
-                o.append({offices[office] : True})
-            else:
-                o.append({offices[office] : False})
-        return o
+        mask = self.get_offices_mask()
+        return [{name: bool(mask & self.office_bit(office))}
+            for office, name in self.OFFICE_API_NAMES.items()]
 
     @property
     def reporting_levels(self):
@@ -449,8 +657,7 @@ class Election(models.Model):
             key = tuple(meta) + tuple(self.offices)
         return key
 
-    @property
-    def slug(self):
+    def make_slug(self):
         if self.special:
             return "%s-%s-special-%s" % (self.state_id.lower(), self.start_date.strftime('%Y-%m-%d'), self.race_type)
         else:
@@ -461,6 +668,97 @@ class Election(models.Model):
         return "ocd-division/country:us/state:%s" % self.state_id.lower()
 
 
+# Election.offices for each value of offices_mask
+OFFICES_BY_MASK = tuple(
+    tuple(office for bit, office in enumerate(Election.OFFICE_FIELDS) if mask & (1 << bit))
+    for mask in range(1 << len(Election.OFFICE_FIELDS))
+)
+
+
+def update_elections(queryset, **values):
+    """
+    Sets ``values`` on every election in ``queryset`` with a single UPDATE
+    that also stamps ``modified``, and returns the number of elections
+    updated.
+
+    Setting a level status also sets best_level_status, which depends on
+    the other level statuses, so that takes an UPDATE per combination of
+    the other statuses among the elections.
+
+    UPDATE skips Election's save signals, so the state statuses, cached
+    election facets and change log entries that they would have taken
+    care of are taken care of here, once for the whole batch.  Changing
+    an election's state or office flags this way is not supported.
+    """
+    values['modified'] = datetime.datetime.now()
+    levels = [name for name in Election.LEVEL_STATUS_FIELDS if name in values]
+    others = [name for name in Election.LEVEL_STATUS_FIELDS if name not in values]
+    with transaction.commit_on_success():
+        postals = list(queryset.order_by().values_list('state', flat=True).distinct())
+        pks = list(queryset.order_by().values_list('pk', flat=True))
+        if not levels:
+            count = queryset.update(**values)
+        else:
+            codes = [LevelStatusField.code(values[name]) for name in levels]
+            combinations = [()]
+            if others:
+                # Codes, as values_list() doesn't convert them
+                combinations = list(queryset.order_by().values_list(*others).distinct())
+            count = 0
+            for other_codes in combinations:
+                count += (queryset.filter(**dict(zip(others, other_codes)))
+                    .update(best_level_status=max(codes + list(other_codes)), **values))
+        ChangeLog.record(Election, pks, 'save')
+        State.objects.refresh_status(postals)
+    bump_versions([ELECTION_FACETS_VERSION])
+    return count
+
+
+def split_direct_links(value):
+    """Splits the newline-separated direct_links text into a list of URLs"""
+    urls = re.sub(r'\n+', "\n", value.replace('\r', '')).split("\n")
+    return [url.strip() for url in urls if url.strip()]
+
+
+class DirectLink(models.Model):
+    """
+    A single URL from Election.direct_links, kept in sync when the
+    election is saved so that links can be looked up by URL or host.
+
+    URLs can be of any length, so they are looked up by their indexed
+    ``url_hash`` rather than indexed themselves.  Create links with
+    for_url(), which fills in the hash and host.
+    """
+    election = models.ForeignKey(Election, related_name='links')
+    url = models.TextField()
+    url_hash = models.CharField(max_length=40, db_index=True, help_text="SHA-1 hex digest of the URL")
+    host = models.CharField(max_length=255, db_index=True, help_text="Lowercased host name of the URL")
+    position = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ['election', 'position']
+        unique_together = (('election', 'position'),)
+
+    def __unicode__(self):
+        return self.url
+
+    @classmethod
+    def for_url(cls, url, **kwargs):
+        """Returns an unsaved DirectLink for a URL"""
+        return cls(url=url, url_hash=cls.hash_url(url), host=cls.get_host(url), **kwargs)
+
+    @staticmethod
+    def hash_url(url):
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def get_host(url):
+        try:
+            return (urlparse(url).hostname or '')[:255]
+        except ValueError:
+            return ''
+
+
 
 class BaseContact(models.Model):
     first_name = models.CharField(max_length=30)
@@ -510,6 +808,15 @@ class Volunteer(BaseContact):
     def full_name(self):
         return ' '.join((self.first_name, self.last_name))
 
+    def has_role(self, slug):
+        """
+        Returns True if the volunteer has the role with the given slug.
+
+        Iterates over ``roles.all()`` so that prefetched roles are used
+        instead of issuing a query.
+        """
+        return any(role.slug == slug for role in self.roles.all())
+
     def status_entry(self):
         """
         Returns a dict, suitable for serialization containing volunteer
@@ -578,3 +885,148 @@ class VolunteerLog(BaseLog):
         if as_string:
             key = ' - '.join(key)
         return key
+
+
+class ChangeLog(models.Model):
+    """
+    Append-only log of the saves and deletes of elections, organizations
+    and states, which lets API consumers fetch only what changed since
+    they last synced.  See the change_feed view.
+
+    The auto-incrementing id orders the entries and serves as the cursor.
+    Ids are not assigned in commit order, which the feed allows for by
+    holding back recent entries.
+    """
+    OPERATION_CHOICES = (
+        ('save', 'Save'),
+        ('delete', 'Delete'),
+    )
+    # Logged models, by the name used in the log
+    MODELS = {
+        'election': Election,
+        'organization': Organization,
+        'state': State,
+    }
+    model = models.CharField(max_length=20)
+    object_id = models.CharField(max_length=25)
+    operation = models.CharField(max_length=10, choices=OPERATION_CHOICES)
+    created = models.DateTimeField(default=datetime.datetime.now)
+
+    class Meta:
+        ordering = ['id']
+
+    def __unicode__(self):
+        return u'%s %s %s' % (self.operation, self.model, self.object_id)
+
+    @classmethod
+    def record(cls, model, object_ids, operation):
+        """Logs an operation on objects of a model, with a single INSERT"""
+        name = model._meta.object_name.lower()
+        cls.objects.bulk_create([cls(model=name, object_id=unicode(object_id),
+            operation=operation) for object_id in object_ids])
+
+    def get_object_id(self):
+        """Returns object_id as the logged model's primary key type"""
+        return self.MODELS[self.model]._meta.pk.to_python(self.object_id)
+
+
+### SIGNAL HANDLERS ###
+
+# Keep the denormalized status columns on State in sync with the elections
+# and volunteers they summarize.  Raw saves (fixture loading) are skipped;
+# run the rebuild_state_status management command afterwards instead.
+
+@receiver(pre_save, sender=Election)
+def remember_election_state(sender, instance, raw=False, **kwargs):
+    instance._previous_state_id = None
+    if not raw and instance.pk is not None:
+        previous = sender.objects.filter(pk=instance.pk).values_list('state_id', flat=True)
+        instance._previous_state_id = previous[0] if previous else None
+
+# Connected ahead of the status handler below, which invalidates cached API
+# responses that include the links
+@receiver(post_save, sender=Election)
+def sync_election_links(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance.sync_links()
+
+@receiver(post_save, sender=Election)
+def update_state_status_on_election_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    State.objects.refresh_status([instance.state_id,
+        getattr(instance, '_previous_state_id', None)])
+
+@receiver(post_delete, sender=Election)
+def update_state_status_on_election_delete(sender, instance, **kwargs):
+    State.objects.refresh_status([instance.state_id])
+
+@receiver(m2m_changed, sender=Volunteer.states.through)
+def update_state_status_on_volunteer_states_change(sender, instance, action,
+        reverse, pk_set, **kwargs):
+    if reverse:
+        # Volunteers were added to or removed from a single state
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            State.objects.refresh_status([instance.pk])
+    elif action == 'pre_clear':
+        instance._cleared_state_ids = list(instance.states.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        State.objects.refresh_status(pk_set)
+    elif action == 'post_clear':
+        State.objects.refresh_status(getattr(instance, '_cleared_state_ids', []))
+
+@receiver(m2m_changed, sender=Volunteer.roles.through)
+def update_state_status_on_volunteer_roles_change(sender, instance, action,
+        reverse, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        # A role gained or lost volunteers; they may cover any state
+        State.objects.rebuild_status()
+    else:
+        State.objects.refresh_status(instance.states.values_list('pk', flat=True))
+
+@receiver(post_save, sender=State)
+@receiver(post_delete, sender=State)
+def bump_state_version(sender, instance, **kwargs):
+    bump_versions(state_version_names([instance.pk]))
+
+@receiver(post_save, sender=Election)
+@receiver(post_delete, sender=Election)
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=ProxyUser)
+def bump_election_facets_version(sender, **kwargs):
+    bump_versions([ELECTION_FACETS_VERSION])
+
+@receiver(post_save, sender=Organization)
+@receiver(post_delete, sender=Organization)
+def bump_organization_version(sender, instance, **kwargs):
+    bump_versions(['organization'])
+
+@receiver(post_save, sender=Election)
+@receiver(post_save, sender=Organization)
+@receiver(post_save, sender=State)
+def log_save(sender, instance, **kwargs):
+    # Including raw saves, which change the data all the same
+    ChangeLog.record(sender, [instance.pk], 'save')
+
+@receiver(post_delete, sender=Election)
+@receiver(post_delete, sender=Organization)
+@receiver(post_delete, sender=State)
+def log_delete(sender, instance, **kwargs):
+    ChangeLog.record(sender, [instance.pk], 'delete')
+
+@receiver(post_save, sender=Volunteer)
+def touch_state_status_on_volunteer_save(sender, instance, raw=False, **kwargs):
+    # Volunteer names and websites are part of each state's status entry
+    if raw:
+        return
+    State.objects.touch_status(instance.states.values_list('pk', flat=True))
+
+@receiver(pre_delete, sender=Volunteer)
+def remember_volunteer_states(sender, instance, **kwargs):
+    instance._deleted_state_ids = list(instance.states.values_list('pk', flat=True))
+
+@receiver(post_delete, sender=Volunteer)
+def update_state_status_on_volunteer_delete(sender, instance, **kwargs):
+    State.objects.refresh_status(getattr(instance, '_deleted_state_ids', []))
@@ -0,0 +1,235 @@
+import base64
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import (EmptyPage, Page, PageNotAnInteger,
+    Paginator as DjangoPaginator)
+from django.db import connections
+from django.db.models import Q
+from tastypie.exceptions import BadRequest
+from tastypie.paginator import Paginator
+
+ROW_ESTIMATE_KEY = 'hub:row_estimate:%s:%s'
+# How long counts stand in for estimates on databases without one
+ROW_ESTIMATE_TIMEOUT = 60 * 10
+
+
+class KeysetPaginator(Paginator):
+    """
+    Tastypie paginator that adds opt-in keyset (cursor) pagination.
+
+    Requests without a ``cursor`` parameter are paginated with the default
+    limit/offset behavior.  Passing ``cursor`` (empty for the first page)
+    switches to keyset pagination: objects are ordered by ``ordering`` and
+    each page starts after the last row of the previous one, so the cost
+    of a page does not depend on how deep it is.  ``meta.next`` links to
+    the following page with an opaque cursor, or is null on the last page.
+
+    The total count is only computed in keyset mode when the request
+    includes ``count=true``.
+
+    ``ordering`` must be a list of model field names that together are
+    unique, ending with the primary key, and should be backed by an index.
+    Foreign keys are ordered by their own column, like the cursor, never
+    by the related model's ``Meta.ordering``.
+    """
+    ordering = ('state', 'end_date', 'id')
+
+    def page(self):
+        if 'cursor' not in self.request_data:
+            return super(KeysetPaginator, self).page()
+
+        limit = self.get_limit()
+        if not limit:
+            # Keyset pages must be bounded
+            limit = self.max_limit or 1000
+
+        objects = self.objects.order_by(*self.get_order_by())
+        cursor = self.request_data.get('cursor')
+        if cursor:
+            objects = objects.filter(self.get_keyset_filter(self.decode_cursor(cursor)))
+
+        # Fetch one extra row to find out whether there is a next page
+        page = list(objects[:limit + 1])
+        next_uri = None
+        if len(page) > limit:
+            page = page[:limit]
+            next_uri = self._generate_cursor_uri(limit, self.encode_cursor(page[-1]))
+
+        meta = {
+            'limit': limit,
+            'cursor': cursor,
+            'next': next_uri,
+        }
+        if self.request_data.get('count', '').lower() in ('1', 'true'):
+            meta['total_count'] = self.get_count()
+
+        return {
+            self.collection_name: page,
+            'meta': meta,
+        }
+
+    def _get_fields(self):
+        opts = self.objects.model._meta
+        return [opts.get_field(name) for name in self.ordering]
+
+    def get_order_by(self):
+        """
+        Returns the ``order_by()`` arguments for ``ordering``.
+
+        Foreign keys are ordered by the field they point to, which Django
+        resolves to the key's own column without a join.  Ordering by the
+        relation itself would sort by the related model's default ordering
+        (e.g. state name rather than postal code), which neither matches the
+        cursor nor uses the index.
+        """
+        order_by = []
+        for field in self._get_fields():
+            if field.rel:
+                order_by.append('%s__%s' % (field.name, field.rel.field_name))
+            else:
+                order_by.append(field.name)
+        return order_by
+
+    def get_keyset_filter(self, values):
+        """
+        Returns a Q object selecting the rows that sort after ``values``.
+
+        For an ordering (a, b, c) this is
+        ``a > va OR (a = va AND b > vb) OR (a = va AND b = vb AND c > vc)``.
+        """
+        fields = self._get_fields()
+        q = Q()
+        for i, field in enumerate(fields):
+            lookup = dict((f.attname, v) for f, v in zip(fields[:i], values[:i]))
+            lookup['%s__gt' % field.attname] = values[i]
+            q |= Q(**lookup)
+        return q
+
+    def encode_cursor(self, obj):
+        values = []
+        for field in self._get_fields():
+            value = getattr(obj, field.attname)
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            values.append(value)
+        return base64.urlsafe_b64encode(json.dumps(values))
+
+    def decode_cursor(self, cursor):
+        fields = self._get_fields()
+        try:
+            values = json.loads(base64.urlsafe_b64decode(str(cursor)))
+            if not isinstance(values, list) or len(values) != len(fields):
+                raise ValueError
+            return [f.to_python(v) for f, v in zip(fields, values)]
+        except Exception:
+            raise BadRequest("Invalid cursor '%s' provided." % cursor)
+
+    def _generate_cursor_uri(self, limit, cursor):
+        if self.resource_uri is None:
+            return None
+
+        request_params = self.request_data.copy()
+        for param in ('limit', 'offset', 'cursor'):
+            if param in request_params:
+                del request_params[param]
+        request_params.update({'limit': limit, 'cursor': cursor})
+        return '%s?%s' % (self.resource_uri, request_params.urlencode())
+
+
+def estimate_table_rows(model, using='default'):
+    """
+    Returns an estimate of the number of rows in a model's table.
+
+    On PostgreSQL this is the planner's estimate from ``pg_class``, as of
+    the table's last VACUUM or ANALYZE, or None if the table has never
+    been analyzed.  Elsewhere it is an exact count cached for a few
+    minutes.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'postgresql':
+        cursor = connection.cursor()
+        cursor.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", [table])
+        row = cursor.fetchone()
+        if row is None or row[0] < 0:
+            return None
+        return int(row[0])
+
+    key = ROW_ESTIMATE_KEY % (using, table)
+    count = cache.get(key)
+    if count is None:
+        count = model._default_manager.using(using).count()
+        cache.set(key, count, ROW_ESTIMATE_TIMEOUT)
+    return count
+
+
+def estimated_count(queryset):
+    """
+    Returns ``(count, estimated)`` for a queryset.
+
+    Unfiltered querysets are counted with estimate_table_rows() unless the
+    estimate is below ``settings.HUB_EXACT_COUNT_THRESHOLD``; everything
+    else gets an exact COUNT.
+    """
+    if not queryset.query.where:
+        estimate = estimate_table_rows(queryset.model, queryset.db)
+        if estimate is not None and estimate >= settings.HUB_EXACT_COUNT_THRESHOLD:
+            return estimate, True
+    return queryset.count(), False
+
+
+class EstimatedCountPage(Page):
+    """
+    Page of an EstimatedCountPaginator whose count is estimated, which
+    tells whether there is a next page from its own length rather than
+    from the estimate.
+    """
+
+    def has_next(self):
+        return len(self.object_list) >= self.paginator.per_page
+
+    def end_index(self):
+        return (self.number - 1) * self.paginator.per_page + len(self.object_list)
+
+
+class EstimatedCountPaginator(DjangoPaginator):
+    """
+    Paginator that counts its objects with estimated_count().
+
+    ``count_estimated`` tells whether ``count`` is an estimate.  If so,
+    pages are not clipped to the estimate: a page may turn out shorter
+    than expected, or empty, and pages past ``num_pages`` are served for
+    as long as they are not empty, so that rows beyond an underestimate
+    can still be reached.
+    """
+    count_estimated = False
+
+    def _get_count(self):
+        if self._count is None:
+            self._count, self.count_estimated = estimated_count(self.object_list)
+        return self._count
+    count = property(_get_count)
+
+    def validate_number(self, number):
+        if not self.count or not self.count_estimated:
+            return super(EstimatedCountPaginator, self).validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.count_estimated:
+            return super(EstimatedCountPaginator, self).page(number)
+        bottom = (number - 1) * self.per_page
+        page = EstimatedCountPage(self.object_list[bottom:bottom + self.per_page],
+            number, self)
+        if number > self.num_pages and not page.object_list:
+            raise EmptyPage('That page contains no results')
+        return page
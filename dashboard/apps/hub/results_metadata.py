@@ -0,0 +1,276 @@
+"""
+Static results metadata files, laid out as described in docs/results.md::
+
+    <state>/metadata.json
+    <state>/metadata.csv
+    <state>/<year>/elections.json
+    <state>/<year>/elections.csv
+
+State directories are named with the lowercased postal code, as in the
+published URLs.
+
+The elections files of a state and year are only rendered again when the
+elections of that state and year have changed since the last export.
+Changes are detected with a fingerprint of the primary keys and
+``modified`` timestamps of the elections, and the fingerprints of the
+last export are kept in FINGERPRINTS_FILE at the top of the tree.
+Elections changed without touching ``modified``, such as by a data
+migration, need a forced export.
+"""
+import csv
+import hashlib
+import json
+import os
+from multiprocessing import Pool
+from StringIO import StringIO
+
+from django.db import connection
+
+from dashboard.apps.hub.models import Election, State, Volunteer
+from dashboard.lib.files import write_if_changed
+
+FINGERPRINTS_FILE = '.results_metadata.json'
+
+METADATA_FIELDS = ('years', 'updated_at', 'volunteers')
+ELECTION_FIELDS = (
+    'date',
+    'results_type',
+    'election_type',
+    'special',
+    'office',
+    'race_wide',
+    'county',
+    'congressional_district',
+    'state_legislative',
+    'precinct',
+    'updated_at',
+)
+# Result levels and the Election flags that mark them as available
+RESULT_LEVEL_FIELDS = (
+    ('race_wide', 'state_level'),
+    ('county', 'county_level'),
+    ('congressional_district', 'cong_dist_level'),
+    ('state_legislative', 'state_leg_level'),
+    ('precinct', 'precinct_level'),
+)
+
+
+def _csv_content(header, rows):
+    out = StringIO()
+    writer = csv.writer(out)
+    for row in [header] + rows:
+        values = []
+        for value in row:
+            if value is None:
+                value = ''
+            elif isinstance(value, unicode):
+                value = value.encode('utf-8')
+            values.append(value)
+        writer.writerow(values)
+    return out.getvalue()
+
+
+def _write(output_dir, path, content):
+    """
+    Writes ``content`` to ``path``, relative to ``output_dir``, and returns
+    whether the file changed.
+    """
+    full_path = os.path.join(output_dir, path)
+    dirname = os.path.dirname(full_path)
+    if not os.path.isdir(dirname):
+        os.makedirs(dirname)
+    return write_if_changed(full_path, [content], compress=False)[1]
+
+
+def state_dir(postal):
+    return postal.lower()
+
+
+def elections_paths(postal, year):
+    """Returns the paths of the elections files of a state and year"""
+    return ['%s/%s/elections.%s' % (state_dir(postal), year, ext)
+        for ext in ('json', 'csv')]
+
+
+def election_fingerprints():
+    """
+    Returns a dict mapping ``(postal, year)`` to a fingerprint of the
+    elections of that state and year, and a dict mapping each postal code
+    to the time its elections were last modified.
+
+    Only the primary keys and timestamps of the elections are read.
+    """
+    digests = {}
+    updated = {}
+    rows = (Election.objects.order_by('pk')
+        .values_list('pk', 'state', 'start_date', 'modified'))
+    for pk, postal, start_date, modified in rows.iterator():
+        digest = digests.get((postal, start_date.year))
+        if digest is None:
+            digest = digests[(postal, start_date.year)] = hashlib.sha1()
+        digest.update('%s:%s;' % (pk, modified.isoformat()))
+        if postal not in updated or modified > updated[postal]:
+            updated[postal] = modified
+    fingerprints = dict((key, digest.hexdigest()) for key, digest in digests.items())
+    return fingerprints, updated
+
+
+def state_volunteers():
+    """Returns a dict mapping postal codes to the names of their volunteers"""
+    volunteers = {}
+    rows = (Volunteer.states.through.objects
+        .order_by('volunteer__last_name', 'volunteer__first_name', 'volunteer')
+        .values_list('state', 'volunteer__first_name', 'volunteer__last_name'))
+    for postal, first_name, last_name in rows:
+        # As Volunteer.full_name
+        volunteers.setdefault(postal, []).append(' '.join((first_name, last_name)))
+    return volunteers
+
+
+def render_metadata(years, updated_at, volunteers):
+    """Returns the JSON and CSV content of a state's metadata file"""
+    updated_at = updated_at.isoformat() if updated_at else None
+    record = {
+        'years': years,
+        'updated_at': updated_at,
+        'volunteers': volunteers,
+    }
+    return (json.dumps(record, sort_keys=True),
+        _csv_content(METADATA_FIELDS, [[
+            ','.join(str(year) for year in years),
+            updated_at,
+            ','.join(volunteers),
+        ]]))
+
+
+def election_record(election):
+    """Returns the entry of an election in its year's elections.json"""
+    return {
+        'date': election.start_date.isoformat(),
+        'results_type': election.get_result_type_display() if election.result_type else None,
+        'election_type': election.race_type,
+        'special': election.special,
+        'office': ', '.join(Election.OFFICE_API_NAMES[office]
+            for office in election.offices),
+        'result_levels': [dict((name, getattr(election, attname))
+            for name, attname in RESULT_LEVEL_FIELDS)],
+        'updated_at': election.modified.isoformat(),
+    }
+
+
+def render_elections(postal, year, elections):
+    """Returns the JSON and CSV content of a state's elections file for a year"""
+    records = [election_record(election) for election in elections]
+    rows = []
+    for record in records:
+        # The CSV file has the result levels as columns of their own
+        flat = dict(record, **record['result_levels'][0])
+        rows.append([year, postal] + [flat[name] for name in ELECTION_FIELDS])
+    return (json.dumps({'year': year, 'state': postal, 'elections': records},
+            sort_keys=True),
+        _csv_content(('year', 'state') + ELECTION_FIELDS, rows))
+
+
+def export_state_years(output_dir, postal, years):
+    """
+    Writes the elections files of the given years of a state, and returns
+    the paths of the files that changed.
+    """
+    fields = (['start_date', 'result_type', 'race_type', 'special', 'modified'] +
+        list(Election.OFFICE_FIELDS) + [attname for name, attname in RESULT_LEVEL_FIELDS])
+    changed = []
+    for year in years:
+        elections = (Election.objects.filter(state=postal, start_date__year=year)
+            .order_by('start_date', 'race_type', 'pk').only(*fields))
+        contents = render_elections(postal, year, elections)
+        for path, content in zip(elections_paths(postal, year), contents):
+            if _write(output_dir, path, content):
+                changed.append(path)
+    return changed
+
+
+def _export_state_years_job(args):
+    return export_state_years(*args)
+
+
+def _remove_year(output_dir, postal, year):
+    removed = []
+    for path in elections_paths(postal, year):
+        full_path = os.path.join(output_dir, path)
+        if os.path.exists(full_path):
+            os.unlink(full_path)
+            removed.append(path)
+    year_dir = os.path.join(output_dir, state_dir(postal), str(year))
+    if os.path.isdir(year_dir) and not os.listdir(year_dir):
+        os.rmdir(year_dir)
+    return removed
+
+
+def export_results_metadata(output_dir, processes=None, force=False):
+    """
+    Writes the results metadata files of every state to ``output_dir``.
+
+    The elections files that need rendering are spread over a pool of
+    ``processes`` worker processes by state, or rendered in this process
+    if ``processes`` is 1.  ``force`` renders every file, whatever the
+    fingerprints of the last export say, and still removes the files of
+    the years they list that no longer have elections.
+
+    Returns a dict with the ``written`` and ``removed`` paths and the
+    number of ``skipped`` state years.
+    """
+    output_dir = os.path.abspath(output_dir)
+    fingerprints_path = os.path.join(output_dir, FINGERPRINTS_FILE)
+    previous = {}
+    # Loaded even when forced, to remove the years that have gone since
+    if os.path.exists(fingerprints_path):
+        with open(fingerprints_path) as f:
+            previous = json.load(f)
+
+    fingerprints, updated = election_fingerprints()
+    stale = {}
+    skipped = 0
+    for (postal, year), fingerprint in sorted(fingerprints.items()):
+        up_to_date = (not force and
+            previous.get('%s/%s' % (postal, year)) == fingerprint and
+            all(os.path.exists(os.path.join(output_dir, path))
+                for path in elections_paths(postal, year)))
+        if up_to_date:
+            skipped += 1
+        else:
+            stale.setdefault(postal, []).append(year)
+
+    written = []
+    removed = []
+    volunteers = state_volunteers()
+    for postal in State.objects.order_by('postal').values_list('postal', flat=True):
+        years = sorted(year for p, year in fingerprints if p == postal)
+        contents = render_metadata(years, updated.get(postal), volunteers.get(postal, []))
+        for ext, content in zip(('json', 'csv'), contents):
+            path = '%s/metadata.%s' % (state_dir(postal), ext)
+            if _write(output_dir, path, content):
+                written.append(path)
+    for key in sorted(previous):
+        postal, year = key.split('/')
+        if (postal, int(year)) not in fingerprints:
+            removed.extend(_remove_year(output_dir, postal, int(year)))
+
+    jobs = [(output_dir, postal, years) for postal, years in sorted(stale.items())]
+    if processes == 1 or len(jobs) <= 1:
+        results = map(_export_state_years_job, jobs)
+    else:
+        # Each worker opens its own database connection.  Close this one
+        # first so that the workers don't inherit and share it
+        connection.close()
+        pool = Pool(processes)
+        try:
+            results = pool.map(_export_state_years_job, jobs, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+    for paths in results:
+        written.extend(paths)
+
+    _write(output_dir, FINGERPRINTS_FILE, json.dumps(dict(('%s/%s' % key, fingerprint)
+        for key, fingerprint in fingerprints.items()), sort_keys=True))
+    return {'written': written, 'removed': removed, 'skipped': skipped}
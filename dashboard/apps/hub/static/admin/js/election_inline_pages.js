@@ -0,0 +1,36 @@
+// Loads a year of elections into the State change form's election inline
+// without reloading the page. Only the loaded year is posted back on save,
+// along with its election_year input.
+(function($) {
+    $(document).ready(function() {
+        var container = $('#election-inline-page');
+
+        container.on('click', '.election-years a[data-year]', function(e) {
+            var year = $(this).data('year');
+            var changed = container.find('.grp-items :input').filter(function() {
+                return this.defaultValue !== undefined && this.value !== this.defaultValue;
+            });
+            if (changed.length && !confirm('Discard unsaved changes to these elections?')) {
+                e.preventDefault();
+                return;
+            }
+            e.preventDefault();
+            container.addClass('grp-loading');
+            // jQuery runs the inline's own setup script when the fragment is inserted
+            container.load('elections/?election_year=' + year, function(response, status) {
+                container.removeClass('grp-loading');
+                if (status == 'error') {
+                    window.location.search = '?election_year=' + year;
+                    return;
+                }
+                container.find('.grp-group').grp_collapsible_group();
+                container.find('.grp-collapse').grp_collapsible();
+                grappelli.initDateAndTimePicker();
+                container.find('a.grp-copy-handler').click(function(e) {
+                    var target = (e.target) ? e.target : e.srcElement;
+                    OPELEC.inlines.copy(target);
+                });
+            });
+        });
+    });
+})(grp.jQuery);
@@ -0,0 +1,36 @@
+// Organization search for OrganizationAutocompleteWidget. Each widget is set
+// up the first time it gets focus, which also covers inline forms added
+// after the page loaded.
+(function($) {
+    $(document).on('focus', 'input.organization-autocomplete-label', function() {
+        var input = $(this);
+        if (input.data('autocomplete')) {
+            return;
+        }
+        var hidden = input.prev('input.organization-autocomplete');
+        input.autocomplete({
+            minLength: 1,
+            delay: 300,
+            source: function(request, response) {
+                $.getJSON(input.data('url'), {
+                    term: request.term,
+                    state: hidden.data('state')
+                }, response);
+            },
+            focus: function() {
+                // Keep the typed text until an organization is picked
+                return false;
+            },
+            select: function(event, ui) {
+                input.val(ui.item.label);
+                hidden.val(ui.item.value).change();
+                return false;
+            }
+        });
+        input.bind('change', function() {
+            if (!input.val()) {
+                hidden.val('').change();
+            }
+        });
+    });
+})(grp.jQuery);
@@ -0,0 +1,408 @@
+"""
+Generates a large, realistic-looking dataset for load testing and
+benchmarking.  See the generate_synthetic_data management command.
+
+Rows are inserted with bulk_create, a chunk at a time, with primary keys
+assigned up front so that related rows can point at them.  Because
+bulk_create skips save() and the model signals, the columns that save()
+maintains are computed here, and the state statuses, cached versions and
+database sequences are brought up to date at the end.  The generated rows
+are not in the ChangeLog.
+"""
+import datetime
+import random
+
+from django.contrib.auth.models import User
+from django.contrib.localflavor.us.us_states import US_STATES
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.template.defaultfilters import slugify
+
+from caching import (ALL_STATE_VERSIONS, ELECTION_FACETS_VERSION,
+    bump_versions)
+from models import (Contact, DataFormat, DirectLink, Election, Log,
+    Organization, ProxyUser, State, Volunteer, VolunteerLog, VolunteerRole)
+
+FIRST_NAMES = ('Aaliyah', 'Carlos', 'Diane', 'Eric', 'Fatima', 'Grace', 'Hiro',
+    'Isabel', 'James', 'Keisha', 'Liam', 'Maria', 'Nathan', 'Olga', 'Priya',
+    'Robert', 'Sofia', 'Thomas', 'Wei', 'Yusuf')
+LAST_NAMES = ('Anderson', 'Brown', 'Clay', 'Davis', 'Garcia', 'Hernandez',
+    'Jackson', 'Johnson', 'Kim', 'Lee', 'Martin', 'Miller', 'Nguyen', 'Patel',
+    'Robinson', 'Smith', 'Taylor', 'Thompson', 'Walker', 'Williams')
+COUNTY_NAMES = ('Adams', 'Clark', 'Clay', 'Franklin', 'Grant', 'Greene',
+    'Hamilton', 'Jackson', 'Jefferson', 'Lake', 'Lincoln', 'Madison', 'Marion',
+    'Monroe', 'Montgomery', 'Morgan', 'Polk', 'Union', 'Warren', 'Washington',
+    'Wayne')
+DATA_FORMATS = ('csv', 'fixedwidth', 'html', 'json', 'paper', 'pdf',
+    'pdf-image', 'pipe', 'tsv', 'xls', 'xml')
+VOLUNTEER_ROLES = (
+    ('dev', 'Developer'),
+    ('metadata', 'Metadata'),
+)
+# Level statuses, weighted, for elections from long ago and from lately
+OLD_LEVEL_STATUSES = ['', '', 'no', 'Unavailable', 'unknown', 'unknown', 'yes', 'baked-raw']
+NEW_LEVEL_STATUSES = ['', 'no', 'unknown', 'yes', 'yes', 'baked-raw', 'baked', 'baked']
+# Race types of special elections, weighted
+SPECIAL_RACE_TYPES = ('primary', 'general', 'general', 'general-recall')
+LEVEL_FIELDS = (
+    ('state_level', 'state_level_status'),
+    ('county_level', 'county_level_status'),
+    ('precinct_level', 'precinct_level_status'),
+    ('cong_dist_level', 'cong_dist_level_status'),
+    ('state_leg_level', 'state_leg_level_status'),
+)
+
+
+def general_election_day(year):
+    """Returns the Tuesday after the first Monday of November"""
+    first = datetime.date(year, 11, 1)
+    monday = first + datetime.timedelta(days=(7 - first.weekday()) % 7)
+    return monday + datetime.timedelta(days=1)
+
+
+def _next_pk(model):
+    return (model.objects.aggregate(pk=Max('pk'))['pk'] or 0) + 1
+
+
+def _chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class SyntheticDataGenerator(object):
+    """
+    Adds a seeded, random dataset to the database: states, data formats
+    and volunteer roles that are missing, then users, organizations (a
+    state agency and ``counties`` county offices per state), contacts,
+    volunteers, logs and ``elections`` elections spread over the states
+    and the ``years`` up to ``end_year``.
+    """
+
+    def __init__(self, seed=0, elections=10000, years=40, end_year=2014,
+            counties=10, users=20, volunteers=200, logs=2000,
+            chunk_size=1000, log=None):
+        self.random = random.Random(seed)
+        self.num_elections = elections
+        self.years = range(end_year - years + 1, end_year + 1)
+        self.num_counties = counties
+        self.num_users = users
+        self.num_volunteers = volunteers
+        self.num_logs = logs
+        self.chunk_size = chunk_size
+        self.log = log or (lambda message: None)
+        self.counts = {}
+
+    def validate(self):
+        """Raises ValueError if the dataset can't be generated as asked"""
+        if not self.years:
+            raise ValueError("At least one year of elections is needed")
+        if not self.num_users and not User.objects.exists():
+            raise ValueError("There are no users to enter the elections")
+        postals = set(State.objects.values_list('pk', flat=True))
+        postals.update(postal for postal, name in US_STATES)
+        state_years = len(postals) * len(self.years)
+        quota = (self.num_elections + state_years - 1) // state_years
+        maximum = self.max_elections_per_state_year()
+        if quota > maximum:
+            raise ValueError("Up to %d elections per state and year are needed, but "
+                "only %d distinct ones can be generated with %d counties" % (
+                quota, maximum, self.num_counties))
+
+    def max_elections_per_state_year(self):
+        """
+        Returns how many elections iter_elections() can always generate for
+        a state in a year.  Past the regular elections it draws special
+        elections, which must differ in race type, date or organization.
+        """
+        # Days random_date() picks from in a year that isn't a leap year
+        days = (datetime.date(2013, 12, 28) - datetime.date(2013, 1, 1)).days + 1
+        return len(set(SPECIAL_RACE_TYPES)) * days * (self.num_counties + 1)
+
+    def generate(self):
+        """
+        Generates the whole dataset, and returns the counts of new rows by
+        model.  Call validate() first.
+        """
+        self.generate_lookups()
+        self.generate_users()
+        self.generate_organizations()
+        self.generate_contacts()
+        self.generate_volunteers()
+        self.generate_logs()
+        self.generate_elections()
+        self.finish()
+        return self.counts
+
+    def bulk_create(self, model, objs):
+        """Inserts ``objs`` a chunk at a time, each chunk in a transaction"""
+        count = 0
+        for chunk in _chunks(objs, self.chunk_size):
+            with transaction.commit_on_success():
+                model.objects.bulk_create(chunk)
+            count += len(chunk)
+        name = model._meta.object_name
+        self.counts[name] = self.counts.get(name, 0) + count
+        return count
+
+    def unique_name(self, name, existing):
+        unique = name
+        i = 2
+        while unique in existing:
+            unique = '%s %d' % (name, i)
+            i += 1
+        existing.add(unique)
+        return unique
+
+    def person(self):
+        return self.random.choice(FIRST_NAMES), self.random.choice(LAST_NAMES)
+
+    def generate_lookups(self):
+        existing = set(State.objects.values_list('pk', flat=True))
+        self.bulk_create(State, [State(postal=postal, name=name, metadata_status='not-started')
+            for postal, name in US_STATES if postal not in existing])
+        existing = set(DataFormat.objects.values_list('pk', flat=True))
+        self.bulk_create(DataFormat, [DataFormat(slug=slug, name=slug)
+            for slug in DATA_FORMATS if slug not in existing])
+        existing = set(VolunteerRole.objects.values_list('pk', flat=True))
+        self.bulk_create(VolunteerRole, [VolunteerRole(slug=slug, name=name)
+            for slug, name in VOLUNTEER_ROLES if slug not in existing])
+        self.states = list(State.objects.order_by('postal').values_list('postal', 'name'))
+        self.formats = list(DataFormat.objects.order_by('pk').values_list('pk', flat=True))
+        self.roles = list(VolunteerRole.objects.order_by('pk').values_list('pk', flat=True))
+
+    def generate_users(self):
+        existing = set(User.objects.values_list('username', flat=True))
+        pk = _next_pk(User)
+        now = datetime.datetime.now()
+        users = []
+        for i in range(self.num_users):
+            first_name, last_name = self.person()
+            users.append(User(pk=pk + i, first_name=first_name, last_name=last_name,
+                username=self.unique_name(slugify('%s %s' % (first_name, last_name)), existing),
+                password='!', is_staff=True, date_joined=now, last_login=now))
+        self.bulk_create(User, users)
+        # Labeled like ProxyUser.__unicode__
+        self.users = [(user.pk, u'%s, %s' % (user.last_name, user.first_name))
+            for user in users] or [(user.pk, unicode(user)) for user in ProxyUser.objects.all()[:1]]
+
+    def generate_organizations(self):
+        existing = set(Organization.objects.values_list('name', flat=True))
+        pk = _next_pk(Organization)
+        organizations = []
+        # The state agency first, then the county offices
+        self.organizations = dict((postal, []) for postal, name in self.states)
+        for postal, state_name in self.states:
+            names = [('%s Secretary of State' % state_name, 'state')]
+            counties = self.random.sample(COUNTY_NAMES, min(self.num_counties, len(COUNTY_NAMES)))
+            counties += ['%s %d' % (self.random.choice(COUNTY_NAMES), i)
+                for i in range(self.num_counties - len(counties))]
+            names += [('%s County Board of Elections, %s' % (county, state_name), 'county')
+                for county in counties]
+            for name, gov_level in names:
+                name = self.unique_name(name, existing)
+                slug = slugify(name)
+                organizations.append(Organization(pk=pk, name=name, slug=slug,
+                    gov_agency=True, gov_level=gov_level, state=postal,
+                    url='http://%s.example.gov/' % slug, city=state_name))
+                self.organizations[postal].append(pk)
+                pk += 1
+        self.bulk_create(Organization, organizations)
+
+    def generate_contacts(self):
+        pk = _next_pk(Contact)
+        contacts = []
+        self.contacts = {}
+        for postal, organizations in sorted(self.organizations.items()):
+            for organization in organizations:
+                for i in range(self.random.randint(0, 2)):
+                    first_name, last_name = self.person()
+                    contacts.append(Contact(pk=pk, org_id=organization,
+                        first_name=first_name, last_name=last_name, title='Elections Director',
+                        email='%s.%s@example.gov' % (first_name.lower(), last_name.lower())))
+                    self.contacts.setdefault(postal, []).append((pk, organization))
+                    pk += 1
+        self.bulk_create(Contact, contacts)
+
+    def generate_volunteers(self):
+        pk = _next_pk(Volunteer)
+        volunteers = []
+        volunteer_states = []
+        volunteer_roles = []
+        self.volunteers = []
+        for i in range(self.num_volunteers):
+            first_name, last_name = self.person()
+            volunteers.append(Volunteer(pk=pk, first_name=first_name, last_name=last_name,
+                email='%s.%s@example.com' % (first_name.lower(), last_name.lower()),
+                website=self.random.choice(['', 'http://example.com/%s' % last_name.lower()]),
+                attended_sprint=self.random.random() < 0.2))
+            for postal, name in self.random.sample(self.states, self.random.randint(1, 3)):
+                volunteer_states.append(Volunteer.states.through(volunteer_id=pk, state_id=postal))
+            for role in self.random.sample(self.roles, self.random.randint(1, len(self.roles))):
+                volunteer_roles.append(Volunteer.roles.through(volunteer_id=pk, volunteerrole_id=role))
+            self.volunteers.append(pk)
+            pk += 1
+        self.bulk_create(Volunteer, volunteers)
+        self.bulk_create(Volunteer.states.through, volunteer_states)
+        self.bulk_create(Volunteer.roles.through, volunteer_roles)
+
+    def random_date(self, year, start_month=1, end_month=12):
+        start = datetime.date(year, start_month, 1)
+        end = datetime.date(year, end_month, 28)
+        return start + datetime.timedelta(days=self.random.randint(0, (end - start).days))
+
+    def generate_logs(self):
+        def logs():
+            for i in range(self.num_logs):
+                postal, name = self.random.choice(self.states)
+                contact, organization = self.random.choice(self.contacts.get(postal, [(None, None)]))
+                date = self.random_date(self.random.choice(self.years))
+                formal_request = self.random.random() < 0.2
+                yield Log(user_id=self.random.choice(self.users)[0], date=date,
+                    subject='Records request' if formal_request else 'Results availability',
+                    follow_up=date + datetime.timedelta(days=20) if formal_request else None,
+                    notes='Synthetic log entry', state_id=postal, org_id=organization,
+                    contact_id=contact, formal_request=formal_request)
+        self.bulk_create(Log, logs())
+        if self.volunteers:
+            self.bulk_create(VolunteerLog, (VolunteerLog(
+                user_id=self.random.choice(self.users)[0],
+                date=self.random_date(self.random.choice(self.years)),
+                subject='Check-in', volunteer_id=self.random.choice(self.volunteers))
+                for i in range(self.num_logs // 10)))
+
+    def calendar(self, year):
+        """
+        Yields ``(race_type, date, special)`` for the regular elections of
+        a state in a year, then extra special elections without end.
+        """
+        primary = None
+        if year % 2 == 0 or self.random.random() < 0.2:
+            primary = self.random_date(year, 3, 9)
+            yield 'primary', primary, False
+            general = general_election_day(year)
+            yield 'general', general, False
+            if self.random.random() < 0.25:
+                yield 'primary-runoff', primary + datetime.timedelta(weeks=self.random.randint(3, 6)), False
+            if self.random.random() < 0.05:
+                yield 'general-runoff', general + datetime.timedelta(weeks=4), False
+        while True:
+            yield self.random.choice(SPECIAL_RACE_TYPES), self.random_date(year), True
+
+    def offices(self, year, race_type, special):
+        if special:
+            return [self.random.choice(['senate', 'house', 'gov', 'state_leg'])]
+        offices = ['house', 'state_leg']
+        if year % 4 == 0:
+            offices.append('prez')
+        for office, chance in (('senate', 0.66), ('gov', 0.33), ('state_officers', 0.5)):
+            if self.random.random() < chance:
+                offices.append(office)
+        if year % 2:
+            # Odd years hold state races only
+            offices = [o for o in offices if o in ('gov', 'state_officers', 'state_leg')] or ['state_leg']
+        return offices
+
+    def election(self, pk, postal, organization, year, race_type, date, special):
+        user_id, user_fullname = self.random.choice(self.users)
+        created = datetime.datetime.combine(date, datetime.time()) + datetime.timedelta(
+            days=self.random.randint(1, 400), seconds=self.random.randint(0, 86399))
+        election = Election(pk=pk, created=created,
+            modified=created + datetime.timedelta(days=self.random.randint(0, 60)),
+            user_id=user_id, user_fullname=user_fullname,
+            race_type=race_type, start_date=date, end_date=date, special=special,
+            state_id=postal, organization_id=organization,
+            result_type='unofficial' if self.random.random() < 0.1 else 'certified',
+            absentee_and_provisional=self.random.random() < 0.3)
+        if race_type.startswith('primary'):
+            election.primary_type = self.random.choice(['closed', 'closed', 'open', 'semi-closed', 'blanket'])
+        if self.random.random() < 0.4:
+            election.proofed_by_id = self.random.choice(self.users)[0]
+        if self.random.random() < 0.05:
+            election.needs_review = 'Dates do not match the official calendar'
+        if self.random.random() < 0.1:
+            election.note = 'Results posted as scanned PDFs'
+        for office in self.offices(year, race_type, special):
+            setattr(election, office, True)
+
+        statuses = OLD_LEVEL_STATUSES if year < 2000 else NEW_LEVEL_STATUSES
+        levels = (('state_level', 1), ('county_level', 0.8),
+            ('precinct_level', 0.3 if year < 2000 else 0.7),
+            ('cong_dist_level', 0.1), ('state_leg_level', 0.1))
+        for (level, chance), (level_field, status_field) in zip(levels, LEVEL_FIELDS):
+            if self.random.random() < chance:
+                setattr(election, level_field, True)
+                setattr(election, status_field, self.random.choice(statuses))
+
+        links = ['http://results.%s.example.gov/%d/%s-%d.%s' % (postal.lower(), year,
+            race_type, i, self.random.choice(['csv', 'pdf', 'xls']))
+            for i in range(self.random.randint(0, 2))]
+        election.direct_links = '\n'.join(links)
+        election.portal_link = 'http://results.%s.example.gov/%d/' % (postal.lower(), year)
+
+        # As in Election.save
+        election.offices_mask = election.get_offices_mask()
+        election.best_level_status = election.get_best_level_status()
+        election.slug = election.make_slug()
+        election.key = election.elec_key(as_string=True)
+        return election, links
+
+    def iter_elections(self, start_pk):
+        """Yields ``(election, links)`` for the new elections"""
+        state_years = [(postal, year) for year in self.years for postal, name in self.states]
+        quota, remainder = divmod(self.num_elections, len(state_years))
+        pk = start_pk
+        for i, (postal, year) in enumerate(state_years):
+            count = quota + (1 if i < remainder else 0)
+            organizations = self.organizations[postal]
+            # Election's unique_together, which the regular elections of
+            # the state agency can't break
+            keys = set()
+            calendar = self.calendar(year)
+            while len(keys) < count:
+                race_type, date, special = calendar.next()
+                organization = organizations[0]
+                if special:
+                    organization = self.random.choice(organizations)
+                key = (organization, race_type, date, special)
+                if key in keys:
+                    continue
+                keys.add(key)
+                yield self.election(pk, postal, organization, year, race_type, date, special)
+                pk += 1
+
+    def generate_elections(self):
+        pk = _next_pk(Election)
+        total = 0
+        for chunk in _chunks(self.iter_elections(pk), self.chunk_size):
+            formats = []
+            links = []
+            for election, urls in chunk:
+                for slug in self.random.sample(self.formats, self.random.randint(1, 3)):
+                    formats.append(Election.formats.through(election_id=election.pk, dataformat_id=slug))
+                for position, url in enumerate(urls):
+                    links.append(DirectLink.for_url(url, election_id=election.pk,
+                        position=position))
+            with transaction.commit_on_success():
+                Election.objects.bulk_create([election for election, urls in chunk])
+                Election.formats.through.objects.bulk_create(formats)
+                DirectLink.objects.bulk_create(links)
+            total += len(chunk)
+            self.log("%d elections" % total)
+        self.counts['Election'] = total
+
+    def finish(self):
+        # Primary keys were assigned here rather than by the database
+        models = [User, Organization, Contact, Volunteer, Election]
+        cursor = connection.cursor()
+        with transaction.commit_on_success():
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
+        State.objects.rebuild_status()
+        bump_versions(list(ALL_STATE_VERSIONS) + [ELECTION_FACETS_VERSION, 'organization'])
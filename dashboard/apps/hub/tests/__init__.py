@@ -1,3 +1,18 @@
 from .test_models import (ElectionTest, LogTest, VolunteerTest, StateTest,
-    StateTestWithDatabase)
-from .test_managers import TestStateManager
+    StateTestWithDatabase, StateStatusTest)
+from .test_managers import TestStateManager, TestStateManagerStatusEntries
+from .test_commands import (CreateStatusJsonTest, ExportResultsMetadataTest,
+    GenerateSyntheticDataTest)
+from .test_views import (StatusJsonViewTest, ElectionExportViewTest,
+    ChangeFeedViewTest)
+from .test_api import (ElectionResourcePaginationTest,
+    ElectionResourceKeysetStatesTest, ElectionResourceQueryCountTest,
+    DirectLinksTest, OfficesFilterTest, SlugLookupTest, SparseFieldsTest,
+    ResponseCacheTest)
+from .test_admin import (StateAdminChangelistTest,
+    StateAdminElectionInlineTest, OrganizationAutocompleteTest,
+    ElectionAdminFacetsTest, EstimatedCountChangeListTest,
+    ElectionAdminActionsTest)
+from .test_forms import ElectionFormSetUniqueChecksTest
+from .test_publish import PublishExportsTest, S3BackendTest
+from .test_middleware import QueryCountMiddlewareTest, QueryBudgetTest
@@ -0,0 +1,344 @@
+import datetime
+import json
+
+import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.paginator import EmptyPage
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from ..admin import ElectionAdmin
+from ..models import Election, Organization, ProxyUser, State
+from ..paginators import ROW_ESTIMATE_KEY, EstimatedCountPaginator
+
+
+class AdminTestCase(TestCase):
+
+    def setUp(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        self.client.login(username='admin', password='admin')
+
+
+class StateAdminChangelistTest(AdminTestCase):
+    fixtures = [
+        'test_state_status',
+        'test_elecdata_model',
+    ]
+    url = '/admin/hub/state/'
+
+    def setUp(self):
+        super(StateAdminChangelistTest, self).setUp()
+        # One of Florida's five elections
+        Election.objects.filter(pk=4).update(proofed_by=ProxyUser.objects.get(pk=9))
+
+    def get_changelist(self, data=None):
+        response = self.client.get(self.url, data or {})
+        self.assertEqual(response.status_code, 200)
+        return response.context['cl']
+
+    def test_percent_proofed(self):
+        # An election that isn't proofed, in a state of its own
+        Election.objects.filter(pk=35).update(state='IL')
+        cl = self.get_changelist()
+        model_admin = cl.model_admin
+        pcts = dict((state.postal, model_admin.percent_proofed(state))
+            for state in cl.result_list)
+        self.assertEqual(pcts['FL'], '25.0')
+        self.assertEqual(pcts['IL'], '0.0')
+        # States without elections look the same
+        self.assertEqual(pcts['KS'], '0.0')
+
+    def test_num_queries_independent_of_rows(self):
+        # Render once so that one-off queries (sessions, content types)
+        # are out of the way
+        self.get_changelist()
+        # Previously two more queries per state
+        with self.assertNumQueries(6):
+            cl = self.get_changelist()
+        self.assertTrue(len(cl.result_list) > 1)
+
+    def test_sort_and_filter(self):
+        # Where states without elections sort depends on the database
+        for order in ('3', '-3'):
+            cl = self.get_changelist({'o': order})
+            self.assertIn('proofed_pct', str(cl.query_set.query))
+
+        cl = self.get_changelist({'proofed': 'under50'})
+        self.assertIn('FL', [state.postal for state in cl.result_list])
+        cl = self.get_changelist({'proofed': 'none'})
+        self.assertNotIn('FL', [state.postal for state in cl.result_list])
+        self.assertIn('KS', [state.postal for state in cl.result_list])
+        cl = self.get_changelist({'proofed': 'over50'})
+        self.assertEqual(list(cl.result_list), [])
+
+
+class StateAdminElectionInlineTest(AdminTestCase):
+    fixtures = [
+        'test_state_status',
+        'test_elecdata_model',
+    ]
+    url = '/admin/hub/state/FL/'
+
+    def get_formset(self, response):
+        self.assertEqual(response.status_code, 200)
+        for inline_admin_formset in response.context['inline_admin_formsets']:
+            if inline_admin_formset.formset.model == Election:
+                return inline_admin_formset.formset
+
+    def test_newest_year_by_default(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['election_years'], [2012, 2011])
+        formset = self.get_formset(response)
+        self.assertEqual(sorted(form.instance.pk for form in formset.forms), [4, 30, 31])
+
+    def test_year(self):
+        response = self.client.get(self.url, {'election_year': '2011'})
+        self.assertEqual(len(self.get_formset(response).forms), 2)
+        # Unknown years fall back to the newest one
+        response = self.client.get(self.url, {'election_year': '1900'})
+        self.assertEqual(response.context['election_year'], 2012)
+
+    def test_inline_fragment(self):
+        response = self.client.get(self.url + 'elections/', {'election_year': '2011'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['inline_admin_formset'].formset.forms), 2)
+        self.assertContains(response, 'id="election_set-group"')
+        self.assertNotContains(response, '<form')
+        response = self.client.get('/admin/hub/state/XX/elections/')
+        self.assertEqual(response.status_code, 404)
+
+    def post_elections(self, year, pks):
+        data = {
+            'election_year': year,
+            'election_set-TOTAL_FORMS': len(pks),
+            'election_set-INITIAL_FORMS': len(pks),
+            'log_set-TOTAL_FORMS': 0,
+            'log_set-INITIAL_FORMS': 0,
+        }
+        for i, pk in enumerate(pks):
+            data['election_set-%d-id' % i] = pk
+        return self.client.post(self.url, data)
+
+    def test_form_carries_year(self):
+        response = self.client.get(self.url)
+        self.assertContains(response,
+            '<input type="hidden" name="election_year" value="2012">')
+
+    def test_post_uses_rendered_year(self):
+        # Someone adds an election in a newer year after the form is rendered
+        election = Election.objects.get(pk=4)
+        election.pk = None
+        election.start_date = election.end_date = datetime.date(2013, 11, 5)
+        election.save()
+        response = self.post_elections(2012, [4, 30, 31])
+        # The form is invalid, but bound to the 2012 elections
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['election_year'], 2012)
+        formset = self.get_formset(response)
+        self.assertEqual(sorted(form.instance.pk for form in formset.forms), [4, 30, 31])
+
+    def test_post_rejects_changed_elections(self):
+        # Someone moves one of the elections shown to another year
+        Election.objects.filter(pk=30).update(start_date=datetime.date(2011, 5, 1))
+        response = self.post_elections(2012, [4, 30, 31])
+        self.assertRedirects(response, self.url + '?election_year=2012')
+
+
+class OrganizationAutocompleteTest(AdminTestCase):
+    fixtures = [
+        'test_state_status',
+        'test_elecdata_model',
+    ]
+    url = '/admin/hub/organization/autocomplete/'
+
+    def setUp(self):
+        super(OrganizationAutocompleteTest, self).setUp()
+        Organization.objects.create(name='Florida Elections Watch', state='GA')
+        Organization.objects.create(name='Kansas Secretary of State', state='KS')
+
+    def autocomplete(self, term, state=''):
+        response = self.client.get(self.url, {'term': term, 'state': state})
+        self.assertEqual(response.status_code, 200)
+        return [item['label'] for item in json.loads(response.content)]
+
+    def test_prefix_search(self):
+        self.assertEqual(self.autocomplete('Florida', 'FL'),
+            ['Florida Division of Elections', 'Florida Elections Watch (GA)'])
+        self.assertEqual(self.autocomplete('florida div'),
+            ['Florida Division of Elections (FL)'])
+        self.assertEqual(self.autocomplete('division'), [])
+        self.assertEqual(self.autocomplete(''), [])
+
+    def test_inline_renders_no_organization_options(self):
+        response = self.client.get('/admin/hub/state/FL/')
+        self.assertNotContains(response, '>Kansas Secretary of State<')
+        self.assertContains(response,
+            'class="vTextField organization-autocomplete-label" value="Florida Division of Elections"')
+
+
+class ElectionAdminFacetsTest(AdminTestCase):
+    fixtures = [
+        'test_state_status',
+        'test_elecdata_model',
+    ]
+    url = '/admin/hub/election/'
+
+    def setUp(self):
+        super(ElectionAdminFacetsTest, self).setUp()
+        cache.clear()
+        election = Election.objects.get(pk=4)
+        election.pk = None
+        election.state_id = 'KS'
+        election.user_fullname = 'Clay, Aaliyah'
+        election.save()
+
+    def get_filter_choices(self, title):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        cl = response.context['cl']
+        for spec in cl.filter_specs:
+            if unicode(spec.title) == title:
+                return [unicode(choice['display']) for choice in spec.choices(cl)]
+
+    def test_facet_choices(self):
+        self.assertEqual(self.get_filter_choices('state'),
+            ['All', 'Florida (5)', 'Kansas (1)'])
+        self.assertIn('Clay, Aaliyah (1)', self.get_filter_choices('user fullname'))
+
+    def test_num_queries(self):
+        self.client.get(self.url)
+        # The session, the user, the count, the page and grappelli's list
+        # of content types
+        with self.assertNumQueries(5):
+            response = self.client.get(self.url)
+        self.assertContains(response, '<option value="9">Smith, John</option>')
+
+    def test_invalidation(self):
+        self.get_filter_choices('state')
+        election = Election.objects.get(pk=4)
+        election.proofed_by = ProxyUser.objects.get(pk=9)
+        election.save()
+        self.assertEqual(self.get_filter_choices('proofed by'),
+            ['All', 'Smith, John (1)', '(None)'])
+
+
+@override_settings(HUB_EXACT_COUNT_THRESHOLD=3)
+class EstimatedCountChangeListTest(AdminTestCase):
+    fixtures = [
+        'test_state_status',
+        'test_elecdata_model',
+    ]
+    url = '/admin/hub/election/'
+
+    def setUp(self):
+        super(EstimatedCountChangeListTest, self).setUp()
+        cache.clear()
+
+    def test_unfiltered_count_is_estimated(self):
+        self.client.get(self.url)
+        # The cached count stands in for an estimate on SQLite, so no
+        # COUNT query is run
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url)
+        cl = response.context['cl']
+        self.assertEqual(cl.result_count, 5)
+        self.assertTrue(cl.result_count_estimated)
+        self.assertContains(response, '<abbr title="Estimated">~</abbr>5 total')
+
+    def test_filtered_count_is_exact(self):
+        response = self.client.get(self.url, {'race_type__exact': 'general'})
+        cl = response.context['cl']
+        self.assertEqual(cl.result_count, 2)
+        self.assertFalse(cl.result_count_estimated)
+        self.assertTrue(cl.full_result_count_estimated)
+
+    @override_settings(HUB_EXACT_COUNT_THRESHOLD=10)
+    def test_exact_below_threshold(self):
+        response = self.client.get(self.url)
+        self.assertFalse(response.context['cl'].result_count_estimated)
+        self.assertNotContains(response, 'title="Estimated"')
+
+    def underestimate(self):
+        # Three of the five elections
+        cache.set(ROW_ESTIMATE_KEY % ('default', Election._meta.db_table), 3)
+
+    def test_pages_past_underestimate(self):
+        self.underestimate()
+        paginator = EstimatedCountPaginator(Election.objects.order_by('pk'), 2)
+        self.assertEqual(paginator.count, 3)
+        self.assertEqual(paginator.num_pages, 2)
+        page = paginator.page(2)
+        self.assertEqual(len(page.object_list), 2)
+        self.assertTrue(page.has_next())
+        page = paginator.page(3)
+        self.assertEqual(len(page.object_list), 1)
+        self.assertEqual(page.end_index(), 5)
+        self.assertFalse(page.has_next())
+        self.assertRaises(EmptyPage, paginator.page, 4)
+
+    def test_changelist_links_past_underestimate(self):
+        self.underestimate()
+        with mock.patch.object(ElectionAdmin, 'list_per_page', 2):
+            response = self.client.get(self.url, {'p': 1})
+            cl = response.context['cl']
+            self.assertEqual(len(cl.result_list), 2)
+            self.assertEqual(cl.next_page_url, '?p=2')
+            self.assertContains(response, '<a href="?p=2">Next</a>')
+
+            response = self.client.get(self.url, {'p': 2})
+            self.assertEqual(response.status_code, 200)
+            cl = response.context['cl']
+            self.assertEqual(len(cl.result_list), 1)
+            self.assertIsNone(cl.next_page_url)
+
+
+class ElectionAdminActionsTest(AdminTestCase):
+    fixtures = [
+        'test_state_status',
+        'test_elecdata_model',
+    ]
+    url = '/admin/hub/election/'
+
+    def test_set_level_status(self):
+        data = {
+            'action': 'set_level_status',
+            '_selected_action': ['4', '30'],
+        }
+        response = self.client.post(self.url, dict(data, index='0'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '2 selected elections')
+
+        data.update(post='yes', level='county_level_status', status='baked')
+        response = self.client.post(self.url, data)
+        self.assertEqual(response.status_code, 302)
+        elections = Election.objects.order_by('pk')
+        self.assertEqual([e.county_level_status for e in elections],
+            ['baked', 'baked', '', '', ''])
+        self.assertEqual([e.best_level_status for e in elections], [6, 6, 0, 0, 0])
+        self.assertTrue(elections[0].modified > elections[2].modified)
+        # The state's status is refreshed even though no election was saved
+        self.assertEqual(State.objects.get(pk='FL').results_status, 'clean')
+
+    def test_invalid_values(self):
+        response = self.client.post(self.url, {
+            'action': 'set_level_status',
+            '_selected_action': ['4'],
+            'post': 'yes',
+            'level': 'race_type',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors)
+        self.assertEqual(Election.objects.get(pk=4).race_type, 'general')
+
+    def test_select_across_filtered(self):
+        response = self.client.post(self.url + '?race_type__exact=general', {
+            'action': 'set_proofed_by',
+            '_selected_action': ['4'],
+            'select_across': '1',
+            'post': 'yes',
+            'proofed_by': '9',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(sorted(Election.objects.filter(proofed_by=9)
+            .values_list('pk', flat=True)), [4, 36])
@@ -0,0 +1,292 @@
+import json
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from ..api import CachedResponseMixin
+from ..models import Election, Organization, State
+
+
+class ApiTestCase(TestCase):
+
+    def setUp(self):
+        # Responses are cached across requests, and the cache outlives
+        # each test's database transaction
+        cache.clear()
+
+    def get_json(self, path, data=None):
+        response = self.client.get(path, data or {})
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+
+class ElectionResourcePaginationTest(ApiTestCase):
+    fixtures = [
+        'test_elecdata_model',
+    ]
+    url = '/api/v1/election/'
+
+    def test_offset_pagination(self):
+        data = self.get_json(self.url, {'format': 'json', 'limit': 2})
+        self.assertEqual(data['meta']['total_count'], 5)
+        self.assertEqual(data['meta']['offset'], 0)
+        self.assertEqual(len(data['objects']), 2)
+
+    def test_cursor_pagination(self):
+        expected = list(Election.objects.order_by('state__postal', 'end_date', 'id')
+            .values_list('id', flat=True))
+        data = self.get_json(self.url, {'format': 'json', 'cursor': '', 'limit': 2})
+        self.assertNotIn('total_count', data['meta'])
+        ids = [obj['id'] for obj in data['objects']]
+        pages = 1
+        while data['meta']['next']:
+            data = self.get_json(data['meta']['next'])
+            ids.extend(obj['id'] for obj in data['objects'])
+            pages += 1
+        self.assertEqual(pages, 3)
+        self.assertEqual(ids, expected)
+
+    def test_cursor_pagination_count(self):
+        data = self.get_json(self.url,
+            {'format': 'json', 'cursor': '', 'limit': 2, 'count': 'true'})
+        self.assertEqual(data['meta']['total_count'], 5)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'format': 'json', 'cursor': 'bogus'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ElectionResourceKeysetStatesTest(ApiTestCase):
+    # Alaska/Alabama and Iowa/Idaho sort differently by name and by postal
+    # code, which is what the cursor compares
+    fixtures = [
+        'test_elecdata_model',
+        'test_keyset_states',
+    ]
+    url = '/api/v1/election/'
+
+    def test_cursor_pagination_visits_each_election_once(self):
+        expected = set(Election.objects.values_list('id', flat=True))
+        data = self.get_json(self.url, {'format': 'json', 'cursor': '', 'limit': 3})
+        ids = [obj['id'] for obj in data['objects']]
+        while data['meta']['next']:
+            data = self.get_json(data['meta']['next'])
+            ids.extend(obj['id'] for obj in data['objects'])
+        self.assertEqual(len(ids), len(expected))
+        self.assertEqual(set(ids), expected)
+        states = list(Election.objects.in_bulk(ids)[pk].state_id for pk in ids)
+        self.assertEqual(states, sorted(states))
+
+
+class ElectionResourceQueryCountTest(ApiTestCase):
+    fixtures = [
+        'test_elecdata_model',
+    ]
+    url = '/api/v1/election/'
+
+    def test_list_num_queries(self):
+        # The count, the page itself and its direct links, whatever the
+        # page size
+        for limit in (1, 5):
+            with self.assertNumQueries(3):
+                response = self.client.get(self.url,
+                    {'format': 'json', 'limit': limit})
+            self.assertEqual(len(json.loads(response.content)['objects']), limit)
+
+    def test_detail_num_queries(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('%s4/' % self.url, {'format': 'json'})
+        data = json.loads(response.content)
+        self.assertEqual(data['state']['postal'], 'FL')
+        self.assertEqual(data['organization']['slug'], 'florida-division-elections')
+
+
+class DirectLinksTest(ApiTestCase):
+    fixtures = [
+        'test_elecdata_model',
+    ]
+    url = '/api/v1/election/'
+
+    def setUp(self):
+        super(DirectLinksTest, self).setUp()
+        election = Election.objects.get(pk=4)
+        election.direct_links = ("http://Results.example.com/2012.csv\r\n\r\n"
+            "http://other.example.org/2012.zip\n")
+        election.save()
+
+    def get_objects(self, data):
+        data['format'] = 'json'
+        response = self.client.get(self.url, data)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)['objects']
+
+    def test_direct_links(self):
+        objects = self.get_objects({'fields': 'id,direct_links'})
+        links = dict((obj['id'], obj['direct_links']) for obj in objects)
+        self.assertEqual(links[4], ['http://Results.example.com/2012.csv',
+            'http://other.example.org/2012.zip'])
+        self.assertEqual(links[30], [])
+
+    def test_filters(self):
+        objects = self.get_objects({'direct_links__host': 'results.EXAMPLE.com'})
+        self.assertEqual([obj['id'] for obj in objects], [4])
+        objects = self.get_objects({'direct_links': 'http://other.example.org/2012.zip'})
+        self.assertEqual([obj['id'] for obj in objects], [4])
+        self.assertEqual(self.get_objects({'direct_links__host': 'example.net'}), [])
+        self.assertEqual(self.get_objects({'direct_links': 'http://other.example.org/'}), [])
+
+
+class OfficesFilterTest(ApiTestCase):
+    fixtures = [
+        'test_elecdata_model',
+    ]
+    url = '/api/v1/election/'
+
+    def get_ids(self, data):
+        data['format'] = 'json'
+        response = self.client.get(self.url, data)
+        self.assertEqual(response.status_code, 200)
+        return sorted(obj['id'] for obj in json.loads(response.content)['objects'])
+
+    def test_filters(self):
+        self.assertEqual(self.get_ids({'offices': 'prez,senate'}), [4, 30, 31])
+        self.assertEqual(self.get_ids({'offices__all': 'prez,senate'}), [4])
+        self.assertEqual(self.get_ids({'offices': 'state_leg', 'offices__all': 'senate,house'}), [4, 30])
+        response = self.client.get(self.url, {'offices': 'mayor', 'format': 'json'})
+        self.assertEqual(response.status_code, 400)
+
+
+class SlugLookupTest(ApiTestCase):
+    fixtures = [
+        'test_elecdata_model',
+    ]
+
+    def get(self, path, data=None):
+        params = {'format': 'json'}
+        params.update(data or {})
+        response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def test_detail(self):
+        data = self.get('/api/v1/election/fl-2011-09-20-special-primary/')
+        self.assertEqual(data['id'], 35)
+        self.assertEqual(data['slug'], 'fl-2011-09-20-special-primary')
+        self.assertEqual(self.get('/api/v1/election/4/')['slug'], 'fl-2012-11-06-general')
+        response = self.client.get('/api/v1/election/ks-2012-11-06-general/', {'format': 'json'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_batch(self):
+        data = self.get('/api/v1/election/',
+            {'slug__in': 'fl-2012-11-06-general,fl-2011-10-20-special-general,ks-2012-11-06-general'})
+        self.assertEqual(sorted(obj['id'] for obj in data['objects']), [4, 36])
+
+
+class SparseFieldsTest(ApiTestCase):
+    fixtures = [
+        'test_elecdata_model',
+    ]
+
+    def get_objects(self, path, data):
+        data['format'] = 'json'
+        response = self.client.get(path, data)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)['objects']
+
+    def test_fields(self):
+        objects = self.get_objects('/api/v1/election/',
+            {'fields': 'id,start_date,state_level_status'})
+        self.assertEqual(len(objects), 5)
+        for obj in objects:
+            self.assertEqual(sorted(obj.keys()),
+                ['id', 'start_date', 'state_level_status'])
+
+    def test_unexpanded_relations(self):
+        with self.assertNumQueries(2):
+            objects = self.get_objects('/api/v1/election/',
+                {'fields': 'id,state,organization', 'expand': ''})
+        self.assertEqual(objects[0]['state'], '/api/v1/state/FL/')
+        self.assertEqual(objects[0]['organization'], '/api/v1/organization/3/')
+
+    def test_expanded_nested_fields(self):
+        with self.assertNumQueries(2):
+            objects = self.get_objects('/api/v1/election/',
+                {'fields': 'id,state.name', 'expand': 'state'})
+        self.assertEqual(objects[0]['state'], {'name': 'Florida'})
+
+    def test_default_expansion(self):
+        objects = self.get_objects('/api/v1/election/', {'fields': 'organization'})
+        self.assertEqual(objects[0]['organization']['slug'], 'florida-division-elections')
+
+    def test_other_resources(self):
+        objects = self.get_objects('/api/v1/state/', {'fields': 'postal'})
+        self.assertEqual(objects, [{'postal': 'FL'}])
+        objects = self.get_objects('/api/v1/organization/', {'fields': 'slug,state'})
+        self.assertEqual(objects, [{'slug': 'florida-division-elections', 'state': 'FL'}])
+
+    def test_invalid_fields(self):
+        for params in ({'fields': 'bogus'}, {'expand': 'start_date'},
+                {'fields': 'state.bogus'}):
+            params['format'] = 'json'
+            response = self.client.get('/api/v1/election/', params)
+            self.assertEqual(response.status_code, 400)
+
+
+class ResponseCacheTest(ApiTestCase):
+    fixtures = [
+        'test_state_status',
+        'test_elecdata_model',
+    ]
+
+    def get(self, path, data=None):
+        params = {'format': 'json'}
+        params.update(data or {})
+        response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def test_cached(self):
+        data = self.get('/api/v1/election/')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get('/api/v1/election/'), data)
+        # Parameter order doesn't matter
+        self.get('/api/v1/election/', {'limit': 2, 'offset': 1})
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/v1/election/?offset=1&format=json&limit=2')
+        self.assertEqual(len(json.loads(response.content)['objects']), 2)
+
+    def test_default_versions(self):
+        versions = CachedResponseMixin().get_cache_versions(None, 'list', {})
+        self.assertIn('state:FL', versions)
+        self.assertIn('organization', versions)
+
+    def test_election_save_invalidates_only_its_state(self):
+        self.get('/api/v1/election/', {'state': 'FL'})
+        self.get('/api/v1/election/', {'state': 'KS'})
+        self.get('/api/v1/election/')
+
+        election = Election.objects.get(pk=4)
+        election.state_level_status = 'baked'
+        election.save()
+
+        with self.assertNumQueries(0):
+            self.get('/api/v1/election/', {'state': 'KS'})
+        data = self.get('/api/v1/election/', {'state': 'FL'})
+        self.assertIn('baked', [o['state_level_status'] for o in data['objects']])
+        data = self.get('/api/v1/election/')
+        self.assertIn('baked', [o['state_level_status'] for o in data['objects']])
+
+    def test_state_and_organization_invalidation(self):
+        self.get('/api/v1/state/KS/')
+        self.get('/api/v1/organization/')
+        state = State.objects.get(pk='KS')
+        state.name = 'Kansas!'
+        state.save()
+        self.assertEqual(self.get('/api/v1/state/KS/')['name'], 'Kansas!')
+
+        organization = Organization.objects.get(pk=3)
+        organization.city = 'Miami'
+        organization.save()
+        self.assertEqual(self.get('/api/v1/organization/')['objects'][0]['city'], 'Miami')
+        data = self.get('/api/v1/election/', {'state': 'FL'})
+        self.assertEqual(data['objects'][0]['organization']['city'], 'Miami')
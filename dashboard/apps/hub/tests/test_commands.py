@@ -0,0 +1,176 @@
+import csv
+import datetime
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from StringIO import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from ..models import (Election, Log, Organization, State, Volunteer,
+    split_direct_links)
+from ..results_metadata import FINGERPRINTS_FILE
+
+class CreateStatusJsonTest(TestCase):
+    fixtures = [
+        'test_state_status',
+    ]
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'status.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_output(self):
+        call_command('create_status_json', output=self.path, stdout=StringIO())
+        expected = State.objects.status_json()
+        with open(self.path) as f:
+            self.assertEqual(f.read(), expected)
+        gz = gzip.open(self.path + '.gz')
+        try:
+            self.assertEqual(gz.read(), expected)
+        finally:
+            gz.close()
+        # No temporary files are left behind
+        self.assertEqual(sorted(os.listdir(self.tmpdir)),
+            ['status.json', 'status.json.gz'])
+
+    def test_output_unchanged(self):
+        call_command('create_status_json', output=self.path, stdout=StringIO())
+        os.utime(self.path, (1000000000, 1000000000))
+        stdout = StringIO()
+        call_command('create_status_json', output=self.path, stdout=stdout)
+        self.assertIn('unchanged', stdout.getvalue())
+        self.assertEqual(os.stat(self.path).st_mtime, 1000000000)
+        self.assertEqual(len(os.listdir(self.tmpdir)), 2)
+
+        State.objects.filter(pk='KS').update(name='Kansas!')
+        call_command('create_status_json', output=self.path, stdout=StringIO())
+        with open(self.path) as f:
+            self.assertIn('Kansas!', f.read())
+
+
+class ExportResultsMetadataTest(TestCase):
+    fixtures = [
+        'test_state_status',
+        'test_elecdata_model',
+    ]
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def export(self, **options):
+        stdout = StringIO()
+        call_command('export_results_metadata', self.tmpdir, processes=1,
+            stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def read(self, path):
+        with open(os.path.join(self.tmpdir, path)) as f:
+            return f.read()
+
+    def test_layout(self):
+        self.export()
+        self.assertEqual(sorted(os.listdir(os.path.join(self.tmpdir, 'fl'))),
+            ['2011', '2012', 'metadata.csv', 'metadata.json'])
+        metadata = json.loads(self.read('fl/metadata.json'))
+        self.assertEqual(metadata['years'], [2011, 2012])
+        self.assertEqual(metadata['updated_at'], '2013-03-11T23:25:41')
+        self.assertEqual(json.loads(self.read('ks/metadata.json')),
+            {'years': [], 'updated_at': None, 'volunteers': ['John Smith']})
+
+        elections = json.loads(self.read('fl/2012/elections.json'))
+        self.assertEqual(elections['state'], 'FL')
+        self.assertEqual([e['date'] for e in elections['elections']],
+            ['2012-01-31', '2012-08-14', '2012-11-06'])
+        general = elections['elections'][2]
+        self.assertEqual(general['results_type'], 'Certified')
+        self.assertEqual(general['office'],
+            'President, Senate, House, State Officers, State Legislature')
+        self.assertEqual(general['result_levels'][0]['race_wide'], True)
+
+        rows = list(csv.reader(StringIO(self.read('fl/2011/elections.csv'))))
+        self.assertEqual(rows[0][:4], ['year', 'state', 'date', 'results_type'])
+        self.assertEqual([row[2] for row in rows[1:]], ['2011-09-20', '2011-10-20'])
+
+    def test_incremental(self):
+        self.export()
+        output = self.export()
+        self.assertIn('0 file(s) written, 0 removed, 2 state year(s) unchanged', output)
+
+        election = Election.objects.get(pk=35)
+        election.special = False
+        election.save()
+        output = self.export()
+        self.assertNotIn('fl/2012/', output)
+        self.assertIn('Wrote fl/2011/elections.json', output)
+        self.assertIn('1 state year(s) unchanged', output)
+
+        Election.objects.filter(start_date__year=2011).delete()
+        output = self.export()
+        self.assertIn('Removed fl/2011/elections.csv', output)
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir, 'fl', '2011')))
+        self.assertEqual(json.loads(self.read('fl/metadata.json'))['years'], [2012])
+        self.assertIn('0 state year(s) unchanged', self.export(force=True))
+
+    def test_force_removes_deleted_years(self):
+        self.export()
+        Election.objects.filter(start_date__year=2011).delete()
+        output = self.export(force=True)
+        self.assertIn('Removed fl/2011/elections.json', output)
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir, 'fl', '2011')))
+        self.assertNotIn('fl/2011', json.loads(self.read(FINGERPRINTS_FILE)))
+
+
+class GenerateSyntheticDataTest(TestCase):
+
+    def generate(self, **options):
+        options = dict(dict(elections=300, years=3, counties=2, users=2,
+            volunteers=5, logs=10, chunk_size=50), **options)
+        call_command('generate_synthetic_data', stdout=StringIO(), **options)
+
+    def test_generate(self):
+        self.generate()
+        self.assertEqual(State.objects.count(), 51)
+        self.assertEqual(Election.objects.count(), 300)
+        self.assertEqual(Organization.objects.count(), 51 * 3)
+        self.assertEqual([d.year for d in Election.objects.dates('start_date', 'year')],
+            [2012, 2013, 2014])
+        self.assertTrue(Volunteer.objects.filter(states__isnull=False, roles__slug='dev').exists())
+        self.assertEqual(Log.objects.count(), 10)
+
+        # The columns save() maintains are set as it would set them
+        for election in Election.objects.order_by('?')[:20]:
+            values = (election.slug, election.key, election.offices_mask,
+                election.best_level_status)
+            self.assertEqual(values, (election.make_slug(), election.elec_key(as_string=True),
+                election.get_offices_mask(), election.get_best_level_status()))
+            self.assertEqual([link.url for link in election.links.all()],
+                split_direct_links(election.direct_links))
+            self.assertTrue(election.formats.exists())
+        self.assertEqual(State.objects.rebuild_status(), 0)
+
+        # Another run adds to the data, with new primary keys
+        self.generate(elections=100)
+        self.assertEqual(Election.objects.count(), 400)
+        # The sequences were reset past the assigned primary keys
+        Election.objects.create(user_id=1, state_id='FL', race_type='general',
+            start_date=datetime.date(1900, 11, 6), end_date=datetime.date(1900, 11, 6))
+
+    def test_invalid_options(self):
+        # More elections than the 51 states can have in a year with 3 race
+        # types, 362 days and 3 organizations for their special elections
+        self.assertRaises(CommandError, self.generate, years=1,
+            elections=51 * 3 * 362 * 3 + 1)
+        # No users to enter the elections
+        self.assertRaises(CommandError, self.generate, users=0)
+        self.assertFalse(Election.objects.exists())
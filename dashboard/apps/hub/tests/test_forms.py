@@ -0,0 +1,83 @@
+from django.db import connection
+from django.forms.models import BaseInlineFormSet, inlineformset_factory
+from django.test import TestCase
+
+from ..forms import BaseElectionInlineFormSet, ElectionAdminForm
+from ..models import Election, State
+
+ELECTION_FIELDS = ['organization', 'race_type', 'start_date', 'end_date',
+    'special', 'primary_type', 'prez', 'senate', 'house', 'state_leg']
+
+
+class ElectionFormSetUniqueChecksTest(TestCase):
+    fixtures = [
+        'test_state_status',
+        'test_elecdata_model',
+    ]
+
+    def get_data(self, new_elections):
+        """
+        Returns POST data for Florida's elections, followed by new ones from
+        ``new_elections``, a list of dicts of field values.
+        """
+        elections = list(Election.objects.filter(state='FL').order_by('pk'))
+        rows = []
+        for election in elections:
+            row = dict((name, getattr(election, name)) for name in ELECTION_FIELDS)
+            row.update(id=election.pk, organization=election.organization_id)
+            rows.append(row)
+        rows.extend(new_elections)
+
+        data = {
+            'election_set-TOTAL_FORMS': len(rows),
+            'election_set-INITIAL_FORMS': len(elections),
+            'election_set-MAX_NUM_FORMS': '',
+        }
+        for i, row in enumerate(rows):
+            for name, value in row.items():
+                if value is False:
+                    continue
+                data['election_set-%d-%s' % (i, name)] = 'on' if value is True else value
+        return data
+
+    def clean_formset(self, formset_class, data):
+        connection.use_debug_cursor = True
+        start = len(connection.queries)
+        formset = formset_class(data, instance=State.objects.get(pk='FL'))
+        self.assertFalse(formset.is_valid())
+        errors = [form.errors for form in formset.forms]
+        non_form_errors = formset.non_form_errors()
+        connection.use_debug_cursor = None
+        return errors, non_form_errors, len(connection.queries) - start
+
+    def test_same_errors_in_one_query(self):
+        new_election = {
+            'organization': 3, 'race_type': 'general', 'start_date': '2013-11-05',
+            'end_date': '2013-11-05', 'prez': True,
+        }
+        data = self.get_data([
+            # The same as election 4
+            {'organization': 3, 'race_type': 'general', 'start_date': '2012-11-06',
+                'end_date': '2012-11-06', 'prez': True},
+            # Twice the same new election
+            new_election,
+            new_election,
+        ])
+        # Move election 30 onto election 31's date
+        data['election_set-1-start_date'] = data['election_set-1-end_date'] = '2012-01-31'
+
+        def make_formset(formset):
+            return inlineformset_factory(State, Election, form=ElectionAdminForm,
+                formset=formset, fields=ELECTION_FIELDS, extra=0)
+        batched = self.clean_formset(make_formset(BaseElectionInlineFormSet), data)
+        unbatched = self.clean_formset(make_formset(BaseInlineFormSet), data)
+
+        errors, non_form_errors, num_queries = batched
+        self.assertEqual(errors, unbatched[0])
+        self.assertEqual(non_form_errors, unbatched[1])
+        self.assertTrue(errors[1])
+        self.assertTrue(errors[5])
+        self.assertFalse(errors[6])
+        self.assertTrue(non_form_errors)
+        # Each of the eight forms queried on its own
+        self.assertEqual(num_queries, unbatched[2] - 7)
@@ -2,7 +2,7 @@ import json
 
 from django.test import TestCase
 
-from ..models import State 
+from ..models import Election, State 
 
 class TestStateManager(TestCase):
     fixtures = [
@@ -19,3 +19,46 @@ class TestStateManager(TestCase):
         self.assertEqual(status['metadata_status'], "partial")
         self.assertEqual(len(status['volunteers']), 1)
         self.assertEqual(status['volunteers'][0]['full_name'], "Aaliyah Clay")
+
+
+class TestStateManagerStatusEntries(TestCase):
+    fixtures = [
+        'test_state_status',
+        'test_elecdata_model',
+    ]
+
+    def setUp(self):
+        State.objects.rebuild_status()
+        election = Election.objects.get(pk=4)
+        election.county_level_status = 'baked-raw'
+        election.save()
+
+    def test_status_json_matches_status_entry(self):
+        expected = json.dumps([s.status_entry() for s in State.objects.all()])
+        self.assertEqual(State.objects.status_json(), expected)
+
+    def test_status_json_num_queries(self):
+        # States, volunteers and roles
+        with self.assertNumQueries(3):
+            State.objects.status_json()
+
+    def test_status_entries_results_status(self):
+        statuses = dict((e['postal'], e['results_status'])
+            for e in State.objects.status_entries())
+        self.assertEqual(statuses, {
+            'FL': 'raw',
+            'IL': 'partial',
+            'KS': None,
+        })
+
+    def test_rebuild_status(self):
+        State.objects.update(results_status=None, election_count=0,
+            dev_volunteer_count=0)
+        self.assertEqual(State.objects.rebuild_status(), 2)
+        fl = State.objects.get(pk='FL')
+        self.assertEqual(fl.results_status, 'raw')
+        self.assertEqual(fl.election_count, 5)
+        il = State.objects.get(pk='IL')
+        self.assertEqual(il.results_status, 'partial')
+        self.assertEqual(il.dev_volunteer_count, 1)
+        self.assertEqual(State.objects.rebuild_status(), 0)
@@ -0,0 +1,75 @@
+import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from ..middleware import QueryCounter
+from .utils import QueryBudgetTestMixin
+
+
+@override_settings(MIDDLEWARE_CLASSES=(
+    'dashboard.apps.hub.middleware.QueryCountMiddleware',) + settings.MIDDLEWARE_CLASSES)
+class QueryCountMiddlewareTest(TestCase):
+    fixtures = [
+        'test_state_status',
+    ]
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(HUB_QUERY_BUDGETS={'status_json': 1})
+    def test_budget_warning(self):
+        with mock.patch('dashboard.apps.hub.middleware.logger') as logger:
+            self.client.get('/status.json')
+            self.assertEqual(logger.warning.call_count, 1)
+            self.assertEqual(logger.warning.call_args[0][1:4], ('status_json', 4, 1))
+            # Cached
+            self.client.get('/status.json')
+            self.assertEqual(logger.warning.call_count, 1)
+
+    @override_settings(HUB_QUERY_STATS_INTERVAL=2)
+    def test_top_offenders(self):
+        with mock.patch('dashboard.apps.hub.middleware.logger') as logger:
+            self.client.get('/status.json')
+            self.assertFalse(logger.info.called)
+            self.client.get('/api/v1/changes/')
+            self.assertEqual([call[0][1:4] for call in logger.info.call_args_list],
+                [('status_json', 4, 1), ('change_feed', 1, 1)])
+
+    def test_raw_cursor_without_debug(self):
+        with QueryCounter() as counter:
+            cursor = connection.cursor()
+            cursor.execute('SELECT 1')
+        self.assertEqual(counter.count, 1)
+        # The SQL isn't kept around when DEBUG is off
+        self.assertEqual(connection.queries, [])
+
+
+class QueryBudgetTest(QueryBudgetTestMixin, TestCase):
+    fixtures = [
+        'test_state_status',
+        'test_elecdata_model',
+    ]
+
+    def setUp(self):
+        cache.clear()
+        User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+
+    def test_admin(self):
+        self.client.login(username='admin', password='admin')
+        for path in ('/admin/hub/state/', '/admin/hub/state/FL/',
+                '/admin/hub/state/FL/elections/', '/admin/hub/election/',
+                '/admin/hub/election/4/'):
+            self.assertWithinQueryBudget(path)
+        self.assertWithinQueryBudget('/admin/hub/organization/autocomplete/',
+            {'term': 'Florida'})
+
+    def test_api(self):
+        for path in ('/api/v1/election/', '/api/v1/election/4/',
+                '/api/v1/state/', '/api/v1/state/FL/', '/api/v1/organization/',
+                '/api/v1/changes/', '/status.json'):
+            self.assertWithinQueryBudget(path, {'format': 'json'})
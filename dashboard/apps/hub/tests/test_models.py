@@ -6,7 +6,7 @@ from django.db.models import Q
 from django.db.models.query import QuerySet
 from django.test import TestCase
 
-from ..models import Contact, Election, Log, State, Volunteer
+from ..models import Contact, DirectLink, Election, Log, State, Volunteer
 
 class ElectionTest(TestCase):
 
@@ -82,6 +82,81 @@ class ElectionTest(TestCase):
         self.assertRaises(ValidationError, gop_prez_primary.clean)
 
 
+    def test_direct_links_sync(self):
+        "Saving an Election keeps its DirectLink rows in sync"
+        election = Election.objects.get(pk=4)
+        election.direct_links = "http://a.example.com/1\r\n\r\nhttp://B.example.com:8080/2 \n"
+        election.save()
+        self.assertEqual(
+            list(election.links.values_list('url', 'host', 'position')),
+            [('http://a.example.com/1', 'a.example.com', 0),
+             ('http://B.example.com:8080/2', 'b.example.com', 1)])
+
+        election.direct_links = "http://B.example.com:8080/2"
+        election.save()
+        self.assertEqual(list(election.links.values_list('url', flat=True)),
+            ['http://B.example.com:8080/2'])
+
+        election.direct_links = ''
+        election.save()
+        self.assertFalse(election.links.exists())
+
+    def test_long_direct_link(self):
+        "Links of any length are stored, and looked up by their hash"
+        url = 'http://results.example.com/?q=' + 'x' * 3000
+        election = Election.objects.get(pk=4)
+        election.direct_links = url
+        election.save()
+        link = election.links.get()
+        self.assertEqual(link.url, url)
+        self.assertEqual(link.url_hash, DirectLink.hash_url(url))
+        self.assertEqual(link.host, 'results.example.com')
+
+    def test_offices_mask(self):
+        "Saving an Election stores its office flags in offices_mask"
+        election = Election.objects.get(pk=31)
+        election.gov = True
+        election.save()
+        self.assertEqual(Election.objects.get(pk=31).offices_mask, 1 | 8)
+        self.assertEqual(election.offices, ('prez', 'gov'))
+        self.assertIn({'Governor': True}, election.offices_for_api)
+        self.assertIn({'Senate': False}, election.offices_for_api)
+
+    def test_slug_and_key(self):
+        "Saving an Election stores its slug and key for lookups"
+        election = Election.objects.get(pk=35)
+        election.gov = True
+        election.save()
+        self.assertEqual(Election.objects.get(slug='fl-2011-09-20-special-primary').pk, 35)
+        self.assertEqual(Election.objects.get(pk=35).key,
+            '2011-09-20 - FL - special - primary (gov, state_leg)')
+        self.assertEqual(unicode(election), election.key)
+
+    def test_level_status_codes(self):
+        "Level statuses are stored as codes, with the best one alongside"
+        election = Election.objects.get(pk=30)
+        election.county_level_status = 'baked-raw'
+        election.precinct_level_status = 'yes'
+        election.save()
+        self.assertEqual(Election.objects.filter(pk=30).values_list(
+            'county_level_status', 'precinct_level_status', 'best_level_status')[0],
+            (5, 4, 5))
+        election = Election.objects.get(county_level_status='baked-raw')
+        self.assertEqual(election.pk, 30)
+        self.assertEqual(election.county_level_status, 'baked-raw')
+        self.assertEqual(election.state_level_status, '')
+
+    def test_offices_q(self):
+        "Election.offices_q matches elections covering any or all offices"
+        def pks(offices, match_all=False):
+            return sorted(Election.objects.filter(Election.offices_q(offices, match_all))
+                .values_list('pk', flat=True))
+        self.assertEqual(pks(['prez']), [4, 31])
+        self.assertEqual(pks(['prez', 'state_leg']), [4, 30, 31, 35, 36])
+        self.assertEqual(pks(['prez', 'state_leg'], match_all=True), [4])
+        self.assertEqual(pks(['gov']), [])
+        self.assertRaises(ValueError, Election.offices_q, ['mayor'])
+
 class LogTest(TestCase):
 
         fixtures = [
@@ -159,6 +234,7 @@ class StateTest(unittest.TestCase):
                 
             mqs = mock.MagicMock(spec=QuerySet)
             mqs.count.return_value = count_val
+            mqs.exists.return_value = count_val > 0
             return mqs
 
         return filter_method
@@ -168,27 +244,26 @@ class StateTest(unittest.TestCase):
     # of Django QuerySets and Managers. However, the version on pypi doesn't
     # support Django 1.5.
     @mock.patch('apps.hub.models.State.election_set', autospec=True) 
-    def test_results_status(self, election_set):
+    def test_compute_results_status(self, election_set):
         election_set.filter = self.make_mock_filter_method()
         s = State(postal="MD")
-        self.assertEqual(s.results_status, None)
+        self.assertEqual(s.compute_results_status(), None)
 
+        # Best level statuses are baked-raw (5) and baked (6)
         election_set.filter = self.make_mock_filter_method({
-            'precinct_level_status': {
-                'baked-raw': 5,
+            'best_level_status': {
+                5: 5,
             }
         })
-        self.assertEqual(s.results_status, 'raw')
+        self.assertEqual(s.compute_results_status(), 'raw')
 
         election_set.filter = self.make_mock_filter_method({
-            'precinct_level_status': {
-                'baked-raw': 5,
+            'best_level_status': {
+                5: 5,
+                6: 2,
             },
-            'county_level_status': {
-                'baked': 2,
-            }
         })
-        self.assertEqual(s.results_status, 'clean')
+        self.assertEqual(s.compute_results_status(), 'clean')
 
 
 class StateTestWithDatabase(TestCase):
@@ -218,3 +293,55 @@ class StateTestWithDatabase(TestCase):
         self.assertEqual(len(status['metadata_volunteers']), 0)
         self.assertEqual(len(status['dev_volunteers']), 1)
         self.assertEqual(status['dev_volunteers'][0]['full_name'], "Aaliyah Clay")
+
+
+class StateStatusTest(TestCase):
+    fixtures = [
+        'test_state_status',
+        'test_elecdata_model',
+    ]
+
+    def setUp(self):
+        State.objects.rebuild_status()
+
+    def test_election_save_updates_status(self):
+        election = Election.objects.get(pk=30)
+        election.precinct_level_status = 'baked'
+        election.save()
+        fl = State.objects.get(pk='FL')
+        self.assertEqual(fl.results_status, 'clean')
+        self.assertEqual(fl.election_count, 5)
+
+        election.delete()
+        fl = State.objects.get(pk='FL')
+        self.assertEqual(fl.results_status, None)
+        self.assertEqual(fl.election_count, 4)
+
+    def test_election_state_change_updates_both_states(self):
+        election = Election.objects.get(pk=30)
+        election.state_id = 'KS'
+        election.save()
+        self.assertEqual(State.objects.get(pk='FL').election_count, 4)
+        self.assertEqual(State.objects.get(pk='KS').election_count, 1)
+
+    def test_volunteer_changes_update_status(self):
+        volunteer = Volunteer.objects.get(user__username="testuser")
+        volunteer.roles.add('dev')
+        ks = State.objects.get(pk='KS')
+        self.assertEqual(ks.results_status, 'partial')
+        self.assertEqual(ks.dev_volunteer_count, 1)
+
+        volunteer.states.add('FL')
+        self.assertEqual(State.objects.get(pk='FL').metadata_volunteer_count, 1)
+
+        volunteer.states.clear()
+        ks = State.objects.get(pk='KS')
+        self.assertEqual(ks.results_status, None)
+        self.assertEqual(ks.metadata_volunteer_count, 0)
+        self.assertEqual(State.objects.get(pk='FL').metadata_volunteer_count, 0)
+
+    def test_volunteer_delete_updates_status(self):
+        Volunteer.objects.get(user__username="testuser2").delete()
+        il = State.objects.get(pk='IL')
+        self.assertEqual(il.results_status, None)
+        self.assertEqual(il.dev_volunteer_count, 0)
@@ -0,0 +1,150 @@
+import json
+import os
+import shutil
+import tempfile
+from StringIO import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from dashboard.lib.publish import MANIFEST_NAME, S3Backend, get_backend, publish
+
+
+class FakeKey(object):
+
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+
+    def get_contents_as_string(self):
+        return self.bucket.keys[self.name][0]
+
+    def set_contents_from_string(self, content, headers=None):
+        self.bucket.keys[self.name] = (content, headers)
+
+
+class FakeBucket(object):
+    """Stands in for the parts of a boto Bucket used by S3Backend"""
+
+    def __init__(self):
+        self.keys = {}
+        self.requests = []
+
+    def get_key(self, name):
+        self.requests.append(('GET', name))
+        if name in self.keys:
+            return FakeKey(self, name)
+        return None
+
+    def new_key(self, name):
+        self.requests.append(('PUT', name))
+        return FakeKey(self, name)
+
+    def delete_key(self, name):
+        self.requests.append(('DELETE', name))
+        self.keys.pop(name, None)
+
+
+class PublishTestCase(TestCase):
+
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.target = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.source)
+        shutil.rmtree(self.target)
+
+    def write(self, name, content):
+        path = os.path.join(self.source, *name.split('/'))
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write(content)
+
+
+class PublishExportsTest(PublishTestCase):
+
+    def publish(self, *args, **options):
+        stdout = StringIO()
+        options.setdefault('target', 'file://' + self.target)
+        call_command('publish_exports', self.source, stdout=stdout, **options)
+        return stdout.getvalue().splitlines()
+
+    def test_publish(self):
+        self.write('status.json', '[]')
+        self.write('fl/2012/elections.json', '{}')
+        self.write('fl/.results_metadata.json', '{}')
+        self.assertEqual(self.publish(), [
+            '+ fl/2012/elections.json',
+            '+ status.json',
+            '2 added, 0 changed, 0 deleted, 0 unchanged',
+        ])
+        with open(os.path.join(self.target, 'fl', '2012', 'elections.json')) as f:
+            self.assertEqual(f.read(), '{}')
+        with open(os.path.join(self.target, MANIFEST_NAME)) as f:
+            self.assertEqual(sorted(json.load(f)), ['fl/2012/elections.json', 'status.json'])
+
+        self.assertEqual(self.publish(), ['0 added, 0 changed, 0 deleted, 2 unchanged'])
+
+        self.write('status.json', '[{}]')
+        os.unlink(os.path.join(self.source, 'fl', '2012', 'elections.json'))
+        self.assertEqual(self.publish(dry_run=True), [
+            '~ status.json',
+            '- fl/2012/elections.json',
+            '0 added, 1 changed, 1 deleted, 0 unchanged',
+        ])
+        self.assertTrue(os.path.exists(os.path.join(self.target, 'fl')))
+        self.publish(concurrency=1)
+        self.assertEqual(sorted(os.listdir(self.target)), [MANIFEST_NAME, 'status.json'])
+
+    def test_target(self):
+        self.write('status.json', '[]')
+        self.assertRaises(CommandError, self.publish, target=None)
+        self.assertRaises(CommandError, self.publish, target='ftp://example.com/')
+        with override_settings(HUB_PUBLISH_TARGET='file://' + self.target):
+            self.publish(target=None)
+        self.assertTrue(os.path.exists(os.path.join(self.target, MANIFEST_NAME)))
+
+
+class S3BackendTest(PublishTestCase):
+
+    def test_publish(self):
+        bucket = FakeBucket()
+        connection = type('FakeS3Connection', (object,), {
+            'get_bucket': lambda self, name, validate=True: bucket})
+        backend = S3Backend('exports', '/us/states/', connect=connection)
+        self.write('status.json', '[]')
+        self.write('fl/metadata.csv', 'years')
+        publish(self.source, backend)
+        self.assertEqual(bucket.keys['us/states/status.json'],
+            ('[]', {'Content-Type': 'application/json'}))
+        self.assertEqual(bucket.keys['us/states/fl/metadata.csv'][1],
+            {'Content-Type': 'text/csv'})
+        self.assertIn('us/states/%s' % MANIFEST_NAME, bucket.keys)
+
+        # Only the manifest is read when nothing changed
+        del bucket.requests[:]
+        publish(self.source, backend)
+        self.assertEqual(bucket.requests, [('GET', 'us/states/%s' % MANIFEST_NAME)])
+
+        os.unlink(os.path.join(self.source, 'status.json'))
+        publish(self.source, backend)
+        self.assertNotIn('us/states/status.json', bucket.keys)
+
+    def test_publish_gzipped(self):
+        bucket = FakeBucket()
+        connection = type('FakeS3Connection', (object,), {
+            'get_bucket': lambda self, name, validate=True: bucket})
+        backend = S3Backend('exports', '', connect=connection)
+        self.write('status.json.gz', 'gzipped')
+        publish(self.source, backend)
+        self.assertEqual(bucket.keys['status.json.gz'][1],
+            {'Content-Type': 'application/json', 'Content-Encoding': 'gzip'})
+
+    def test_target(self):
+        backend = get_backend('s3://exports/us?host=localhost&port=9000&secure=0')
+        self.assertEqual((backend.bucket_name, backend.prefix, backend.host,
+            backend.port, backend.is_secure), ('exports', 'us', 'localhost', 9000, False))
@@ -0,0 +1,180 @@
+import csv
+import datetime
+import json
+import zlib
+from StringIO import StringIO
+
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from ..models import (ChangeLog, Election, Organization, State,
+    update_elections)
+from ..views import _iter_chunked
+
+class StatusJsonViewTest(TestCase):
+    fixtures = [
+        'test_state_status',
+        'test_elecdata_model',
+    ]
+
+    def setUp(self):
+        cache.clear()
+        State.objects.rebuild_status()
+        self.url = reverse('status_json')
+
+    def test_status_json(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.content, State.objects.status_json())
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+
+    def test_if_none_match(self):
+        etag = self.client.get(self.url)['ETag']
+        # Only the version check hits the database
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(self.url)['Last-Modified']
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_invalidated_on_save(self):
+        etag = self.client.get(self.url)['ETag']
+        election = Election.objects.get(pk=4)
+        election.state_level_status = 'baked'
+        election.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('"clean"', response.content)
+
+
+class ElectionExportViewTest(TestCase):
+    fixtures = [
+        'test_elecdata_model',
+    ]
+
+    def get_content(self, response):
+        self.assertEqual(response.status_code, 200)
+        content = ''.join(response.streaming_content)
+        if response.get('Content-Encoding') == 'gzip':
+            content = zlib.decompress(content, 16 + zlib.MAX_WBITS)
+        return content
+
+    def test_ndjson(self):
+        response = self.client.get(reverse('election_export', args=['ndjson']))
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        records = [json.loads(line) for line in self.get_content(response).splitlines()]
+        self.assertEqual([r['id'] for r in records], [4, 30, 31, 35, 36])
+        self.assertEqual(records[0]['state'], 'FL')
+        self.assertEqual(records[0]['organization'], 3)
+        self.assertEqual(records[0]['start_date'], '2012-11-06')
+        self.assertEqual(records[0]['state_level_status'], '')
+        self.assertIsInstance(records[0]['direct_links'], list)
+        self.assertNotIn('note', records[0])
+
+    def test_csv_with_filters(self):
+        response = self.client.get(reverse('election_export', args=['csv']),
+            {'race_type': 'general'})
+        rows = list(csv.reader(StringIO(self.get_content(response))))
+        header = rows[0]
+        self.assertIn('start_date', header)
+        self.assertEqual([row[header.index('id')] for row in rows[1:]], ['4', '36'])
+
+        response = self.client.get(reverse('election_export', args=['csv']),
+            {'offices': 'prez'})
+        rows = list(csv.reader(StringIO(self.get_content(response))))
+        self.assertEqual([row[header.index('id')] for row in rows[1:]], ['4', '31'])
+
+    def test_gzip(self):
+        response = self.client.get(reverse('election_export', args=['ndjson']),
+            HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(self.get_content(response).splitlines()), 5)
+
+    def test_invalid_filter(self):
+        response = self.client.get(reverse('election_export', args=['csv']),
+            {'state__bogus__name': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_chunked_iteration(self):
+        with self.assertNumQueries(3):
+            rows = list(_iter_chunked(Election.objects.all(), ['start_date'],
+                chunk_size=2))
+        self.assertEqual([r['pk'] for r in rows], [4, 30, 31, 35, 36])
+
+
+@override_settings(HUB_CHANGE_FEED_DELAY=0)
+class ChangeFeedViewTest(TestCase):
+    fixtures = [
+        'test_state_status',
+        'test_elecdata_model',
+    ]
+
+    def setUp(self):
+        # Start from the entries of the changes below
+        self.since = ChangeLog.objects.latest('pk').pk
+
+    def get(self, **params):
+        response = self.client.get(reverse('change_feed'), params)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def test_changes(self):
+        election = Election.objects.get(pk=31)
+        election.county_level_status = 'baked'
+        election.save()
+        Election.objects.get(pk=35).delete()
+        update_elections(Election.objects.filter(pk=36), proofed_by=None)
+
+        data = self.get(since=self.since)
+        changes = [(c['model'], c['id'], c['operation']) for c in data['changes']]
+        self.assertEqual(changes, [
+            # FL's results are now clean, which is logged by the status
+            # handler ahead of the election's own entry
+            ('state', 'FL', 'save'),
+            ('election', 31, 'save'),
+            ('election', 35, 'delete'),
+            ('election', 36, 'save'),
+        ])
+        self.assertEqual(data['next'], data['changes'][-1]['cursor'])
+        self.assertFalse(data['more'])
+        self.assertEqual(self.get(since=data['next']),
+            {'changes': [], 'next': data['next'], 'more': False})
+
+    def test_batches(self):
+        Organization.objects.get(pk=3).save()
+        State.objects.get(pk='KS').save()
+        data = self.get(since=self.since, limit=1)
+        self.assertEqual([(c['model'], c['id']) for c in data['changes']],
+            [('organization', 3)])
+        self.assertTrue(data['more'])
+        data = self.get(since=data['next'], limit=1)
+        self.assertEqual([(c['model'], c['id']) for c in data['changes']],
+            [('state', 'KS')])
+        self.assertFalse(data['more'])
+
+    @override_settings(HUB_CHANGE_FEED_DELAY=60)
+    def test_recent_entries_held_back(self):
+        # Entries that may belong to transactions still in flight are not
+        # served yet, so a later entry can't move the cursor past them
+        Organization.objects.get(pk=3).save()
+        data = self.get(since=self.since)
+        self.assertEqual(data, {'changes': [], 'next': self.since, 'more': False})
+        ChangeLog.objects.filter(pk__gt=self.since).update(
+            created=datetime.datetime.now() - datetime.timedelta(seconds=61))
+        data = self.get(since=self.since)
+        self.assertEqual([(c['model'], c['id']) for c in data['changes']],
+            [('organization', 3)])
+
+    def test_invalid(self):
+        for params in ({'since': 'x'}, {'limit': '0'}, {'limit': '100000'}):
+            response = self.client.get(reverse('change_feed'), params)
+            self.assertEqual(response.status_code, 400)
@@ -0,0 +1,22 @@
+from ..middleware import QueryCounter, query_budget, view_name_for_path
+
+
+class QueryBudgetTestMixin(object):
+    """
+    Lets TestCases assert that views stay within their budgets in
+    settings.HUB_QUERY_BUDGETS.
+    """
+
+    def assertWithinQueryBudget(self, path, data=None):
+        """GETs ``path`` and fails if it runs more queries than its budget"""
+        name = view_name_for_path(path)
+        budget = query_budget(name)
+        if budget is None:
+            self.fail("%s has no query budget" % name)
+        with QueryCounter() as counter:
+            response = self.client.get(path, data or {})
+        self.assertEqual(response.status_code, 200)
+        if counter.count > budget:
+            self.fail("%s ran %d queries, over its budget of %d" % (
+                name, counter.count, budget))
+        return response
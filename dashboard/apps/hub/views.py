@@ -1,4 +1,252 @@
-from dashboard.apps.hub.models import Election, State
-from django.http import HttpResponse, Http404
+import csv
+import datetime
+import hashlib
+import json
+import time
+import zlib
+
+from dashboard.apps.hub.api import ElectionResource
+from dashboard.apps.hub.fields import LevelStatusField
+from dashboard.apps.hub.models import (ChangeLog, Election, State,
+    split_direct_links)
+from django.conf import settings
+from django.core.cache import cache
+from django.http import (HttpResponse, HttpResponseBadRequest,
+    HttpResponseNotModified, StreamingHttpResponse, Http404)
 from django.shortcuts import get_object_or_404
 from django.utils import simplejson
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_GET
+from tastypie.exceptions import InvalidFilterError
+
+STATUS_JSON_CACHE_KEY = 'hub:status_json:%s'
+
+# Number of elections fetched per query by election_export
+EXPORT_CHUNK_SIZE = 2000
+
+# Default and maximum number of entries returned by change_feed
+CHANGE_FEED_LIMIT = 500
+CHANGE_FEED_MAX_LIMIT = 5000
+
+
+def _etag_matches(etag, if_none_match):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return etag in [tag.strip() for tag in if_none_match.split(',')]
+
+
+@require_GET
+def status_json(request):
+    """
+    Serves ``State.objects.status_json()`` with a strong ETag and a
+    Last-Modified header.
+
+    The rendered JSON is cached under a key derived from
+    ``State.objects.status_version()``, which changes whenever an election,
+    volunteer or state feeding the status entries is saved or deleted.  A
+    request for an unchanged payload therefore costs one aggregate query
+    and one cache lookup, and conditional requests are answered with
+    304 Not Modified.
+    """
+    last_modified, count = State.objects.status_version()
+    last_modified_ts = None
+    if last_modified is not None:
+        last_modified_ts = int(time.mktime(last_modified.timetuple()))
+
+    # Key on the full-precision timestamp so that several changes within
+    # the same second still produce distinct keys
+    cache_key = STATUS_JSON_CACHE_KEY % hashlib.sha1(
+        '%s:%s' % (last_modified, count)).hexdigest()
+    cached = cache.get(cache_key)
+    if cached is None:
+        body = State.objects.status_json()
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        cached = (etag, body)
+        cache.set(cache_key, cached)
+    etag, body = cached
+
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if_modified_since = parse_http_date_safe(
+        request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    if if_none_match is not None:
+        not_modified = _etag_matches(etag, if_none_match)
+    else:
+        not_modified = (if_modified_since is not None and
+            last_modified_ts is not None and
+            last_modified_ts <= if_modified_since)
+
+    if not_modified:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    if last_modified_ts is not None:
+        response['Last-Modified'] = http_date(last_modified_ts)
+    return response
+
+
+class _Echo(object):
+    """File-like object whose write() returns what was written"""
+    def write(self, value):
+        return value
+
+
+def _iter_chunked(queryset, columns, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yields ``values()`` dicts for every row of ``queryset``, fetching
+    ``chunk_size`` rows at a time ordered by primary key.
+
+    Each chunk starts after the last primary key of the previous one, so
+    memory use and per-chunk cost stay flat however large the table is.
+    """
+    queryset = queryset.order_by('pk').values('pk', *columns)
+    last_pk = None
+    while True:
+        chunk = queryset
+        if last_pk is not None:
+            chunk = chunk.filter(pk__gt=last_pk)
+        rows = list(chunk[:chunk_size])
+        for row in rows:
+            yield row
+        if len(rows) < chunk_size:
+            break
+        last_pk = rows[-1]['pk']
+
+
+def _export_value(name, value):
+    if name == 'direct_links':
+        return split_direct_links(value)
+    if name in Election.LEVEL_STATUS_FIELDS:
+        # values() leaves these as their codes
+        return LevelStatusField.status(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def _iter_ndjson(rows, fields):
+    encoder = json.JSONEncoder()
+    for row in rows:
+        record = dict((name, _export_value(name, row[attname]))
+            for name, attname in fields)
+        yield encoder.encode(record) + '\n'
+
+
+def _iter_csv(rows, fields):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, attname in fields])
+    for row in rows:
+        values = []
+        for name, attname in fields:
+            value = _export_value(name, row[attname])
+            if isinstance(value, list):
+                value = ' '.join(value)
+            if value is None:
+                value = ''
+            if isinstance(value, unicode):
+                value = value.encode('utf-8')
+            values.append(value)
+        yield writer.writerow(values)
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+@require_GET
+def election_export(request, format):
+    """
+    Streams every election matching the ``ElectionResource`` filters in
+    the query string as newline-delimited JSON or CSV.
+
+    Rows are read in primary key order in fixed-size chunks and written
+    as they are read, without going through tastypie's dehydration.  The
+    response is gzipped on the fly for clients that accept it.
+    """
+    resource = ElectionResource()
+    try:
+        filters = resource.build_filters(filters=request.GET.copy())
+    except InvalidFilterError as e:
+        return HttpResponseBadRequest(str(e))
+    fields = resource.get_export_fields()
+    rows = _iter_chunked(resource.filter_object_list(Election.objects.all(), filters),
+        [attname for name, attname in fields])
+
+    if format == 'csv':
+        content = _iter_csv(rows, fields)
+        content_type = 'text/csv; charset=utf-8'
+    else:
+        content = _iter_ndjson(rows, fields)
+        content_type = 'application/x-ndjson'
+
+    gzipped = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+    if gzipped:
+        content = _gzip(content)
+
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = 'attachment; filename=elections.%s' % format
+    response['Vary'] = 'Accept-Encoding'
+    if gzipped:
+        response['Content-Encoding'] = 'gzip'
+    return response
+
+
+@require_GET
+def change_feed(request):
+    """
+    Serves the ChangeLog entries after the ``since`` cursor, oldest
+    first, as JSON::
+
+        {"changes": [{"cursor": 8, "model": "election", "id": 4,
+                      "operation": "save"}, ...],
+         "next": 8, "more": false}
+
+    ``next`` is the cursor to pass as ``since`` in the next request, and
+    ``more`` tells whether there are more entries after this batch, of at
+    most ``limit`` entries.  Omitting ``since`` starts from the beginning
+    of the log.
+
+    Ids are assigned when an entry is inserted, not when its transaction
+    commits, so a reader could see entry N+1 and move past N while N's
+    transaction is still in flight.  Entries are therefore only served
+    once they are ``settings.HUB_CHANGE_FEED_DELAY`` seconds old, which
+    assumes that no transaction logging changes stays open longer than
+    that.
+    """
+    try:
+        since = int(request.GET.get('since') or 0)
+        limit = int(request.GET.get('limit') or CHANGE_FEED_LIMIT)
+    except ValueError:
+        return HttpResponseBadRequest("since and limit must be integers")
+    if limit < 1 or limit > CHANGE_FEED_MAX_LIMIT:
+        return HttpResponseBadRequest("limit must be between 1 and %d" % CHANGE_FEED_MAX_LIMIT)
+
+    cutoff = (datetime.datetime.now() -
+        datetime.timedelta(seconds=settings.HUB_CHANGE_FEED_DELAY))
+    # One more row than needed tells whether there are more
+    entries = list(ChangeLog.objects.filter(pk__gt=since).order_by('pk')[:limit + 1])
+    # Stop at the first recent entry, even if later ones are older
+    for i, entry in enumerate(entries):
+        if entry.created > cutoff:
+            entries = entries[:i]
+            break
+    more = len(entries) > limit
+    entries = entries[:limit]
+    body = json.dumps({
+        'changes': [{
+            'cursor': entry.pk,
+            'model': entry.model,
+            'id': entry.get_object_id(),
+            'operation': entry.operation,
+        } for entry in entries],
+        'next': entries[-1].pk if entries else since,
+        'more': more,
+    })
+    return HttpResponse(body, content_type='application/json')
@@ -91,6 +91,40 @@ INSTALLED_APPS = (
 
 GRAPPELLI_ADMIN_TITLE = 'The OpenElections Project'
 
+# Admin changelists count unfiltered tables with an estimate, unless the
+# estimate is below this many rows. See dashboard.apps.hub.paginators
+HUB_EXACT_COUNT_THRESHOLD = 10000
+
+# The change feed only serves ChangeLog entries at least this many seconds
+# old, so that entries whose transactions commit out of id order are not
+# skipped. See dashboard.apps.hub.views.change_feed
+HUB_CHANGE_FEED_DELAY = 60
+
+# Where the publish_exports command publishes exported files, such as
+# 's3://openelex-data/us/states'. See dashboard.lib.publish.get_backend
+HUB_PUBLISH_TARGET = None
+
+# Most queries each view should run, warned about by the opt-in
+# dashboard.apps.hub.middleware.QueryCountMiddleware and asserted by the
+# tests. Views are named as in dashboard.apps.hub.middleware.view_name
+HUB_QUERY_BUDGETS = {
+    'admin:hub_state_changelist': 6,
+    'admin:hub_state_change': 24,
+    'admin:hub_state_election_inline': 16,
+    'admin:hub_election_changelist': 10,
+    'admin:hub_election_change': 12,
+    'admin:hub_organization_autocomplete': 3,
+    'api_dispatch_list:election': 3,
+    'api_dispatch_detail:election': 2,
+    'api_dispatch_list:state': 2,
+    'api_dispatch_detail:state': 1,
+    'api_dispatch_list:organization': 2,
+    'status_json': 4,
+    'change_feed': 1,
+}
+# Log the views with the most queries every this many requests
+HUB_QUERY_STATS_INTERVAL = 1000
+
 # A sample logging configuration. The only tangible logging
 # performed by this configuration is to send an email to
 # the site admins on every HTTP 500 error.
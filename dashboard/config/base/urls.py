@@ -13,5 +13,8 @@ v1_api.register(api.StateResource())
 urlpatterns = patterns('',
     url(r'^admin/', include(admin.site.urls)),
     url(r'^grappelli/', include('grappelli.urls')),
+    url(r'^api/v1/election/export\.(?P<format>ndjson|csv)$', 'dashboard.apps.hub.views.election_export', name='election_export'),
+    url(r'^api/v1/changes/$', 'dashboard.apps.hub.views.change_feed', name='change_feed'),
     url(r'^api/', include(v1_api.urls)),
+    url(r'^status\.json$', 'dashboard.apps.hub.views.status_json', name='status_json'),
 )
@@ -46,3 +46,8 @@ if 'test' in sys.argv:
     #    PROJECT_ROOT + '/foo/bar/fixtures',
     #)
     SOUTH_TESTS_MIGRATE = False
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
@@ -21,6 +21,13 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': '127.0.0.1:11211',
+    }
+}
+
 # If not using sqlite, move database settings to 
 # 'local_settings.py' outside of version control
 try:
@@ -44,3 +51,8 @@ if 'test' in sys.argv:
     #)
     """
     SOUTH_TESTS_MIGRATE = False
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
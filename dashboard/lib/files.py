@@ -0,0 +1,105 @@
+import gzip
+import hashlib
+import os
+import tempfile
+
+
+def file_digest(path, chunk_size=64 * 1024):
+    """Returns the SHA-1 hex digest of a file's contents"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _fsync_dir(path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        # Not every platform allows opening a directory
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _temp_file(path):
+    dirname, basename = os.path.split(path)
+    return tempfile.NamedTemporaryFile(dir=dirname or '.',
+        prefix='.%s.' % basename, delete=False)
+
+
+def write_if_changed(path, chunks, compress=True):
+    """
+    Atomically replaces the file at ``path`` with the strings yielded by
+    ``chunks``.
+
+    The chunks are streamed to a temporary file in the same directory, and,
+    if ``compress`` is True, to a gzipped ``path + '.gz'`` sibling in the
+    same pass.  Both are fsynced and renamed into place, so readers never
+    see a partially written file.
+
+    If the new content is identical to the existing file, the temporary
+    files are discarded and nothing is replaced.
+
+    Returns the SHA-1 hex digest of the content and whether the files were
+    replaced.
+    """
+    path = os.path.abspath(path)
+    gz_path = path + '.gz'
+    digest = hashlib.sha1()
+
+    out = _temp_file(path)
+    gz_out = _temp_file(gz_path) if compress else None
+    temp_paths = [f.name for f in (out, gz_out) if f is not None]
+    try:
+        gz = None
+        if gz_out is not None:
+            # A fixed mtime and name keep the compressed output reproducible
+            gz = gzip.GzipFile(filename=os.path.basename(path), mode='wb',
+                fileobj=gz_out, mtime=0)
+        for chunk in chunks:
+            if isinstance(chunk, unicode):
+                chunk = chunk.encode('utf-8')
+            out.write(chunk)
+            if gz is not None:
+                gz.write(chunk)
+            digest.update(chunk)
+        if gz is not None:
+            gz.close()
+        for f in (out, gz_out):
+            if f is not None:
+                f.flush()
+                os.fsync(f.fileno())
+                f.close()
+
+        hexdigest = digest.hexdigest()
+        if (os.path.exists(path) and file_digest(path) == hexdigest and
+                (not compress or os.path.exists(gz_path))):
+            for temp_path in temp_paths:
+                os.unlink(temp_path)
+            return hexdigest, False
+
+        # NamedTemporaryFile creates files readable only by their owner
+        umask = os.umask(0)
+        os.umask(umask)
+        for temp_path in temp_paths:
+            os.chmod(temp_path, 0666 & ~umask)
+
+        # Move the compressed file first so that it is never older than
+        # the uncompressed file it accompanies
+        if gz_out is not None:
+            os.rename(gz_out.name, gz_path)
+        os.rename(out.name, path)
+        _fsync_dir(os.path.dirname(path))
+        return hexdigest, True
+    except:
+        for f in (out, gz_out):
+            if f is not None:
+                f.close()
+        for temp_path in temp_paths:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+        raise
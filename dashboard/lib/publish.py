@@ -0,0 +1,263 @@
+"""
+Publishes a directory of exported files, such as the status JSON and the
+results metadata tree, to a storage backend.
+
+The backend keeps a manifest, MANIFEST_NAME, of the SHA-1 digest of every
+file published to it.  Publishing compares the files in the directory
+with the manifest, uploads only the files that were added or changed,
+deletes the files that disappeared, and then replaces the manifest.  An
+interrupted publish leaves the old manifest in place, so the next publish
+uploads again whatever may not have made it.
+
+Backends are picked by the scheme of a target URL.  See get_backend.
+"""
+import json
+import mimetypes
+import os
+import threading
+import urlparse
+from multiprocessing.pool import ThreadPool
+
+from dashboard.lib.files import file_digest, write_if_changed
+
+MANIFEST_NAME = 'manifest.json'
+
+
+class StorageBackend(object):
+    """
+    Where files are published.  Names are relative, slash-separated paths.
+    """
+
+    def read(self, name):
+        """Returns the content of a file, or None if it doesn't exist"""
+        raise NotImplementedError()
+
+    def save(self, name, content):
+        """Creates or replaces a file"""
+        raise NotImplementedError()
+
+    def delete(self, name):
+        """Deletes a file, if it exists"""
+        raise NotImplementedError()
+
+
+class LocalBackend(StorageBackend):
+    """Publishes to a directory of the local filesystem"""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+
+    def path(self, name):
+        return os.path.join(self.root, *name.split('/'))
+
+    def read(self, name):
+        try:
+            with open(self.path(name), 'rb') as f:
+                return f.read()
+        except IOError:
+            return None
+
+    def save(self, name, content):
+        path = self.path(name)
+        dirname = os.path.dirname(path)
+        if not os.path.isdir(dirname):
+            try:
+                os.makedirs(dirname)
+            except OSError:
+                # Created by another upload in the meantime
+                if not os.path.isdir(dirname):
+                    raise
+        write_if_changed(path, [content], compress=False)
+
+    def delete(self, name):
+        path = self.path(name)
+        if os.path.exists(path):
+            os.unlink(path)
+        # Remove the directories left empty, up to the root
+        dirname = os.path.dirname(path)
+        while dirname != self.root and os.path.isdir(dirname) and not os.listdir(dirname):
+            os.rmdir(dirname)
+            dirname = os.path.dirname(dirname)
+
+
+class S3Backend(StorageBackend):
+    """
+    Publishes to a bucket of Amazon S3, or of any service with an
+    S3-compatible API, through boto.
+
+    ``host``, ``port`` and ``is_secure`` point boto at a service other
+    than S3, such as a local stand-in for testing.  Credentials are
+    looked up by boto, in the AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY
+    environment variables or in its configuration files.
+
+    ``connect`` is a function returning a boto S3Connection, and defaults
+    to creating one from the other arguments.  Each thread gets its own
+    connection.
+    """
+
+    def __init__(self, bucket, prefix='', host=None, port=None,
+            is_secure=True, connect=None):
+        self.bucket_name = bucket
+        self.prefix = prefix.strip('/')
+        self.host = host
+        self.port = port
+        self.is_secure = is_secure
+        self.connect = connect or self._connect
+        self._local = threading.local()
+
+    def _connect(self):
+        from boto.s3.connection import OrdinaryCallingFormat, S3Connection
+
+        kwargs = {'is_secure': self.is_secure}
+        if self.host:
+            # Stand-ins seldom support bucket names as subdomains
+            kwargs.update(host=self.host, calling_format=OrdinaryCallingFormat())
+        if self.port:
+            kwargs['port'] = self.port
+        return S3Connection(**kwargs)
+
+    @property
+    def bucket(self):
+        bucket = getattr(self._local, 'bucket', None)
+        if bucket is None:
+            bucket = self._local.bucket = self.connect().get_bucket(
+                self.bucket_name, validate=False)
+        return bucket
+
+    def key_name(self, name):
+        if self.prefix:
+            return '%s/%s' % (self.prefix, name)
+        return name
+
+    def read(self, name):
+        key = self.bucket.get_key(self.key_name(name))
+        if key is None:
+            return None
+        return key.get_contents_as_string()
+
+    def save(self, name, content):
+        key = self.bucket.new_key(self.key_name(name))
+        content_type, encoding = mimetypes.guess_type(name)
+        headers = {'Content-Type': content_type or 'application/octet-stream'}
+        if encoding:
+            # e.g. status.json.gz, served as JSON that clients decompress
+            headers['Content-Encoding'] = encoding
+        key.set_contents_from_string(content, headers=headers)
+
+    def delete(self, name):
+        self.bucket.delete_key(self.key_name(name))
+
+
+def _local_backend(url):
+    return LocalBackend(url.path)
+
+
+def _s3_backend(url):
+    params = urlparse.parse_qs(url.query)
+    port = params.get('port', [None])[0]
+    return S3Backend(url.netloc, url.path,
+        host=params.get('host', [None])[0],
+        port=int(port) if port else None,
+        is_secure=params.get('secure', ['1'])[0] not in ('0', 'false'))
+
+
+# Backend factories by URL scheme. Each takes the parsed target URL
+BACKENDS = {
+    'file': _local_backend,
+    's3': _s3_backend,
+}
+
+
+def get_backend(target):
+    """
+    Returns the backend for a target URL, such as
+    ``file:///var/www/exports`` or ``s3://bucket/prefix``.
+
+    S3 targets take ``host``, ``port`` and ``secure`` query parameters to
+    publish to another S3-compatible service, e.g.
+    ``s3://exports/us?host=localhost&port=9000&secure=0``.
+    """
+    url = urlparse.urlparse(target)
+    try:
+        factory = BACKENDS[url.scheme]
+    except KeyError:
+        raise ValueError("Unsupported publish target: %r" % (target,))
+    return factory(url)
+
+
+def local_manifest(source_dir):
+    """
+    Returns a dict mapping the name of every file under ``source_dir`` to
+    its SHA-1 digest.
+
+    Files and directories whose names start with a dot, such as the
+    temporary files of write_if_changed, are left out.
+    """
+    manifest = {}
+    source_dir = os.path.abspath(source_dir)
+    for dirpath, dirnames, filenames in os.walk(source_dir):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+        for filename in filenames:
+            if filename.startswith('.'):
+                continue
+            path = os.path.join(dirpath, filename)
+            name = os.path.relpath(path, source_dir).replace(os.sep, '/')
+            if name != MANIFEST_NAME:
+                manifest[name] = file_digest(path)
+    return manifest
+
+
+class PublishDiff(object):
+    """The names of the files a publish adds, changes, deletes and keeps"""
+
+    def __init__(self, old, new):
+        self.added = sorted(name for name in new if name not in old)
+        self.changed = sorted(name for name in new if name in old and old[name] != new[name])
+        self.deleted = sorted(name for name in old if name not in new)
+        self.unchanged = sorted(name for name in new if old.get(name) == new[name])
+
+    def __nonzero__(self):
+        return bool(self.added or self.changed or self.deleted)
+
+    def lines(self):
+        """Yields a line per added, changed or deleted file, then a summary"""
+        for marker, names in (('+', self.added), ('~', self.changed), ('-', self.deleted)):
+            for name in names:
+                yield '%s %s' % (marker, name)
+        yield '%d added, %d changed, %d deleted, %d unchanged' % (
+            len(self.added), len(self.changed), len(self.deleted), len(self.unchanged))
+
+
+def publish(source_dir, backend, concurrency=8, dry_run=False):
+    """
+    Publishes the files under ``source_dir`` to ``backend``, with at most
+    ``concurrency`` uploads or deletions at a time, and returns the
+    PublishDiff.
+
+    If ``dry_run`` is True, the diff is returned without changing anything.
+    """
+    source_dir = os.path.abspath(source_dir)
+    new = local_manifest(source_dir)
+    content = backend.read(MANIFEST_NAME)
+    old = json.loads(content) if content else {}
+    diff = PublishDiff(old, new)
+    if dry_run or not diff:
+        return diff
+
+    def upload(name):
+        with open(os.path.join(source_dir, *name.split('/')), 'rb') as f:
+            backend.save(name, f.read())
+
+    # Deletions go after the uploads, as removing a directory left empty
+    # could race with an upload into it
+    pool = ThreadPool(max(1, concurrency))
+    try:
+        # Any error is raised here, before the manifest is replaced
+        for func, names in ((upload, diff.added + diff.changed), (backend.delete, diff.deleted)):
+            for _ in pool.imap_unordered(func, names):
+                pass
+    finally:
+        pool.close()
+        pool.join()
+    backend.save(MANIFEST_NAME, json.dumps(new, indent=0, sort_keys=True))
+    return diff